@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Log de Acesso Estruturado
+
+Substitui o print() síncrono por requisição:
+
+- O handler só monta um dicionário e o coloca em uma fila (put_nowait);
+  se a fila estiver cheia o registro é descartado e contado, nunca espera
+- Uma thread de escrita serializa os registros em JSON Lines e grava com
+  buffer, descarregando no disco a cada flush_interval
+- Rotação por tamanho: access.jsonl -> access.jsonl.1 -> ... -> .N
+- Amostragem por rota para caminhos de alto volume (assets, /metrics);
+  erros (status >= 400) e requisições lentas são sempre registrados e
+  cada linha leva a taxa usada ("sample") para reponderar na análise
+- Em modo dev a mesma thread imprime uma linha resumida no console
+"""
+
+import datetime
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+from private_data import data_path
+
+# Fora da pasta publicada: cada linha tem o IP e o user agent do cliente
+DEFAULT_PATH = data_path('logs', 'access.jsonl')
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_FLUSH_INTERVAL = 0.5
+WRITE_BUFFER_BYTES = 64 * 1024
+
+# Requisições acima deste tempo nunca são descartadas pela amostragem
+SLOW_REQUEST_SECONDS = 0.5
+
+DEFAULT_SAMPLE_RATES = {
+    '/assets/*': 1.0,
+    '/__livereload': 0.0,
+}
+
+
+def parse_sample_rates(spec):
+    """'/assets/*=0.1,/metrics=0' -> {'/assets/*': 0.1, '/metrics': 0.0}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        route, _, rate = item.partition('=')
+        rates[route.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class AccessLog:
+    """Log de acesso em JSON Lines gravado por uma thread em background"""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS,
+                 sample_rates=None, queue_size=DEFAULT_QUEUE_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, console=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.console = console
+        rates = dict(DEFAULT_SAMPLE_RATES)
+        rates.update(sample_rates or {})
+        # Regras mais específicas primeiro; '/x/*' casa por prefixo
+        self._exact = {route: rate for route, rate in rates.items() if not route.endswith('*')}
+        self._prefixes = sorted(((route[:-1], rate) for route, rate in rates.items() if route.endswith('*')),
+                                key=lambda item: -len(item[0]))
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._size = 0
+
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.rotations = 0
+
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._open()
+        self._thread = threading.Thread(target=self._writer_loop, name='access-log', daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Caminho da requisição
+    # ------------------------------------------------------------------
+
+    def sample_rate(self, path):
+        rate = self._exact.get(path)
+        if rate is not None:
+            return rate
+        for prefix, rate in self._prefixes:
+            if path.startswith(prefix):
+                return rate
+        return 1.0
+
+    def request(self, method, path, status, nbytes, seconds, client=None, cache=None, user_agent=None):
+        """Registra uma requisição atendida (não bloqueia)"""
+        rate = 1.0
+        if status < 400 and seconds < SLOW_REQUEST_SECONDS:
+            rate = self.sample_rate(path.split('?', 1)[0])
+            if rate < 1.0 and random.random() >= rate:
+                self.sampled_out += 1
+                return
+        record = {
+            'ts': time.time(),
+            'type': 'access',
+            'client': client,
+            'method': method,
+            'path': path,
+            'status': status,
+            'bytes': nbytes,
+            'duration_ms': round(seconds * 1000, 3),
+            'cache': cache,
+        }
+        if user_agent:
+            record['ua'] = user_agent
+        if rate < 1.0:
+            record['sample'] = rate
+        self._put(record)
+
+    def event(self, kind, message=None, **fields):
+        """Registra um evento da aplicação (formulário recebido, erro, ...)"""
+        record = {'ts': time.time(), 'type': kind}
+        if message is not None:
+            record['message'] = message
+        record.update(fields)
+        self._put(record)
+
+    def _put(self, record):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    # ------------------------------------------------------------------
+    # Thread de escrita
+    # ------------------------------------------------------------------
+
+    def _open(self):
+        self._file = open(self.path, 'ab', buffering=WRITE_BUFFER_BYTES)
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        """access.jsonl -> .1, .1 -> .2, ... (o mais antigo é apagado)"""
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f'{self.path}.{index}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{index + 1}')
+        if self.backups > 0:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+        self._open()
+
+    def _write(self, record):
+        if self._file is not None:
+            line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+            if self._size + len(line) > self.max_bytes and self._size > 0:
+                self._rotate()
+            self._file.write(line)
+            self._size += len(line)
+        if self.console:
+            print(format_console(record))
+        self.written += 1
+
+    def _writer_loop(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                record = None
+            if record is _STOP:
+                break
+            try:
+                if record is not None:
+                    self._write(record)
+                    # Esvazia o que já está na fila sem voltar a esperar
+                    while True:
+                        try:
+                            record = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if record is _STOP:
+                            self._flush()
+                            return
+                        self._write(record)
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    self._flush()
+                    last_flush = time.monotonic()
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Erro ao gravar o log de acesso: {e}")
+        self._flush()
+
+    def _flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """Grava o que estiver na fila e encerra a thread"""
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self):
+        return {
+            'file': self.path,
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'sampled_out': self.sampled_out,
+            'rotations': self.rotations,
+        }
+
+
+_STOP = object()
+
+
+def format_console(record):
+    """Linha resumida para o console (modo dev)"""
+    timestamp = datetime.datetime.fromtimestamp(record['ts']).strftime('%Y-%m-%d %H:%M:%S')
+    if record['type'] == 'access':
+        cache = f" [{record['cache']}]" if record.get('cache') else ''
+        return (f"[{timestamp}] {record['method']} {record['path']} {record['status']} "
+                f"{record['bytes']}B {record['duration_ms']:.1f}ms{cache}")
+    if record['type'] == 'contact':
+        return f"[{timestamp}] 📧 Formulário de contato recebido (id {record.get('id')})"
+    if record['type'] == 'newsletter':
+        return f"[{timestamp}] 📬 Inscrição na newsletter (id {record.get('id')})"
+    return f"[{timestamp}] {record.get('message', record['type'])}"
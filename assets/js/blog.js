@@ -68,7 +68,32 @@ function initializeBlogSearch() {
 }
 
 // Perform blog search
+// Uses the server-side index (/api/blog/search) when available and falls
+// back to scanning the article cards on the current page.
 function performBlogSearch(query, resultsContainer) {
+    const activeFilter = document.querySelector('.filter-btn.active');
+    const category = activeFilter ? activeFilter.dataset.category : 'all';
+    const params = new URLSearchParams({ q: query, limit: 8, category: category });
+    
+    fetch(`/api/blog/search?${params}`)
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        })
+        .then(data => {
+            const results = data.results.map(result => ({
+                title: result.title,
+                url: '/' + result.url,
+                excerpt: result.excerpt,
+                category: result.category
+            }));
+            displayBlogSearchResults(results, resultsContainer, query);
+        })
+        .catch(() => performLocalBlogSearch(query, resultsContainer));
+}
+
+// Search the article cards rendered on the current page
+function performLocalBlogSearch(query, resultsContainer) {
     const articles = document.querySelectorAll('.article-card');
     const results = [];
     
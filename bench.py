@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Benchmark dos Servidores Locais
+
+Sobe cada ponto de entrada (server.py, run.py, dev-server.py, dev-simple.py)
+em uma porta livre e dispara um cliente HTTP concorrente, sem dependências
+externas, contra várias cargas de trabalho:
+
+- html      páginas HTML (index.html, pages/)
+- article   os maiores artigos de blog/
+- assets    CSS e JS
+- api       GETs em /api/* (stats e busca)
+- contact   POSTs em /api/contact
+
+Para cada servidor e carga: requisições por segundo, latência
+(p50/p90/p99/máx), status HTTP e memória (RSS) do processo do servidor.
+O resultado é salvo em JSON; com --baseline, uma queda de RPS ou aumento
+de p95 além da tolerância em relação ao baseline faz o comando terminar
+com código 1.
+
+Uso:
+    python bench.py                              # todos os servidores
+    python bench.py --targets server --duration 5 --concurrency 32
+    python bench.py --targets server --keepalive  # conexões reaproveitadas
+    python bench.py --save-baseline bench-baseline.json
+    python bench.py --baseline bench-baseline.json
+"""
+
+import argparse
+import glob
+import http.client
+import itertools
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+DEFAULT_OUTPUT = os.path.join('.cache', 'bench-last.json')
+DEFAULT_DURATION = 3.0
+DEFAULT_CONCURRENCY = 16
+DEFAULT_TOLERANCE = 0.15
+DEFAULT_LATENCY_TOLERANCE = 0.25
+STARTUP_TIMEOUT = 20.0
+RSS_SAMPLE_INTERVAL = 0.1
+
+# {port} e {data_dir} são preenchidos na hora de subir o servidor; sem limite
+# de taxa, senão a carga "contact" mede só respostas 429. Sem log de acesso
+# (cada requisição iria para o log real do usuário) e sem watcher/live reload,
+# que não fazem parte do caminho medido
+SERVER_ARGS = ['--no-browser', '--data-dir', '{data_dir}', '--rate-limit', 'off',
+               '--access-log', 'off', '--no-watch']
+TARGETS = {
+    'server': ['server.py', '{port}'] + SERVER_ARGS,
+    'server-asyncio': ['server.py', '{port}'] + SERVER_ARGS + ['--engine', 'asyncio'],
+    'run': ['run.py', '{port}'],
+    'dev-server': ['dev-server.py', '{port}'],
+    'dev-simple': ['dev-simple.py', '{port}'],
+}
+DEFAULT_TARGETS = ('server', 'run', 'dev-server', 'dev-simple')
+WORKLOADS = ('html', 'article', 'assets', 'api', 'contact')
+
+
+def build_workloads(root):
+    """{carga: [(método, path, corpo)]} a partir dos arquivos do site"""
+    def paths(pattern):
+        return sorted('/' + os.path.relpath(path, root).replace(os.sep, '/')
+                      for path in glob.glob(os.path.join(root, pattern)))
+
+    articles = sorted(glob.glob(os.path.join(root, 'blog', '*.html')), key=os.path.getsize, reverse=True)
+    contact = urlencode({'name': 'Benchmark', 'email': 'bench@example.com',
+                         'subject': 'benchmark', 'message': 'Mensagem gerada pelo bench.py'}).encode()
+    return {
+        'html': [('GET', path, None) for path in ['/'] + paths('pages/*.html')],
+        'article': [('GET', '/' + os.path.relpath(path, root).replace(os.sep, '/'), None)
+                    for path in articles[:3]],
+        'assets': [('GET', path, None) for path in paths('assets/css/*.css') + paths('assets/js/*.js')],
+        'api': [('GET', '/api/stats', None), ('GET', '/api/blog/search?q=scrum', None),
+                ('GET', '/api/blog/search?q=sprint+planning', None)],
+        'contact': [('POST', '/api/contact', contact)],
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def read_rss_kb(pid):
+    """RSS atual do processo em KB (Linux: /proc), ou None"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class ServerProcess:
+    """Um ponto de entrada rodando em subprocesso, com amostragem de RSS"""
+
+    def __init__(self, root, name, python=sys.executable):
+        self.root = root
+        self.name = name
+        self.port = free_port()
+        self.data_dir = tempfile.mkdtemp(prefix='portal-bench-')
+        argv = [arg.format(port=self.port, data_dir=self.data_dir) for arg in TARGETS[name]]
+        # Qualquer outro dado privado (ex.: captura) também fica no diretório temporário
+        env = dict(os.environ, BROWSER='true', PYTHONUNBUFFERED='1', PORTAL_DATA_DIR=self.data_dir)
+        # stdin em PIPE: os servidores interativos esperam comandos sem encerrar
+        self.process = subprocess.Popen([python] + argv, cwd=root, env=env,
+                                        stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.DEVNULL)
+        self.rss_peak_kb = 0
+        self._sampling = threading.Event()
+        self._sampler = None
+
+    def wait_ready(self, timeout=STARTUP_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.name} encerrou ao iniciar (código {self.process.returncode})")
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=1)
+                conn.request('GET', '/')
+                conn.getresponse().read()
+                conn.close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError(f"{self.name} não respondeu em {timeout:.0f}s")
+
+    def rss_kb(self):
+        return read_rss_kb(self.process.pid)
+
+    def _sample(self):
+        while not self._sampling.wait(RSS_SAMPLE_INTERVAL):
+            rss = self.rss_kb()
+            if rss:
+                self.rss_peak_kb = max(self.rss_peak_kb, rss)
+
+    def start_sampling(self):
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._sampling.set()
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+
+def run_workload(port, requests, duration, concurrency, warmup=0.5, keepalive=False):
+    """Dispara a carga por `duration` segundos; retorna o resumo.
+
+    Com keepalive=True cada cliente reaproveita a sua conexão (como um
+    navegador); senão abre uma conexão por requisição.
+    """
+    cycle = itertools.cycle(requests)
+    lock = threading.Lock()
+    latencies, statuses = [], {}
+    totals = {'bytes': 0, 'errors': 0, 'connections': 0}
+
+    def one_request(conn, method, path, body):
+        headers = {'Accept-Encoding': 'gzip'}
+        if not keepalive:
+            headers['Connection'] = 'close'
+        if body is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        nbytes = len(response.read())
+        if response.will_close:
+            conn.close()
+        return response.status, nbytes
+
+    def worker(deadline, record):
+        local_latencies, local_statuses, local_bytes, local_errors = [], {}, 0, 0
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        connections = 0
+        while time.perf_counter() < deadline:
+            with lock:
+                method, path, body = next(cycle)
+            started = time.perf_counter()
+            if conn.sock is None:
+                connections += 1
+            try:
+                status, nbytes = one_request(conn, method, path, body)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                local_errors += 1
+                continue
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+            local_bytes += nbytes
+        conn.close()
+        if record:
+            with lock:
+                totals['connections'] += connections
+                latencies.extend(local_latencies)
+                for status, count in local_statuses.items():
+                    statuses[status] = statuses.get(status, 0) + count
+                totals['bytes'] += local_bytes
+                totals['errors'] += local_errors
+
+    def run(seconds, record):
+        deadline = time.perf_counter() + seconds
+        threads = [threading.Thread(target=worker, args=(deadline, record)) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    if warmup:
+        run(warmup, record=False)
+    elapsed = run(duration, record=True)
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status < 400)
+    return {
+        'requests': len(latencies),
+        'ok': ok,
+        'errors': totals['errors'],
+        'connections': totals['connections'],
+        'status': {str(status): count for status, count in sorted(statuses.items())},
+        'rps': round(len(latencies) / elapsed, 1),
+        'ok_rps': round(ok / elapsed, 1),
+        'mb_per_s': round(totals['bytes'] / elapsed / 1e6, 2),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 3),
+            'p90': round(percentile(latencies, 0.90) * 1000, 3),
+            'p95': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+def benchmark_target(root, name, workloads, duration, concurrency, keepalive=False):
+    server = ServerProcess(root, name)
+    try:
+        server.wait_ready()
+        result = {'rss_kb': {'idle': server.rss_kb()}, 'workloads': {}}
+        server.start_sampling()
+        for workload, requests in workloads.items():
+            summary = run_workload(server.port, requests, duration, concurrency, keepalive=keepalive)
+            result['workloads'][workload] = summary
+            print(f"   {workload:<8} {summary['rps']:>8.1f} rps  "
+                  f"p50 {summary['latency_ms']['p50']:>7.2f} ms  "
+                  f"p99 {summary['latency_ms']['p99']:>7.2f} ms  "
+                  f"status {summary['status']}  erros {summary['errors']}")
+        result['rss_kb']['peak'] = max(server.rss_peak_kb, server.rss_kb() or 0) or None
+        return result
+    finally:
+        server.stop()
+
+
+def compare(current, baseline, tolerance, latency_tolerance):
+    """Lista de regressões em relação ao baseline.
+
+    Só compara cargas que responderam com sucesso nas duas medições (um
+    servidor sem /api/contact não vira regressão).
+    """
+    regressions = []
+    for target, result in current['results'].items():
+        previous = baseline.get('results', {}).get(target)
+        if not previous:
+            continue
+        for workload, summary in result['workloads'].items():
+            before = previous['workloads'].get(workload)
+            if not before or not before['ok'] or not summary['ok']:
+                continue
+            if summary['ok_rps'] < before['ok_rps'] * (1 - tolerance):
+                regressions.append(f"{target}/{workload}: RPS {before['ok_rps']} -> {summary['ok_rps']}")
+            if summary['latency_ms']['p95'] > before['latency_ms']['p95'] * (1 + latency_tolerance):
+                regressions.append(f"{target}/{workload}: p95 {before['latency_ms']['p95']} ms -> "
+                                   f"{summary['latency_ms']['p95']} ms")
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='bench.py',
+                                     description='Benchmark dos servidores locais do Portal Scrum')
+    parser.add_argument('--targets', default=','.join(DEFAULT_TARGETS),
+                        help=f"servidores separados por vírgula: {', '.join(TARGETS)}")
+    parser.add_argument('--workloads', default=','.join(WORKLOADS),
+                        help=f"cargas separadas por vírgula: {', '.join(WORKLOADS)}")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help='segundos por carga')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='clientes simultâneos')
+    parser.add_argument('--keepalive', action='store_true',
+                        help='cada cliente reaproveita a conexão (HTTP/1.1 keep-alive)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='onde gravar o resultado (JSON)')
+    parser.add_argument('--baseline', help='compara com este resultado e falha se houver regressão')
+    parser.add_argument('--save-baseline', help='grava o resultado também como baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='queda de RPS tolerada (padrão: 0.15)')
+    parser.add_argument('--latency-tolerance', type=float, default=DEFAULT_LATENCY_TOLERANCE,
+                        help='aumento de p95 tolerado (padrão: 0.25)')
+    return parser.parse_args(argv)
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    root = os.path.dirname(os.path.abspath(__file__))
+    targets = [name.strip() for name in args.targets.split(',') if name.strip()]
+    unknown = [name for name in targets if name not in TARGETS]
+    if unknown:
+        print(f"❌ Servidor desconhecido: {', '.join(unknown)}")
+        return 2
+    all_workloads = build_workloads(root)
+    selected = [name.strip() for name in args.workloads.split(',') if name.strip()]
+    workloads = {name: all_workloads[name] for name in selected if name in all_workloads}
+
+    report = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'duration': args.duration,
+            'concurrency': args.concurrency,
+            'keepalive': args.keepalive,
+        },
+        'results': {},
+    }
+    print(f"⏱️  Benchmark: {args.duration:g}s por carga, {args.concurrency} clientes simultâneos"
+          + (" (keep-alive)" if args.keepalive else ""))
+    for name in targets:
+        print(f"🚀 {name}")
+        try:
+            report['results'][name] = benchmark_target(root, name, workloads,
+                                                       args.duration, args.concurrency,
+                                                       keepalive=args.keepalive)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            report['results'][name] = {'error': str(e), 'workloads': {}}
+            continue
+        rss = report['results'][name]['rss_kb']
+        if rss['idle']:
+            print(f"   memória  {rss['idle'] / 1024:.1f} MB ociosa, {(rss['peak'] or 0) / 1024:.1f} MB de pico")
+
+    write_json(os.path.join(root, args.output), report)
+    print(f"📄 Resultado: {args.output}")
+    if args.save_baseline:
+        write_json(os.path.join(root, args.save_baseline), report)
+        print(f"📌 Baseline salvo em {args.save_baseline}")
+
+    if args.baseline:
+        with open(os.path.join(root, args.baseline), encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.latency_tolerance)
+        if regressions:
+            print("❌ Regressões em relação ao baseline:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print("✅ Sem regressões em relação ao baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,630 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Build de Produção
+
+Gera uma árvore dist/ pronta para deploy:
+
+- CSS e JS minificados (sem dependências externas)
+- Nomes com hash do conteúdo (styles.<hash>.css) para cache imutável
+- Todas as referências em index.html, pages/ e blog/ reescritas para os
+  novos nomes; com --bundle, folhas de estilo e scripts consecutivos de
+  cada página viram um único arquivo
+- dist/manifest.json com o mapa nome original -> nome com hash
+- Minificação distribuída em um pool de processos
+- Build incremental: entradas com mtime/tamanho iguais ao build anterior
+  não são reprocessadas (.cache/build-state.json)
+- Com --critical-css, cada página ganha uma folha de estilo só com as
+  regras que usa e o CSS acima da dobra embutido no <head> (critical_css.py)
+- Antes de tudo, as páginas de templates/site/ são exportadas para
+  index.html, pages/ e blog/ (templating.py), que são a entrada do build
+
+Uso:
+    python server.py build [--out dist] [--bundle] [--critical-css] [--jobs N] [--clean]
+    python build.py [mesmas opções]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import critical_css
+import templating
+from content_cache import ASSET_REF_RE, FINGERPRINT_LENGTH, fingerprinted_name
+
+DEFAULT_OUT = 'dist'
+STATE_PATH = os.path.join('.cache', 'build-state.json')
+STATE_VERSION = 1
+
+HTML_SOURCES = ('index.html', 'pages/*.html', 'blog/*.html')
+ASSET_SOURCES = ('assets/css/*.css', 'assets/js/*.js', 'assets/images/*')
+COPY_SOURCES = ('robots.txt', 'sitemap.xml', 'netlify.toml')
+
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+CSS_IMPORT_RE = re.compile(r'@(?:charset|import)\s(?:"[^"]*"|\'[^\']*\'|[^;"\'])+;')
+STYLESHEET_GROUP_RE = re.compile(r'(?:[ \t]*<link rel="stylesheet" href="[^":]+\.css">\s*){2,}')
+SCRIPT_GROUP_RE = re.compile(r'(?:[ \t]*<script src="[^":]+\.js"></script>\s*){2,}')
+GROUP_ITEM_RE = re.compile(r'(?:href|src)="([^"]+)"')
+STYLESHEET_LINK_RE = re.compile(r'[ \t]*<link rel="stylesheet" href="([^":]+\.css)">\n?')
+SCRIPT_SRC_RE = re.compile(r'<script src="([^":]+\.js)"></script>')
+INLINE_SCRIPT_RE = re.compile(r'<script>(.*?)</script>', re.S)
+
+CRITICAL_CSS_TEMPLATE = (
+    '    <style>{critical}</style>\n'
+    '    <link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+    '    <noscript><link rel="stylesheet" href="{href}"></noscript>\n'
+)
+
+
+def content_hash(data):
+    """Mesmo hash usado pelo cache do servidor para URLs com fingerprint"""
+    return hashlib.sha256(data).hexdigest()[:FINGERPRINT_LENGTH]
+
+
+# ----------------------------------------------------------------------
+# Minificação
+# ----------------------------------------------------------------------
+
+def _css_tokens(source):
+    """Separa o CSS em trechos (é_string, texto), descartando comentários"""
+    parts, buffer, i = [], [], 0
+    while i < len(source):
+        char = source[i]
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = len(source) if end == -1 else end + 2
+            buffer.append(' ')
+            continue
+        if char in '"\'':
+            if buffer:
+                parts.append((False, ''.join(buffer)))
+                buffer = []
+            end = i + 1
+            while end < len(source) and source[end] != char:
+                end += 2 if source[end] == '\\' else 1
+            parts.append((True, source[i:end + 1]))
+            i = end + 1
+            continue
+        buffer.append(char)
+        i += 1
+    if buffer:
+        parts.append((False, ''.join(buffer)))
+    return parts
+
+
+def minify_css(source):
+    """Remove comentários e espaços desnecessários (strings preservadas)"""
+    output = []
+    for is_string, text in _css_tokens(source):
+        if is_string:
+            output.append(text)
+            continue
+        text = re.sub(r'\s+', ' ', text)
+        text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+        text = re.sub(r':\s+', ':', text)
+        text = text.replace(';}', '}')
+        output.append(text)
+    return ''.join(output).strip()
+
+
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^\n')
+REGEX_KEYWORD_RE = re.compile(r'(?:^|[^\w$])(?:return|typeof|case|do|else|in|of|void|yield)$')
+
+
+def minify_js(source):
+    """Minificação conservadora de JS.
+
+    Remove comentários e espaços redundantes respeitando strings, template
+    literals e expressões regulares. Quebras de linha são mantidas (uma por
+    sequência) para não depender de inserção automática de ponto e vírgula.
+    """
+    output = []
+    i, length = 0, len(source)
+
+    def last_significant():
+        for chunk in reversed(output):
+            stripped = chunk.rstrip(' ')
+            if stripped:
+                return stripped
+        return '\n'
+
+    def skip_template(start):
+        # start aponta para a crase de abertura; retorna o índice após a de fechamento
+        j = start + 1
+        while j < length:
+            if source[j] == '\\':
+                j += 2
+                continue
+            if source[j] == '`':
+                return j + 1
+            if source.startswith('${', j):
+                depth, j = 1, j + 2
+                while j < length and depth:
+                    if source[j] in '"\'':
+                        quote, j = source[j], j + 1
+                        while j < length and source[j] != quote:
+                            j += 2 if source[j] == '\\' else 1
+                    elif source[j] == '`':
+                        j = skip_template(j) - 1
+                    elif source[j] == '{':
+                        depth += 1
+                    elif source[j] == '}':
+                        depth -= 1
+                    j += 1
+                continue
+            j += 1
+        return j
+
+    while i < length:
+        char = source[i]
+        if char in '"\'':
+            end = i + 1
+            while end < length and source[end] != char and source[end] != '\n':
+                end += 2 if source[end] == '\\' else 1
+            output.append(source[i:end + 1])
+            i = end + 1
+        elif char == '`':
+            end = skip_template(i)
+            output.append(source[i:end])
+            i = end
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = length if end == -1 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = length if end == -1 else end + 2
+            output.append('\n' if '\n' in source[i:end] else ' ')
+            i = end
+        elif char == '/':
+            previous = last_significant()
+            if previous[-1] in REGEX_PRECEDERS or REGEX_KEYWORD_RE.search(previous):
+                end, in_class = i + 1, False
+                while end < length and source[end] != '\n':
+                    if source[end] == '\\':
+                        end += 2
+                        continue
+                    if source[end] == '[':
+                        in_class = True
+                    elif source[end] == ']':
+                        in_class = False
+                    elif source[end] == '/' and not in_class:
+                        break
+                    end += 1
+                end += 1
+                while end < length and source[end].isalpha():
+                    end += 1
+                output.append(source[i:end])
+                i = end
+            else:
+                output.append(char)
+                i += 1
+        elif char.isspace():
+            end = i
+            while end < length and source[end].isspace():
+                end += 1
+            output.append('\n' if '\n' in source[i:end] else ' ')
+            i = end
+        else:
+            end = i
+            while end < length and source[end] not in '"\'`/' and not source[end].isspace():
+                end += 1
+            output.append(source[i:end])
+            i = end
+
+    code = ''.join(output)
+    code = re.sub(r' ?\n[ \n]*', '\n', code)
+    return code.strip() + '\n'
+
+
+# ----------------------------------------------------------------------
+# Tarefas executadas no pool de processos
+# ----------------------------------------------------------------------
+
+def _rewrite_css_urls(css, css_key, asset_map, output_dir=None):
+    """Aponta url(...) de imagens para os nomes com hash.
+
+    output_dir: diretório onde o CSS final vai ficar, se diferente do original
+    (CSS crítico embutido na página).
+    """
+    base = posixpath.dirname(css_key)
+    output_dir = base if output_dir is None else output_dir
+
+    def replace(match):
+        ref = match.group(2)
+        if ':' in ref or ref.startswith(('/', '#')):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(base, ref))
+        if target not in asset_map:
+            return match.group(0)
+        new_ref = posixpath.relpath(asset_map[target], output_dir or '.')
+        return f'url({match.group(1)}{new_ref}{match.group(1)})'
+
+    return CSS_URL_RE.sub(replace, css)
+
+
+def process_asset(root, key, asset_map, minify):
+    """Minifica um CSS/JS; retorna (key, conteúdo, hash)"""
+    with open(os.path.join(root, key), 'rb') as f:
+        data = f.read()
+    if key.endswith('.css'):
+        text = data.decode('utf-8')
+        text = _rewrite_css_urls(text, key, asset_map)
+        data = (minify_css(text) if minify else text).encode('utf-8')
+    elif key.endswith('.js') and minify:
+        data = minify_js(data.decode('utf-8')).encode('utf-8')
+    return key, data, content_hash(data)
+
+
+def process_html(root, key, asset_map, bundle_map, page_style=None):
+    """Reescreve referências (e grupos agrupados) de uma página"""
+    with open(os.path.join(root, key), encoding='utf-8') as f:
+        html = f.read()
+    base = posixpath.dirname(key)
+
+    if page_style:
+        # Folhas locais -> CSS crítico embutido + folha da página sem bloquear
+        links = list(STYLESHEET_LINK_RE.finditer(html))
+        block = CRITICAL_CSS_TEMPLATE.format(
+            critical=page_style['critical'],
+            href=posixpath.relpath(page_style['stylesheet'], base or '.'))
+        for match in reversed(links):
+            replacement = block if match is links[0] else ''
+            html = html[:match.start()] + replacement + html[match.end():]
+
+    def resolve(ref):
+        if ':' in ref or ref.startswith('//'):
+            return None
+        return ref.lstrip('/') if ref.startswith('/') else posixpath.normpath(posixpath.join(base, ref))
+
+    def replace_group(match, template):
+        targets = tuple(resolve(ref) for ref in GROUP_ITEM_RE.findall(match.group(0)))
+        bundle = bundle_map.get(targets)
+        if bundle is None:
+            return match.group(0)
+        indent = re.match(r'[ \t]*', match.group(0)).group(0)
+        trailing = re.search(r'\s*$', match.group(0)).group(0)
+        return indent + template.format(posixpath.relpath(bundle, base or '.')) + trailing
+
+    if bundle_map:
+        html = STYLESHEET_GROUP_RE.sub(lambda m: replace_group(m, '<link rel="stylesheet" href="{}">'), html)
+        html = SCRIPT_GROUP_RE.sub(lambda m: replace_group(m, '<script src="{}"></script>'), html)
+
+    def replace_ref(match):
+        ref = match.group(2).decode('utf-8')
+        target = resolve(ref)
+        if target is None or target not in asset_map:
+            return match.group(0)
+        new_ref = posixpath.relpath(asset_map[target], base or '.')
+        return match.group(1) + new_ref.encode('utf-8') + match.group(3)
+
+    data = ASSET_REF_RE.sub(replace_ref, html.encode('utf-8'))
+    return key, data
+
+
+# ----------------------------------------------------------------------
+# Build
+# ----------------------------------------------------------------------
+
+class SiteBuilder:
+    """Orquestra o build: assets -> bundles -> HTML -> manifest"""
+
+    def __init__(self, root='.', out=DEFAULT_OUT, bundle=False, minify=True, jobs=None,
+                 critical=False):
+        self.root = os.path.abspath(root)
+        self.out = os.path.join(self.root, out)
+        self.bundle = bundle
+        self.minify = minify
+        self.critical = critical
+        self.jobs = jobs or os.cpu_count() or 2
+        self.state_path = os.path.join(self.root, STATE_PATH)
+        self.state = self._load_state()
+        self.report = {'processed': 0, 'skipped': 0, 'bytes_in': 0, 'bytes_out': 0,
+                       'blocking_css_before': 0, 'blocking_css_after': 0}
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == STATE_VERSION:
+                return state
+        except (OSError, ValueError):
+            pass
+        return {'version': STATE_VERSION, 'options': {}, 'files': {}}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+
+    def _collect(self, patterns):
+        keys = []
+        for pattern in patterns:
+            for path in sorted(glob.glob(os.path.join(self.root, pattern))):
+                if os.path.isfile(path):
+                    keys.append(os.path.relpath(path, self.root).replace(os.sep, '/'))
+        return keys
+
+    def _stat_key(self, key):
+        st = os.stat(os.path.join(self.root, key))
+        return [st.st_mtime_ns, st.st_size]
+
+    def _unchanged(self, key, extra=None):
+        """Entrada igual ao último build e saída ainda presente em dist/"""
+        previous = self.state['files'].get(key)
+        if not previous or previous['stat'] != self._stat_key(key) or previous.get('extra') != extra:
+            return None
+        if not os.path.exists(os.path.join(self.out, previous['output'])):
+            return None
+        return previous
+
+    def _write(self, rel, data):
+        path = os.path.join(self.out, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def _record(self, key, output, digest, extra=None):
+        self.state['files'][key] = {'stat': self._stat_key(key), 'output': output,
+                                    'hash': digest, 'extra': extra}
+
+    def build(self):
+        started = time.perf_counter()
+        options = {'bundle': self.bundle, 'minify': self.minify, 'critical_css': self.critical}
+        if self.state.get('options') != options:
+            self.state = {'version': STATE_VERSION, 'options': options, 'files': {}}
+        os.makedirs(self.out, exist_ok=True)
+
+        asset_keys = self._collect(ASSET_SOURCES)
+        html_keys = self._collect(HTML_SOURCES)
+        asset_map = {}
+        manifest = {}
+
+        # 1. Imagens e outros binários: só hash e cópia
+        code_keys = []
+        for key in asset_keys:
+            if key.endswith(('.css', '.js')):
+                code_keys.append(key)
+                continue
+            previous = self._unchanged(key)
+            if previous is None:
+                with open(os.path.join(self.root, key), 'rb') as f:
+                    data = f.read()
+                digest = content_hash(data)
+                output = fingerprinted_name(key, digest)
+                self._write(output, data)
+                self._record(key, output, digest)
+                self.report['processed'] += 1
+            else:
+                output = previous['output']
+                self.report['skipped'] += 1
+            asset_map[key] = output
+
+        # 2. CSS/JS: minificação no pool de processos
+        image_hashes = sorted((k, v) for k, v in asset_map.items())
+        image_signature = content_hash(json.dumps(image_hashes).encode())
+        pending = []
+        for key in code_keys:
+            extra = image_signature if key.endswith('.css') else None
+            previous = self._unchanged(key, extra)
+            if previous is None:
+                pending.append(key)
+            else:
+                asset_map[key] = previous['output']
+                self.report['skipped'] += 1
+
+        minified = {}
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            futures = [pool.submit(process_asset, self.root, key, dict(asset_map), self.minify)
+                       for key in pending]
+            for future in futures:
+                key, data, digest = future.result()
+                output = fingerprinted_name(key, digest)
+                self._write(output, data)
+                extra = image_signature if key.endswith('.css') else None
+                self._record(key, output, digest, extra)
+                asset_map[key] = output
+                minified[key] = data
+                self.report['processed'] += 1
+                self.report['bytes_in'] += os.path.getsize(os.path.join(self.root, key))
+                self.report['bytes_out'] += len(data)
+
+            # 3. Bundles por página (grupos de CSS/JS consecutivos)
+            bundle_map = self._build_bundles(html_keys, asset_map, minified) if self.bundle else {}
+
+            # 3b. CSS por página + CSS crítico (resultados cacheados por página)
+            page_styles = self._build_page_styles(html_keys, asset_map, pool) if self.critical else {}
+
+            # 4. HTML: reescrita de referências no pool
+            signature = content_hash(json.dumps([sorted(asset_map.items()),
+                                                 sorted((list(k), v) for k, v in bundle_map.items()),
+                                                 sorted(page_styles.items())]).encode())
+            pending_html = []
+            for key in html_keys:
+                previous = self._unchanged(key, signature)
+                if previous is None:
+                    pending_html.append(key)
+                else:
+                    self.report['skipped'] += 1
+            futures = [pool.submit(process_html, self.root, key, asset_map, bundle_map,
+                                   page_styles.get(key))
+                       for key in pending_html]
+            for future in futures:
+                key, data = future.result()
+                self._write(key, data)
+                self._record(key, key, content_hash(data), signature)
+                self.report['processed'] += 1
+
+        # 5. Arquivos copiados como estão
+        for key in self._collect(COPY_SOURCES):
+            shutil.copy2(os.path.join(self.root, key), os.path.join(self.out, key))
+
+        for key, output in sorted(asset_map.items()):
+            manifest[key] = output
+        for targets, output in sorted(bundle_map.items()):
+            manifest['+'.join(targets)] = output
+        for page, style in sorted(page_styles.items()):
+            manifest[f'{page}#css'] = style['stylesheet']
+        self._remove_stale(set(asset_map.values()) | set(bundle_map.values())
+                           | {style['stylesheet'] for style in page_styles.values()})
+
+        with open(os.path.join(self.out, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump({'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'options': options, 'assets': manifest}, f, indent=2, sort_keys=True)
+        self._save_state()
+        self.report['seconds'] = round(time.perf_counter() - started, 3)
+        return self.report
+
+    def _build_page_styles(self, html_keys, asset_map, pool):
+        """Gera a folha reduzida e o CSS crítico de cada página"""
+        cache = critical_css.CriticalCssCache(os.path.join(self.root, critical_css.CACHE_PATH))
+        pages, futures = {}, []
+        for key in html_keys:
+            with open(os.path.join(self.root, key), encoding='utf-8') as f:
+                html = f.read()
+            base = posixpath.dirname(key)
+            local = lambda refs: [posixpath.normpath(posixpath.join(base, ref)) for ref in refs]
+            stylesheets = [ref for ref in local(STYLESHEET_LINK_RE.findall(html)) if ref in asset_map]
+            if not stylesheets:
+                continue
+            scripts = [ref for ref in local(SCRIPT_SRC_RE.findall(html)) if ref in asset_map]
+            inline = INLINE_SCRIPT_RE.findall(html)
+            inputs = critical_css.inputs_key(self.root, [key] + stylesheets + scripts)
+            pages[key] = (inputs, stylesheets)
+            result = cache.get(key, inputs)
+            if result is None:
+                futures.append(pool.submit(critical_css.prune_page_files, self.root, key,
+                                           stylesheets, scripts, inline))
+            else:
+                pages[key] += (result,)
+        for future in futures:
+            key, result = future.result()
+            cache.put(key, pages[key][0], result)
+            pages[key] += (result,)
+        cache.save()
+
+        page_styles = {}
+        for key, (_, stylesheets, result) in sorted(pages.items()):
+            base = posixpath.dirname(key)
+            pruned = ''.join(_rewrite_css_urls(css, path, asset_map) + '\n'
+                             for path, css in result['pruned'])
+            critical = ''.join(_rewrite_css_urls(css, path, asset_map, output_dir=base) + '\n'
+                               for path, css in result['critical'])
+            # @import/@charset só valem no início da folha de estilo
+            pruned = '\n'.join(CSS_IMPORT_RE.findall(pruned) + [CSS_IMPORT_RE.sub('', pruned)])
+            if self.minify:
+                pruned, critical = minify_css(pruned), minify_css(critical)
+            data = pruned.encode('utf-8')
+            slug = posixpath.splitext(key)[0].replace('/', '-')
+            output = fingerprinted_name(f'assets/css/page-{slug}.css', content_hash(data))
+            self._write(output, data)
+            page_styles[key] = {'critical': critical, 'stylesheet': output}
+            self.report['blocking_css_before'] += sum(
+                os.path.getsize(os.path.join(self.out, asset_map[path])) for path in stylesheets)
+            self.report['blocking_css_after'] += len(critical.encode('utf-8'))
+        self.report['critical_cache'] = {'hits': cache.hits, 'misses': cache.misses}
+        return page_styles
+
+    def _build_bundles(self, html_keys, asset_map, minified):
+        """Cria um arquivo por combinação de assets consecutivos nas páginas"""
+        groups = set()
+        # Com --critical-css as folhas de cada página já são substituídas
+        regexes = (SCRIPT_GROUP_RE,) if self.critical else (STYLESHEET_GROUP_RE, SCRIPT_GROUP_RE)
+        for key in html_keys:
+            with open(os.path.join(self.root, key), encoding='utf-8') as f:
+                html = f.read()
+            base = posixpath.dirname(key)
+            for regex in regexes:
+                for match in regex.finditer(html):
+                    refs = GROUP_ITEM_RE.findall(match.group(0))
+                    targets = tuple(posixpath.normpath(posixpath.join(base, ref)) for ref in refs)
+                    if all(target in asset_map for target in targets):
+                        groups.add(targets)
+
+        bundle_map = {}
+        for targets in sorted(groups):
+            parts = []
+            for target in targets:
+                data = minified.get(target)
+                if data is None:
+                    with open(os.path.join(self.out, asset_map[target]), 'rb') as f:
+                        data = f.read()
+                parts.append(data.decode('utf-8'))
+            if targets[0].endswith('.css'):
+                # @import/@charset só valem no início da folha de estilo
+                imports = [rule for part in parts for rule in CSS_IMPORT_RE.findall(part)]
+                body = '\n'.join(CSS_IMPORT_RE.sub('', part) for part in parts)
+                data = ('\n'.join(imports + [body])).encode('utf-8')
+                directory, ext = 'assets/css', '.css'
+            else:
+                data = ';\n'.join(part.rstrip().rstrip(';') for part in parts).encode('utf-8') + b';\n'
+                directory, ext = 'assets/js', '.js'
+            output = fingerprinted_name(f'{directory}/bundle{ext}', content_hash(data))
+            self._write(output, data)
+            bundle_map[targets] = output
+        return bundle_map
+
+    def _remove_stale(self, live_outputs):
+        """Apaga de dist/assets versões com hash que não são mais referenciadas"""
+        assets_dir = os.path.join(self.out, 'assets')
+        for directory, _, files in os.walk(assets_dir):
+            for name in files:
+                rel = os.path.relpath(os.path.join(directory, name), self.out).replace(os.sep, '/')
+                if rel not in live_outputs:
+                    os.remove(os.path.join(directory, name))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='server.py build',
+                                     description='Gera dist/ com assets minificados e com hash')
+    parser.add_argument('--out', default=DEFAULT_OUT, help='diretório de saída (padrão: dist)')
+    parser.add_argument('--bundle', action='store_true', help='agrupa CSS/JS consecutivos de cada página')
+    parser.add_argument('--no-minify', action='store_true', help='apenas hash, sem minificar')
+    parser.add_argument('--critical-css', action='store_true',
+                        help='CSS reduzido por página + CSS crítico embutido no <head>')
+    parser.add_argument('--jobs', type=int, default=None, help='processos de minificação (padrão: nº de CPUs)')
+    parser.add_argument('--clean', action='store_true', help='apaga a saída e ignora o build anterior')
+    args = parser.parse_args(argv)
+
+    if args.clean:
+        shutil.rmtree(args.out, ignore_errors=True)
+        for path in (STATE_PATH, critical_css.CACHE_PATH):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    try:
+        templating.export_site('.')
+    except templating.TemplateError as e:
+        print(f"❌ Template inválido: {e}")
+        return 1
+
+    print(f"🏗️  Gerando {args.out}/ ...")
+    builder = SiteBuilder('.', out=args.out, bundle=args.bundle,
+                          minify=not args.no_minify, jobs=args.jobs, critical=args.critical_css)
+    report = builder.build()
+    saved = report['bytes_in'] - report['bytes_out']
+    print(f"✅ Build concluído em {report['seconds']}s: {report['processed']} processados, "
+          f"{report['skipped']} sem mudanças")
+    if report['bytes_in']:
+        print(f"📉 CSS/JS: {report['bytes_in'] / 1024:.1f} KB -> {report['bytes_out'] / 1024:.1f} KB "
+              f"({saved * 100 / report['bytes_in']:.0f}% menor)")
+    if report['blocking_css_before']:
+        pages = report['critical_cache']
+        print(f"🎨 CSS que bloqueia a renderização (soma das páginas): "
+              f"{report['blocking_css_before'] / 1024:.1f} KB -> {report['blocking_css_after'] / 1024:.1f} KB "
+              f"({pages['misses']} páginas analisadas, {pages['hits']} do cache)")
+    print(f"📄 Manifest: {os.path.join(args.out, 'manifest.json')}")
+    return 0
+
+
+if __name__ == '__main__':
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main())
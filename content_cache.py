@@ -0,0 +1,581 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Cache de Conteúdo Estático em Memória
+
+Mantém em memória os arquivos servidos com mais frequência (index.html,
+pages/, blog/ e assets/) junto com o content type e os headers já prontos.
+
+- Invalidação barata: no máximo um os.stat() por arquivo a cada
+  `check_interval` segundos, comparando mtime e tamanho
+- Orçamento de memória: o total de bytes em cache é limitado e as entradas
+  menos usadas recentemente (LRU) são descartadas primeiro
+- Compressão prévia: arquivos de texto ganham variantes gzip e deflate
+  geradas uma única vez ao entrar no cache, escolhidas via Accept-Encoding
+- Validação: cada entrada tem um ETag forte (hash do conteúdo) e os assets
+  podem ser pedidos por URL com fingerprint (styles.<hash>.css); no modo
+  produção o HTML em cache já aponta para essas URLs
+- Páginas com template (templates/site/) vêm do renderer em vez do disco;
+  a versão da entrada é o mtime mais recente entre as dependências
+- Manifesto persistido (site_manifest): hash, ETag e variantes comprimidas
+  sobrevivem ao restart; no boot só o que mudou de stat é recalculado
+- Preload: cada página HTML guarda a lista dos seus CSS/JS críticos
+  (preload_hints), extraída do HTML final uma vez por versão da entrada
+- Thread-safe: pode ser compartilhado por todos os workers
+"""
+
+import mimetypes
+import os
+import gzip
+import hashlib
+import posixpath
+import re
+import stat
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import unquote
+
+from preload_hints import extract_preloads
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRY_BYTES = 1024 * 1024
+DEFAULT_CHECK_INTERVAL = 1.0
+
+# Compressão: só vale a pena para texto acima de um tamanho mínimo
+MIN_COMPRESS_BYTES = 512
+COMPRESSION_LEVEL = 9
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json',
+                      'application/xml', 'image/svg+xml')
+ENCODINGS = ('gzip', 'deflate')
+
+# URLs com fingerprint: assets/css/styles.<10 hex>.css
+FINGERPRINT_LENGTH = 10
+FINGERPRINT_RE = re.compile(r'^(assets/.+)\.([0-9a-f]{%d})(\.[A-Za-z0-9]+)$' % FINGERPRINT_LENGTH)
+ASSET_REF_RE = re.compile(rb'(\b(?:href|src)=["\'])([^"\'#?]+)((?:\?[^"\']*)?["\'])')
+
+CACHEABLE_FILES = ('index.html',)
+CACHEABLE_PREFIXES = ('pages/', 'blog/', 'assets/')
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+    '.json': 'application/json; charset=utf-8',
+    '.svg': 'image/svg+xml',
+    '.xml': 'application/xml; charset=utf-8',
+    '.txt': 'text/plain; charset=utf-8',
+}
+
+
+def guess_content_type(path):
+    """Content type usado pelo portal (com charset para arquivos de texto)"""
+    ext = posixpath.splitext(path)[1].lower()
+    if ext in CONTENT_TYPES:
+        return CONTENT_TYPES[ext]
+    guessed, _ = mimetypes.guess_type(path)
+    return guessed or 'application/octet-stream'
+
+
+def cache_key_for(url_path):
+    """Converte o path da URL em caminho relativo normalizado (ou None)"""
+    path = unquote(url_path.split('?', 1)[0].split('#', 1)[0])
+    if path.endswith('/'):
+        return 'index.html' if path == '/' else None
+    path = posixpath.normpath(path).lstrip('/')
+    if not path or path.startswith('..') or '\x00' in path:
+        return None
+    return path
+
+
+def is_cacheable(key):
+    return key in CACHEABLE_FILES or key.startswith(CACHEABLE_PREFIXES)
+
+
+def is_compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body, encoding):
+    """Comprime `body` no formato do Content-Encoding pedido"""
+    if encoding == 'gzip':
+        return gzip.compress(body, COMPRESSION_LEVEL, mtime=0)
+    if encoding == 'deflate':
+        # "deflate" no HTTP é o formato zlib (RFC 1950)
+        return zlib.compress(body, COMPRESSION_LEVEL)
+    raise ValueError(f"Encoding não suportado: {encoding}")
+
+
+def negotiate_encoding(accept_encoding, available):
+    """Escolhe a melhor codificação de `available` segundo o Accept-Encoding.
+
+    Respeita q-values (q=0 recusa) e o curinga "*"; empate favorece a ordem
+    de `available` (gzip antes de deflate). Retorna None para identity.
+    """
+    if not accept_encoding or not available:
+        return None
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def fingerprinted_name(ref, fingerprint):
+    """Insere o fingerprint antes da extensão: styles.css -> styles.<fp>.css"""
+    base, ext = posixpath.splitext(ref)
+    return f"{base}.{fingerprint}{ext}"
+
+
+def etag_matches(if_none_match, etag):
+    """Comparação fraca do If-None-Match (ignora W/ e o sufixo da variante)"""
+    base = etag.strip('"').split('-', 1)[0]
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag.strip('"').split('-', 1)[0] == base:
+            return True
+    return False
+
+
+def not_modified(if_none_match, if_modified_since, etag, mtime_ns):
+    """True se a cópia do cliente ainda é válida (resposta 304)"""
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        return mtime_ns // 1_000_000_000 <= since
+    return False
+
+
+def parse_range(header, size):
+    """Interpreta um header Range de bytes para um arquivo de `size` bytes.
+
+    Retorna (início, fim) inclusivos, ou None quando o header deve ser
+    ignorado (unidade desconhecida). Levanta ValueError para intervalos
+    impossíveis e para pedidos com múltiplos intervalos (resposta 416).
+    """
+    unit, _, spec = header.strip().partition('=')
+    if unit.strip().lower() != 'bytes':
+        return None
+    if ',' in spec:
+        raise ValueError("Múltiplos intervalos não são suportados")
+    first, sep, last = spec.strip().partition('-')
+    if not sep:
+        raise ValueError("Intervalo malformado")
+    first, last = first.strip(), last.strip()
+    if not first:
+        # Sufixo: últimos N bytes
+        length = int(last)
+        if length <= 0 or size == 0:
+            raise ValueError("Intervalo vazio")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Intervalo fora do arquivo")
+    return start, min(end, size - 1)
+
+
+def if_range_matches(if_range, etag, last_modified):
+    """If-Range: o intervalo só vale se o validador ainda for o atual"""
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"'):
+        return if_range == f'"{etag}"'
+    return if_range == last_modified
+
+
+class CacheEntry:
+    """Arquivo em cache: conteúdo, metadados do stat e headers prontos"""
+
+    __slots__ = ('key', 'body', 'content_type', 'size', 'mtime_ns', 'etag',
+                 'last_modified', 'headers', 'checked_at', 'variants', 'deps', 'preload')
+
+    def __init__(self, key, body, content_type, size, mtime_ns, compress_variants=True, deps=(),
+                 etag=None, packed=None, preload=None):
+        self.key = key
+        self.body = body
+        self.content_type = content_type
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.deps = deps
+        self.checked_at = time.monotonic()
+        # etag/packed vêm prontos do manifesto persistido (sem hash nem compressão)
+        self.etag = etag or hashlib.sha256(body).hexdigest()[:20]
+        self.last_modified = formatdate(mtime_ns // 1_000_000_000, usegmt=True)
+        if preload is None:
+            preload = extract_preloads(body, key) if content_type.startswith('text/html') else ()
+        self.preload = preload
+
+        common = [('Content-type', content_type),
+                  ('Last-Modified', self.last_modified)]
+        self.variants = {}
+        if packed is None and compress_variants and is_compressible(content_type) \
+                and len(body) >= MIN_COMPRESS_BYTES:
+            packed = {}
+            for encoding in ENCODINGS:
+                data = compress(body, encoding)
+                if len(data) < len(body) * 0.9:
+                    packed[encoding] = data
+        if packed:
+            common.append(('Vary', 'Accept-Encoding'))
+            for encoding in ENCODINGS:
+                if encoding in packed:
+                    self.variants[encoding] = (packed[encoding], tuple(common) + (
+                        ('ETag', f'"{self.etag}-{encoding}"'),
+                        ('Content-Encoding', encoding),
+                        ('Content-Length', str(len(packed[encoding]))),
+                    ))
+        self.headers = tuple(common) + (
+            ('ETag', f'"{self.etag}"'),
+            ('Content-Length', str(len(body))),
+        )
+
+    @property
+    def fingerprint(self):
+        return self.etag[:FINGERPRINT_LENGTH]
+
+    def not_modified(self, if_none_match, if_modified_since):
+        """True se a cópia do cliente ainda é válida (resposta 304)"""
+        return not_modified(if_none_match, if_modified_since, self.etag, self.mtime_ns)
+
+    def select(self, accept_encoding):
+        """Retorna (body, headers) da melhor variante para o cliente"""
+        encoding = negotiate_encoding(accept_encoding, tuple(self.variants))
+        if encoding is None:
+            return self.body, self.headers
+        return self.variants[encoding]
+
+    @property
+    def nbytes(self):
+        return len(self.body) + sum(len(body) for body, _ in self.variants.values())
+
+
+class ContentCache:
+    """Cache LRU com orçamento de bytes e invalidação por mtime/tamanho"""
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES,
+                 max_entry_bytes=DEFAULT_MAX_ENTRY_BYTES,
+                 check_interval=DEFAULT_CHECK_INTERVAL, compress_variants=True,
+                 fingerprint_html=False, html_filters=(), renderer=None, manifest=None):
+        self.root = os.path.abspath(root)
+        self.renderer = renderer
+        self.manifest = manifest
+        self.html_filters = tuple(html_filters)
+        self.compress_variants = compress_variants
+        self.fingerprint_html = fingerprint_html
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.check_interval = check_interval
+        # Entradas do manifesto só valem para a mesma configuração de HTML/compressão
+        self.profile = ';'.join([f'compress={int(compress_variants)}',
+                                 f'fingerprint={int(fingerprint_html)}']
+                                + [getattr(f, '__qualname__', repr(f)) for f in self.html_filters])
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _fs_path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def get(self, key):
+        """Retorna a CacheEntry de `key` ou None se não puder ser cacheada"""
+        return self.lookup(key)[0]
+
+    def lookup(self, key):
+        """Como get(), mas retorna (entry, hit) para quem mede o cache"""
+        if not is_cacheable(key):
+            return None, False
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if now - entry.checked_at < self.check_interval:
+                    self.hits += 1
+                    return entry, True
+
+        if self.renderer is not None and self.renderer.handles(key):
+            return self._lookup_rendered(key, entry, now)
+
+        try:
+            st = os.stat(self._fs_path(key))
+        except OSError:
+            self.invalidate(key)
+            if self.manifest is not None:
+                self.manifest.forget(key)
+            return None, False
+
+        if (entry is not None and entry.mtime_ns == st.st_mtime_ns
+                and entry.size == st.st_size and self._deps_fresh(entry)):
+            entry.checked_at = now
+            self._count(hit=True)
+            return entry, True
+
+        self._count(hit=False)
+        return self._load(key, st), False
+
+    def _count(self, hit):
+        # Workers do pool contam em paralelo: `+=` sem lock perde incrementos
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _lookup_rendered(self, key, entry, now):
+        """Página de template: o renderer decide se a versão em cache vale"""
+        page = self.renderer.render(key)
+        if page is None:
+            self.invalidate(key)
+            return None, False
+        if (entry is not None and entry.mtime_ns == page.mtime_ns
+                and entry.size == len(page.body) and self._deps_fresh(entry)):
+            entry.checked_at = now
+            self._count(hit=True)
+            return entry, True
+        self._count(hit=False)
+        restored = self._restore(key, page.mtime_ns, len(page.body), lambda: page.body)
+        if restored is not None:
+            return restored, False
+        return self._store_body(key, page.body, len(page.body), page.mtime_ns, rendered=True), False
+
+    def _read(self, key):
+        with open(self._fs_path(key), 'rb') as f:
+            return f.read()
+
+    def _load(self, key, st):
+        """Lê o arquivo do disco e insere no cache"""
+        if not stat.S_ISREG(st.st_mode) or st.st_size > self.max_entry_bytes:
+            self.invalidate(key)
+            return None
+        try:
+            restored = self._restore(key, st.st_mtime_ns, st.st_size, lambda: self._read(key))
+            if restored is not None:
+                return restored
+            body = self._read(key)
+        except OSError:
+            self.invalidate(key)
+            return None
+        return self._store_body(key, body, st.st_size, st.st_mtime_ns)
+
+    def _restore(self, key, mtime_ns, size, read_source):
+        """Monta a entrada a partir do manifesto persistido (sem hash nem compressão)"""
+        if self.manifest is None:
+            return None
+        saved = self.manifest.find(key, mtime_ns, size, self.profile)
+        if saved is None:
+            return None
+        packed = {}
+        for encoding in saved['variants']:
+            packed[encoding] = self.manifest.read_blob(saved['etag'], encoding)
+            if packed[encoding] is None:
+                return None
+        # HTML reescrito fica no manifesto; os demais são o próprio arquivo
+        body = self.manifest.read_blob(saved['etag'], 'body') if saved['stored_body'] else read_source()
+        if body is None:
+            return None
+        preload = saved.get('preload')
+        entry = CacheEntry(key, body, saved['content_type'], size, mtime_ns,
+                           deps=tuple(tuple(dep) for dep in saved['deps']),
+                           etag=saved['etag'], packed=packed,
+                           preload=tuple(tuple(hint) for hint in preload) if preload is not None else None)
+        if not self._deps_fresh(entry):
+            return None
+        self._store(entry)
+        return entry
+
+    def _store_body(self, key, body, size, mtime_ns, rendered=False):
+        """Aplica as transformações do HTML e insere no cache"""
+        content_type = guess_content_type(key)
+        deps = ()
+        source = body
+        if content_type.startswith('text/html'):
+            if self.fingerprint_html:
+                body, deps = self._fingerprint_refs(key, body)
+            for html_filter in self.html_filters:
+                body = html_filter(body)
+
+        entry = CacheEntry(key, body, content_type, size, mtime_ns,
+                           compress_variants=self.compress_variants, deps=deps)
+        self._store(entry)
+        if self.manifest is not None:
+            self.manifest.record(entry, self.profile, stored_body=rendered or body is not source)
+        return entry
+
+    def _cacheable_files(self):
+        """(key, stat) de cada arquivo que o cache serviria"""
+        for key in CACHEABLE_FILES:
+            try:
+                yield key, os.stat(self._fs_path(key))
+            except OSError:
+                pass
+        for prefix in CACHEABLE_PREFIXES:
+            for dirpath, dirnames, filenames in os.walk(self._fs_path(prefix.rstrip('/'))):
+                dirnames.sort()
+                rel_dir = os.path.relpath(dirpath, self.root).replace(os.sep, '/')
+                for filename in sorted(filenames):
+                    try:
+                        st = os.stat(os.path.join(dirpath, filename))
+                    except OSError:
+                        continue
+                    yield f'{rel_dir}/{filename}', st
+
+    def warm(self):
+        """Recalcula só o que mudou desde o manifesto salvo (roda em background).
+
+        Arquivos com o stat igual ao do manifesto não são abertos: ficam para
+        o primeiro pedido. Páginas de template já registradas só são
+        renderizadas (compila os templates); as variantes saem do manifesto
+        no primeiro pedido.
+        """
+        if self.manifest is None:
+            return None
+        started = time.perf_counter()
+        fresh = rebuilt = 0
+        for key, st in self._cacheable_files():
+            if not stat.S_ISREG(st.st_mode) or st.st_size > self.max_entry_bytes:
+                continue
+            if self.renderer is not None and self.renderer.handles(key):
+                continue
+            if self.manifest.find(key, st.st_mtime_ns, st.st_size, self.profile) is not None:
+                fresh += 1
+                continue
+            if self.get(key) is not None:
+                rebuilt += 1
+        if self.renderer is not None:
+            for key in sorted(self.renderer.pages):
+                if self.manifest.known(key, self.profile):
+                    self.renderer.render(key)
+                elif self.get(key) is not None:
+                    rebuilt += 1
+        self.manifest.warm = {'fresh': fresh, 'rebuilt': rebuilt,
+                              'seconds': round(time.perf_counter() - started, 3)}
+        return self.manifest.warm
+
+    def _fingerprint_refs(self, key, body):
+        """Troca referências a assets/ no HTML pelas URLs com fingerprint"""
+        base_dir = posixpath.dirname(key)
+        deps = []
+
+        def replace(match):
+            ref = match.group(2).decode('utf-8', 'replace')
+            if ':' in ref or ref.startswith('//'):
+                return match.group(0)
+            target = ref.lstrip('/') if ref.startswith('/') else posixpath.normpath(posixpath.join(base_dir, ref))
+            if not target.startswith('assets/'):
+                return match.group(0)
+            asset = self.get(target)
+            if asset is None:
+                return match.group(0)
+            deps.append((target, asset.etag))
+            new_ref = fingerprinted_name(ref, asset.fingerprint).encode('utf-8')
+            return match.group(1) + new_ref + match.group(3)
+
+        return ASSET_REF_RE.sub(replace, body), tuple(deps)
+
+    def known_preloads(self, key):
+        """Preloads da última versão conhecida de `key`, sem stat nem render.
+
+        Serve para o 103 Early Hints, enviado antes de o lookup() descobrir
+        se a página mudou; a resposta final leva a lista da entrada atual.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            return entry.preload
+        if self.manifest is not None:
+            return self.manifest.preloads(key, self.profile)
+        return ()
+
+    def _deps_fresh(self, entry):
+        """HTML reescrito continua válido enquanto os assets não mudarem"""
+        for dep_key, dep_etag in entry.deps:
+            dep = self.get(dep_key)
+            if dep is None or dep.etag != dep_etag:
+                return False
+        return True
+
+    def get_fingerprinted(self, key):
+        """Resolve uma URL com fingerprint; retorna (entry, fingerprint_confere)"""
+        match = FINGERPRINT_RE.match(key)
+        if not match:
+            return None, False
+        entry = self.get(match.group(1) + match.group(3))
+        if entry is None:
+            return None, False
+        return entry, entry.fingerprint == match.group(2)
+
+    def _store(self, entry):
+        with self._lock:
+            old = self._entries.pop(entry.key, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+            self._entries[entry.key] = entry
+            self.total_bytes += entry.nbytes
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Remove uma entrada (ex.: arquivo alterado ou apagado)"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry.nbytes
+            # HTML que aponta para o asset com fingerprint também fica inválido
+            dependents = [other for other in self._entries.values()
+                          if any(dep_key == key for dep_key, _ in other.deps)]
+            for other in dependents:
+                del self._entries[other.key]
+                self.total_bytes -= other.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            entries, total_bytes = len(self._entries), self.total_bytes
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+        lookups = hits + misses
+        stats = {
+            "entries": entries,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+        if self.manifest is not None:
+            stats["manifest"] = self.manifest.stats()
+        return stats
@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Crawler do Site: Peso por Página e Links Quebrados
+
+Percorre o site no servidor local (que precisa estar rodando) a partir de
+/ e do sitemap.xml, baixando páginas e recursos em paralelo como um
+navegador faria (Accept-Encoding: gzip, conexões keep-alive):
+
+- Páginas: <a href>, canonical/alternate e as URLs do sitemap (o domínio
+  de produção do sitemap é tratado como o servidor local)
+- Recursos: CSS, JS, imagens (src/srcset), ícones, preloads e os url() /
+  @import dos CSS, cada um baixado uma única vez
+- Por página: bytes transferidos (HTML + recursos, com headers e
+  redirects), número de requisições e latência (HTML e caminho crítico
+  estimado: HTML + a cadeia de recursos mais lenta)
+- Links quebrados: qualquer referência interna com status >= 400 ou erro,
+  com as páginas que apontam para ela
+- Dados privados: /data/, /.cache/ e dotfiles (também codificados ou via
+  "..") precisam responder 404
+
+O comando termina com código 1 se alguma página passar do orçamento
+(--budget-kb, --budget-requests, --budget-ms), apontar para um recurso
+inexistente ou se algum caminho privado for entregue. O relatório completo
+vai para .cache/crawl-last.json.
+
+Uso:
+    python server.py crawl                          # http://localhost:8000
+    python server.py crawl --url http://localhost:3000 --concurrency 16
+    python server.py crawl --budget-kb 300 --budget-requests 25
+"""
+
+import argparse
+import gzip
+import http.client
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+DEFAULT_URL = 'http://localhost:8000'
+DEFAULT_CONCURRENCY = 8
+DEFAULT_BUDGET_KB = 512
+DEFAULT_BUDGET_REQUESTS = 40
+DEFAULT_MAX_PAGES = 500
+DEFAULT_OUTPUT = os.path.join('.cache', 'crawl-last.json')
+MAX_REDIRECTS = 5
+REQUEST_TIMEOUT = 10.0
+
+# <link rel=...> que o navegador baixa junto com a página
+ASSET_RELS = frozenset(('stylesheet', 'icon', 'shortcut', 'apple-touch-icon', 'preload',
+                        'modulepreload', 'manifest', 'mask-icon'))
+# <link rel=...> que só apontam para outra página (verificadas, não pesam)
+LINK_RELS = frozenset(('canonical', 'alternate', 'next', 'prev'))
+
+# Aspas em alternativas separadas: data URIs de SVG têm url(#id) com a outra aspa dentro
+CSS_URL_RE = re.compile(r'''url\(\s*(?:'([^']*)'|"([^"]*)"|([^'")\s]+))\s*\)|@import\s+(?:'([^']+)'|"([^"]+)")''')
+SITEMAP_LOC_RE = re.compile(r'<loc>\s*([^<\s]+)\s*</loc>')
+SKIPPED_SCHEMES = ('mailto:', 'tel:', 'javascript:', 'data:', 'sms:', 'whatsapp:')
+
+# Dados de visitantes, caches e dotfiles: o servidor tem que responder 404
+# (inclusive com o caminho codificado ou passando por "..")
+PRIVATE_PROBES = (
+    '/data/',
+    '/data/submissions/',
+    '/data/submissions/subscribers.idx',
+    '/data/logs/access.jsonl',
+    '/data/capture/traffic.jsonl',
+    '/%64ata/submissions/',
+    '/pages/../data/submissions/',
+    '/.cache/site-manifest.json',
+    '/.git/HEAD',
+)
+
+
+class Resource:
+    """Resultado de um GET (depois de seguir os redirects internos)"""
+
+    __slots__ = ('path', 'status', 'content_type', 'transfer_bytes', 'body_bytes', 'ms',
+                 'requests', 'error', 'body', 'final_path')
+
+    def __init__(self, path):
+        self.path = path
+        self.status = None
+        self.content_type = ''
+        self.transfer_bytes = 0
+        self.body_bytes = 0
+        self.ms = 0.0
+        self.requests = 0
+        self.error = None
+        self.body = b''
+        self.final_path = path
+
+    @property
+    def ok(self):
+        return self.error is None and self.status is not None and self.status < 400
+
+    @property
+    def is_html(self):
+        return self.content_type.startswith('text/html')
+
+    @property
+    def is_css(self):
+        return self.content_type.startswith('text/css')
+
+
+class _RefParser(HTMLParser):
+    """Coleta links de página e recursos de um HTML"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []
+        self.assets = []
+        self.css = []
+        self._in_style = False
+
+    def _srcset(self, value):
+        for candidate in (value or '').split(','):
+            url = candidate.strip().split(' ', 1)[0]
+            if url:
+                self.assets.append(url)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in ('a', 'area') and attrs.get('href'):
+            self.links.append(attrs['href'])
+        elif tag == 'link' and attrs.get('href'):
+            rels = set((attrs.get('rel') or '').lower().split())
+            if rels & ASSET_RELS:
+                self.assets.append(attrs['href'])
+            elif rels & LINK_RELS:
+                self.links.append(attrs['href'])
+        elif tag in ('script', 'img', 'source', 'video', 'audio', 'iframe', 'embed', 'track'):
+            if attrs.get('src'):
+                self.assets.append(attrs['src'])
+            if attrs.get('srcset'):
+                self._srcset(attrs['srcset'])
+            if tag == 'video' and attrs.get('poster'):
+                self.assets.append(attrs['poster'])
+        elif tag == 'style':
+            self._in_style = True
+        if attrs.get('style') and 'url(' in attrs['style']:
+            self.css.append(attrs['style'])
+
+    def handle_endtag(self, tag):
+        if tag == 'style':
+            self._in_style = False
+
+    def handle_data(self, data):
+        if self._in_style:
+            self.css.append(data)
+
+
+def css_refs(text):
+    """URLs referenciadas por um CSS (url() e @import)"""
+    refs = []
+    for match in CSS_URL_RE.finditer(text):
+        url = next((group for group in match.groups() if group), '').strip()
+        if url:
+            refs.append(url)
+    return refs
+
+
+def decode_body(body, encoding):
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    if encoding == 'deflate':
+        return zlib.decompress(body)
+    return body
+
+
+class SiteCrawler:
+    """Crawler concorrente do site servido em `base_url`"""
+
+    def __init__(self, base_url=DEFAULT_URL, concurrency=DEFAULT_CONCURRENCY,
+                 max_pages=DEFAULT_MAX_PAGES, compressed=True):
+        parts = urlsplit(base_url if '://' in base_url else f'http://{base_url}')
+        self.scheme = parts.scheme
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.base_url = f'{self.scheme}://{parts.netloc}'
+        self.aliases = {parts.netloc.lower()}
+        self.concurrency = max(1, int(concurrency))
+        self.max_pages = max_pages
+        self.compressed = compressed
+        self._local = threading.local()
+        self.resources = {}
+        self.refs = {}          # página -> {'links': [...], 'assets': [...]}
+        self.css_deps = {}      # CSS -> recursos que ele carrega
+        self.referrers = {}     # path -> páginas/CSS que apontam para ele
+        self.sitemap = []
+        self.external = 0
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            conn = cls(self.host, self.port, timeout=REQUEST_TIMEOUT)
+            self._local.conn = conn
+        return conn
+
+    def _get(self, path):
+        """Um GET na conexão keep-alive da thread; (status, headers, body, bytes no fio)"""
+        headers = {'Accept-Encoding': 'gzip, deflate' if self.compressed else 'identity',
+                   'User-Agent': 'PortalScrum-Crawler/1.0'}
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                # O servidor pode ter fechado a conexão ociosa: tenta uma vez em outra
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+                continue
+            if response.will_close:
+                conn.close()
+                self._local.conn = None
+            head_bytes = len(f'HTTP/1.1 {response.status} {response.reason}\r\n') + 2 + sum(
+                len(name) + len(value) + 4 for name, value in response.getheaders())
+            return response.status, response, body, head_bytes + len(body)
+
+    def fetch(self, path):
+        """Baixa `path` seguindo redirects internos; nunca levanta exceção"""
+        resource = Resource(path)
+        started = time.perf_counter()
+        current = path
+        try:
+            for _ in range(MAX_REDIRECTS + 1):
+                status, response, body, wire = self._get(current)
+                resource.requests += 1
+                resource.transfer_bytes += wire
+                location = response.getheader('Location')
+                if status in (301, 302, 303, 307, 308) and location:
+                    target = self.internal_path(urljoin(self.base_url + current, location))
+                    if target is None:
+                        break
+                    current = target
+                    continue
+                break
+            resource.status = status
+            resource.final_path = current
+            resource.content_type = (response.getheader('Content-Type') or '').lower()
+            if status < 400 and (resource.is_html or resource.is_css or 'xml' in resource.content_type):
+                resource.body = decode_body(body, response.getheader('Content-Encoding'))
+            resource.body_bytes = len(body)
+        except (http.client.HTTPException, OSError, zlib.error, EOFError) as e:
+            resource.error = f'{type(e).__name__}: {e}'
+        resource.ms = (time.perf_counter() - started) * 1000
+        return resource
+
+    # ------------------------------------------------------------------
+    # URLs
+    # ------------------------------------------------------------------
+
+    def internal_path(self, url):
+        """Path local de uma URL do site (None para externas e esquemas especiais)"""
+        url = url.strip()
+        if not url or url.startswith('#') or url.lower().startswith(SKIPPED_SCHEMES):
+            return None
+        url, _ = urldefrag(url)
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https', ''):
+            return None
+        if parts.netloc and parts.netloc.lower() not in self.aliases:
+            return None
+        path = parts.path or '/'
+        return f'{path}?{parts.query}' if parts.query else path
+
+    def resolve(self, base_path, ref):
+        """Ref relativa a `base_path` -> path interno, contando as externas"""
+        if ref.strip().startswith('#'):
+            return None
+        path = self.internal_path(urljoin(self.base_url + base_path, ref.strip()))
+        if path is None and not ref.strip().lower().startswith(SKIPPED_SCHEMES):
+            self.external += 1
+        return path
+
+    def load_sitemap(self):
+        """Páginas do sitemap.xml; o host de produção vira alias do servidor local"""
+        resource = self.fetch('/sitemap.xml')
+        self.resources['/sitemap.xml'] = resource
+        if not resource.ok:
+            return []
+        locs = SITEMAP_LOC_RE.findall(resource.body.decode('utf-8', 'replace'))
+        for loc in locs:
+            netloc = urlsplit(loc).netloc.lower()
+            if netloc:
+                self.aliases.add(netloc)
+        self.sitemap = [path for path in (self.internal_path(loc) for loc in locs) if path]
+        return self.sitemap
+
+    # ------------------------------------------------------------------
+    # Crawl
+    # ------------------------------------------------------------------
+
+    def crawl(self, start=('/',)):
+        """Percorre o site; retorna o relatório (dict)"""
+        started = time.perf_counter()
+        seeds = list(start) + [path for path in self.load_sitemap() if path not in start]
+        pending = {}
+        pages_seen = set()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='crawler') as pool:
+            def submit(path, source):
+                if source is not None:
+                    self.referrers.setdefault(path, set()).add(source)
+                if path in self.resources:
+                    return
+                self.resources[path] = None
+                pending[pool.submit(self.fetch, path)] = path
+
+            for path in seeds:
+                submit(path, '(sitemap)' if path in self.sitemap and path not in start else None)
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    resource = future.result()
+                    self.resources[path] = resource
+                    if not resource.ok:
+                        continue
+                    base = resource.final_path
+                    if resource.is_html and len(pages_seen) < self.max_pages:
+                        pages_seen.add(path)
+                        parser = _RefParser()
+                        parser.feed(resource.body.decode('utf-8', 'replace'))
+                        parser.close()
+                        links = [p for p in (self.resolve(base, ref) for ref in parser.links) if p]
+                        assets = [p for p in (self.resolve(base, ref) for ref in parser.assets) if p]
+                        for text in parser.css:
+                            assets += [p for p in (self.resolve(base, ref) for ref in css_refs(text)) if p]
+                        self.refs[path] = {'links': sorted(set(links)), 'assets': sorted(set(assets))}
+                        for target in self.refs[path]['links'] + self.refs[path]['assets']:
+                            submit(target, path)
+                    elif resource.is_css:
+                        text = resource.body.decode('utf-8', 'replace')
+                        deps = sorted(set(p for p in (self.resolve(base, ref) for ref in css_refs(text)) if p))
+                        self.css_deps[path] = deps
+                        for target in deps:
+                            submit(target, path)
+        return self.report(time.perf_counter() - started)
+
+    # ------------------------------------------------------------------
+    # Relatório
+    # ------------------------------------------------------------------
+
+    def _closure(self, assets):
+        """Recursos da página incluindo os carregados pelos CSS (sem repetir)"""
+        seen, stack = set(), list(assets)
+        while stack:
+            path = stack.pop()
+            if path in seen:
+                continue
+            seen.add(path)
+            stack.extend(self.css_deps.get(path, ()))
+        return seen
+
+    def _chain_ms(self, path, visiting=()):
+        """Tempo do recurso mais o do recurso mais lento que ele carrega"""
+        resource = self.resources.get(path)
+        if resource is None or path in visiting:
+            return 0.0
+        deps = self.css_deps.get(path, ())
+        return resource.ms + max((self._chain_ms(dep, visiting + (path,)) for dep in deps), default=0.0)
+
+    def page_summary(self, path):
+        resource = self.resources[path]
+        refs = self.refs[path]
+        assets = self._closure(refs['assets'])
+        fetched = [self.resources[asset] for asset in assets if self.resources.get(asset) is not None]
+        return {
+            'path': path,
+            'status': resource.status,
+            'html_bytes': resource.transfer_bytes,
+            'transfer_bytes': resource.transfer_bytes + sum(r.transfer_bytes for r in fetched),
+            'requests': resource.requests + sum(r.requests for r in fetched),
+            'assets': len(assets),
+            'links': len(refs['links']),
+            'html_ms': round(resource.ms, 2),
+            'load_ms': round(resource.ms + max((self._chain_ms(a) for a in refs['assets']), default=0.0), 2),
+            'in_sitemap': path in self.sitemap,
+        }
+
+    def broken(self):
+        """Referências internas que não respondem (status >= 400 ou erro)"""
+        broken = []
+        for path, resource in sorted(self.resources.items()):
+            if resource is None or resource.ok or path == '/sitemap.xml':
+                continue
+            broken.append({
+                'path': path,
+                'status': resource.status,
+                'error': resource.error,
+                'referrers': sorted(self.referrers.get(path, ())),
+            })
+        return broken
+
+    def check_private(self, probes=PRIVATE_PROBES):
+        """Caminhos privados que o servidor entregou (deveriam ser 404)"""
+        exposed = []
+        for path in probes:
+            resource = self.fetch(path)
+            if resource.ok:
+                exposed.append({'path': path, 'status': resource.status})
+        return exposed
+
+    def report(self, elapsed):
+        pages = [self.page_summary(path) for path in sorted(self.refs)]
+        return {
+            'base_url': self.base_url,
+            'seconds': round(elapsed, 3),
+            'pages': pages,
+            'resources': sum(1 for r in self.resources.values() if r is not None),
+            'requests': sum(r.requests for r in self.resources.values() if r is not None),
+            'transfer_bytes': sum(r.transfer_bytes for r in self.resources.values() if r is not None),
+            'external_links': self.external,
+            'sitemap': len(self.sitemap),
+            'missing_from_sitemap': [page['path'] for page in pages
+                                     if not page['in_sitemap'] and page['status'] == 200],
+            'broken': self.broken(),
+        }
+
+
+def check_budgets(report, budget_kb, budget_requests, budget_ms):
+    """Lista de páginas acima do orçamento ("path: motivo")"""
+    violations = []
+    for page in report['pages']:
+        if budget_kb and page['transfer_bytes'] > budget_kb * 1024:
+            violations.append(f"{page['path']}: {page['transfer_bytes'] / 1024:.1f} KB > {budget_kb:g} KB")
+        if budget_requests and page['requests'] > budget_requests:
+            violations.append(f"{page['path']}: {page['requests']} requisições > {budget_requests}")
+        if budget_ms and page['load_ms'] > budget_ms:
+            violations.append(f"{page['path']}: {page['load_ms']:.0f} ms > {budget_ms:g} ms")
+    return violations
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='server.py crawl',
+                                     description='Peso por página e links quebrados do site local')
+    parser.add_argument('--url', default=DEFAULT_URL, help=f'servidor a percorrer (padrão: {DEFAULT_URL})')
+    parser.add_argument('--start', action='append', default=None,
+                        help='path inicial extra (pode repetir; "/" e o sitemap.xml sempre entram)')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='requisições simultâneas (padrão: 8)')
+    parser.add_argument('--budget-kb', type=float, default=DEFAULT_BUDGET_KB,
+                        help='bytes transferidos por página, com recursos (padrão: 512 KB; 0 desliga)')
+    parser.add_argument('--budget-requests', type=int, default=DEFAULT_BUDGET_REQUESTS,
+                        help='requisições por página (padrão: 40; 0 desliga)')
+    parser.add_argument('--budget-ms', type=float, default=0,
+                        help='tempo estimado de carga por página (padrão: sem limite)')
+    parser.add_argument('--max-pages', type=int, default=DEFAULT_MAX_PAGES,
+                        help='páginas analisadas no máximo (padrão: 500)')
+    parser.add_argument('--no-compress', action='store_true',
+                        help='pede os arquivos sem gzip/deflate (peso descomprimido)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='onde gravar o relatório (JSON)')
+    return parser.parse_args(argv)
+
+
+def print_report(report, violations):
+    print(f"\n{'página':<52} {'KB':>8} {'req':>5} {'html ms':>8} {'carga ms':>9}")
+    for page in sorted(report['pages'], key=lambda page: -page['transfer_bytes']):
+        marker = '' if page['in_sitemap'] else '  (fora do sitemap)'
+        print(f"{page['path'][:52]:<52} {page['transfer_bytes'] / 1024:>8.1f} {page['requests']:>5} "
+              f"{page['html_ms']:>8.1f} {page['load_ms']:>9.1f}{marker}")
+    print(f"\n📊 {len(report['pages'])} páginas, {report['resources']} URLs, {report['requests']} requisições, "
+          f"{report['transfer_bytes'] / 1024:.1f} KB em {report['seconds']:.2f}s "
+          f"({report['external_links']} links externos ignorados)")
+    if report['broken']:
+        print(f"\n❌ {len(report['broken'])} links quebrados:")
+        for item in report['broken']:
+            status = item['status'] if item['status'] is not None else item['error']
+            sources = ', '.join(item['referrers'][:3]) or '-'
+            more = f" (+{len(item['referrers']) - 3})" if len(item['referrers']) > 3 else ''
+            print(f"   {item['path']} [{status}] <- {sources}{more}")
+    if report['exposed']:
+        print(f"\n❌ {len(report['exposed'])} caminhos privados acessíveis (deveriam ser 404):")
+        for item in report['exposed']:
+            print(f"   {item['path']} [{item['status']}]")
+    if violations:
+        print(f"\n❌ {len(violations)} violações do orçamento por página:")
+        for line in violations:
+            print(f"   {line}")
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    crawler = SiteCrawler(args.url, concurrency=args.concurrency, max_pages=args.max_pages,
+                          compressed=not args.no_compress)
+    probe = crawler.fetch('/')
+    if probe.error is not None:
+        print(f"❌ Servidor não responde em {crawler.base_url} ({probe.error})")
+        print("💡 Inicie o servidor antes: python server.py --no-browser")
+        return 2
+
+    print(f"🕷️  Percorrendo {crawler.base_url} ({args.concurrency} conexões)...")
+    report = crawler.crawl(start=['/'] + (args.start or []))
+    violations = check_budgets(report, args.budget_kb, args.budget_requests, args.budget_ms)
+    report['budget'] = {'kb': args.budget_kb, 'requests': args.budget_requests, 'ms': args.budget_ms,
+                        'violations': violations}
+    report['exposed'] = crawler.check_private()
+    print_report(report, violations)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n📄 Relatório: {args.output}")
+
+    if report['broken'] or violations or report['exposed']:
+        return 1
+    print("✅ Nenhum link quebrado, nenhum dado privado exposto e todas as páginas dentro do orçamento")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - CSS por Página e CSS Crítico
+
+Etapa do build (python server.py build --critical-css) que compara o DOM
+de cada página com as folhas de estilo que ela carrega:
+
+- Regras cujos seletores não casam com nenhum elemento da página são
+  removidas, gerando uma folha de estilo reduzida por página
+- Regras que casam com elementos "acima da dobra" (header do portal e a
+  primeira seção/cabeçalho do <main>) formam o CSS crítico, inserido em
+  um <style> no <head>; a folha reduzida é carregada sem bloquear a
+  renderização
+- Classes e ids criados pelo JavaScript (classList.add, innerHTML, ...)
+  são considerados presentes, assim como pseudo-classes (:hover, :focus)
+- Seletores que o parser não entende são mantidos (nunca remove por dúvida)
+
+Os resultados ficam em .cache/critical-css.json, indexados pelo hash da
+página, das folhas de estilo e dos scripts: só páginas alteradas são
+reprocessadas.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import re
+from html.parser import HTMLParser
+
+CACHE_PATH = os.path.join('.cache', 'critical-css.json')
+CACHE_VERSION = 1
+
+# Limite de elementos considerados acima da dobra
+FOLD_ELEMENTS = 250
+FOLD_CONTAINERS = ('section', 'header', 'article')
+
+JS_TOKEN_RE = re.compile(r'[A-Za-z_][\w-]*')
+JS_MARKUP_RE = re.compile(r'`[^`]*<[a-z][^`]*`|\'[^\'\n]*<[a-z][^\'\n]*\'|"[^"\n]*<[a-z][^"\n]*"')
+COMPOUND_PART_RE = re.compile(
+    r'(?P<universal>\*)'
+    r'|(?P<tag>[A-Za-z][\w-]*)'
+    r'|#(?P<id>[\w-]+)'
+    r'|\.(?P<cls>[\w-]+)'
+    r'|\[\s*(?P<attr>[\w-]+)\s*(?:(?P<op>[~|^$*]?=)\s*(?P<value>"[^"]*"|\'[^\']*\'|[^\]\s]+)\s*)?(?:[iIsS]\s*)?\]'
+    r'|::?(?P<pseudo>[\w-]+)(?P<args>\((?:[^()]|\([^()]*\))*\))?'
+)
+KEYFRAMES_RE = re.compile(r'@(?:-webkit-)?keyframes\s+([\w-]+)')
+ANIMATION_RE = re.compile(r'animation(?:-name)?\s*:([^;}]+)')
+
+VOID_ELEMENTS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                           'link', 'meta', 'source', 'track', 'wbr'))
+
+
+# ----------------------------------------------------------------------
+# DOM
+# ----------------------------------------------------------------------
+
+class Element:
+    __slots__ = ('tag', 'id', 'classes', 'attrs', 'parent', 'previous', 'above_fold')
+
+    def __init__(self, tag, attrs, parent, previous, above_fold):
+        self.tag = tag
+        self.attrs = {name: value or '' for name, value in attrs}
+        self.id = self.attrs.get('id')
+        self.classes = frozenset(self.attrs.get('class', '').split())
+        self.parent = parent
+        self.previous = previous
+        self.above_fold = above_fold
+
+
+# Pai de fragmentos HTML montados pelo JavaScript: casa com qualquer seletor
+ANY_PARENT = Element('*', (), None, None, False)
+
+
+class PageDocument(HTMLParser):
+    """Árvore mínima da página: tag, id, classes, atributos, pai e irmão anterior"""
+
+    def __init__(self, html, fragments=()):
+        super().__init__(convert_charrefs=True)
+        self.elements = []
+        self._stack = []
+        self._last_child = [None]
+        self._root = None
+        self._in_main = False
+        self._fold_depth = None
+        self._fold_closed = False
+        self.feed(html)
+        self.close()
+        for fragment in fragments:
+            self.add_fragment(fragment)
+
+    def add_fragment(self, html):
+        """HTML inserido pelo JavaScript (innerHTML): nunca acima da dobra"""
+        self._stack, self._last_child, self._root = [], [ANY_PARENT], ANY_PARENT
+        self._fold_closed = True
+        self.reset()
+        self.feed(html)
+        self.close()
+
+    def handle_starttag(self, tag, attrs):
+        parent = self._stack[-1] if self._stack else self._root
+        above_fold = not self._fold_closed and len(self.elements) < FOLD_ELEMENTS
+        element = Element(tag, attrs, parent, self._last_child[-1], above_fold)
+        self.elements.append(element)
+        self._last_child[-1] = element
+        if tag in VOID_ELEMENTS:
+            return
+        self._stack.append(element)
+        self._last_child.append(None)
+        if tag == 'main':
+            self._in_main = True
+        elif self._in_main and self._fold_depth is None and tag in FOLD_CONTAINERS:
+            self._fold_depth = len(self._stack)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS and self._stack and self._stack[-1].tag == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        # Fecha até a tag correspondente (HTML mal fechado não quebra a árvore)
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self._stack[depth].tag == tag:
+                if self._fold_depth is not None and depth + 1 <= self._fold_depth:
+                    self._fold_closed = True
+                del self._stack[depth:]
+                del self._last_child[depth + 1:]
+                return
+
+
+# ----------------------------------------------------------------------
+# Seletores
+# ----------------------------------------------------------------------
+
+def split_top_level(text, separators):
+    """Divide o texto nos separadores fora de (), [] e strings"""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif depth == 0 and char in separators:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def parse_compound(text):
+    """Compound selector -> lista de testes, ou None se não reconhecido"""
+    tests, position = [], 0
+    while position < len(text):
+        match = COMPOUND_PART_RE.match(text, position)
+        if not match:
+            return None
+        position = match.end()
+        if match.group('tag'):
+            tests.append(('tag', match.group('tag').lower()))
+        elif match.group('id'):
+            tests.append(('id', match.group('id')))
+        elif match.group('cls'):
+            tests.append(('class', match.group('cls')))
+        elif match.group('attr'):
+            value = match.group('value')
+            if value and value[0] in '"\'':
+                value = value[1:-1]
+            tests.append(('attr', (match.group('attr').lower(), match.group('op'), value)))
+        # '*' e pseudo-classes/elementos não restringem (estado dinâmico)
+    return tests
+
+
+def parse_selector(selector):
+    """'a > .b c' -> [(None, tests_a), ('>', tests_b), (' ', tests_c)]"""
+    selector = selector.strip()
+    if not selector:
+        return None
+    steps, buffer, combinator, depth, quote = [], [], None, 0, None
+    i = 0
+    while i < len(selector):
+        char = selector[i]
+        if quote:
+            buffer.append(char)
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+            buffer.append(char)
+        elif char in '([':
+            depth += 1
+            buffer.append(char)
+        elif char in ')]':
+            depth -= 1
+            buffer.append(char)
+        elif depth == 0 and (char.isspace() or char in '>+~'):
+            if buffer:
+                tests = parse_compound(''.join(buffer))
+                if tests is None:
+                    return None
+                steps.append((combinator, tests))
+                buffer, combinator = [], ' '
+            if char in '>+~':
+                combinator = char
+        else:
+            buffer.append(char)
+        i += 1
+    if buffer:
+        tests = parse_compound(''.join(buffer))
+        if tests is None:
+            return None
+        steps.append((combinator, tests))
+    elif combinator not in (None, ' '):
+        return None
+    return steps
+
+
+class Matcher:
+    """Casa seletores com os elementos de uma PageDocument"""
+
+    def __init__(self, document, dynamic_tokens=()):
+        self.document = document
+        self.dynamic = frozenset(dynamic_tokens)
+        self.dynamic_prefixes = tuple(token for token in self.dynamic if token.endswith('-'))
+
+    def _is_dynamic(self, name):
+        return name in self.dynamic or name.startswith(self.dynamic_prefixes)
+
+    def _test(self, element, tests):
+        for kind, value in tests:
+            if kind == 'tag':
+                if element.tag != value:
+                    return False
+            elif kind == 'id':
+                if element.id != value and not self._is_dynamic(value):
+                    return False
+            elif kind == 'class':
+                if value not in element.classes and not self._is_dynamic(value):
+                    return False
+            elif kind == 'attr':
+                name, op, expected = value
+                actual = element.attrs.get(name)
+                if actual is None:
+                    if not self._is_dynamic(name):
+                        return False
+                    continue
+                if op == '=' and actual != expected:
+                    return False
+                if op == '~=' and expected not in actual.split():
+                    return False
+                if op == '|=' and actual != expected and not actual.startswith(expected + '-'):
+                    return False
+                if op == '^=' and not actual.startswith(expected):
+                    return False
+                if op == '$=' and not actual.endswith(expected):
+                    return False
+                if op == '*=' and expected not in actual:
+                    return False
+        return True
+
+    def _matches(self, element, steps, index):
+        if element is ANY_PARENT:
+            return True
+        combinator, tests = steps[index]
+        if not self._test(element, tests):
+            return False
+        if index == 0:
+            return True
+        if combinator == '>':
+            return element.parent is not None and self._matches(element.parent, steps, index - 1)
+        if combinator == '+':
+            return element.previous is not None and self._matches(element.previous, steps, index - 1)
+        if combinator == '~':
+            sibling = element.previous
+            while sibling is not None:
+                if self._matches(sibling, steps, index - 1):
+                    return True
+                sibling = sibling.previous
+            return False
+        ancestor = element.parent
+        while ancestor is not None:
+            if self._matches(ancestor, steps, index - 1):
+                return True
+            ancestor = ancestor.parent
+        return False
+
+    def match(self, selector):
+        """(casa_na_página, casa_acima_da_dobra); seletor desconhecido casa sempre"""
+        steps = parse_selector(selector)
+        if steps is None:
+            return True, True
+        used = False
+        for element in self.document.elements:
+            if self._matches(element, steps, len(steps) - 1):
+                if element.above_fold:
+                    return True, True
+                used = True
+        return used, False
+
+
+# ----------------------------------------------------------------------
+# Folhas de estilo
+# ----------------------------------------------------------------------
+
+def strip_comments(css):
+    """Remove /* comentários */ preservando strings"""
+    output, i, quote = [], 0, None
+    while i < len(css):
+        char = css[i]
+        if quote:
+            output.append(char)
+            if char == '\\':
+                output.append(css[i + 1:i + 2])
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+            output.append(char)
+        elif css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            i = len(css) if end == -1 else end + 2
+            continue
+        else:
+            output.append(char)
+        i += 1
+    return ''.join(output)
+
+
+def _find_block_end(css, start):
+    """Índice do '}' que fecha o bloco aberto em css[start - 1]"""
+    depth, quote, i = 1, None, start
+    while i < len(css):
+        char = css[i]
+        if quote:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return len(css)
+
+
+def _find_delimiter(css, start):
+    """Primeiro '{' ou ';' fora de strings e parênteses (url(...) com ';')"""
+    depth, quote, i = 0, None, start
+    while i < len(css):
+        char = css[i]
+        if quote:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0 and char in '{;':
+            return i
+        i += 1
+    return -1
+
+
+def _parse_nodes(css):
+    """Lista de nós: ('rule', seletores, corpo) | ('group', prelúdio, filhos) | ('raw', texto)"""
+    nodes, i = [], 0
+    while i < len(css):
+        while i < len(css) and css[i].isspace():
+            i += 1
+        if i >= len(css):
+            break
+        brace = _find_delimiter(css, i)
+        if brace != -1 and css[brace] == ';':
+            if css[i] == '@':
+                nodes.append(('raw', css[i:brace + 1].strip()))
+            i = brace + 1
+            continue
+        if brace == -1:
+            break
+        prelude = css[i:brace].strip()
+        end = _find_block_end(css, brace + 1)
+        body = css[brace + 1:end]
+        if prelude.startswith(('@media', '@supports')):
+            nodes.append(('group', prelude, _parse_nodes(body)))
+        elif prelude.startswith('@'):
+            nodes.append(('raw', css[i:end + 1].strip()))
+        else:
+            nodes.append(('rule', split_top_level(prelude, ','), body.strip()))
+        i = end + 1
+    return nodes
+
+
+@functools.lru_cache(maxsize=32)
+def parse_stylesheet(css):
+    """Árvore de regras da folha de estilo (cacheada por conteúdo)"""
+    return tuple(_parse_nodes(strip_comments(css)))
+
+
+def _select(nodes, matcher, critical):
+    """Serializa os nós usados pela página (ou só os acima da dobra)"""
+    output, animations = [], set()
+    for node in nodes:
+        kind = node[0]
+        if kind == 'rule':
+            _, selectors, body = node
+            kept = []
+            for selector in selectors:
+                used, above_fold = matcher.match(selector)
+                if above_fold if critical else used:
+                    kept.append(selector.strip())
+            if kept:
+                output.append(f"{','.join(kept)}{{{body}}}")
+                for value in ANIMATION_RE.findall(body):
+                    animations.update(JS_TOKEN_RE.findall(value))
+        elif kind == 'group':
+            _, prelude, children = node
+            if critical and 'print' in prelude:
+                continue
+            inner, inner_animations = _select(children, matcher, critical)
+            if inner:
+                output.append(f"{prelude}{{{inner}}}")
+                animations |= inner_animations
+        elif not critical:
+            output.append(node[1])
+    text = '\n'.join(output)
+    return text, animations
+
+
+def _drop_unused_keyframes(text, animations):
+    """Remove @keyframes que nenhuma regra mantida usa"""
+    def replace(match):
+        return match.group(0) if KEYFRAMES_RE.match(match.group(0)).group(1) in animations else ''
+    return re.sub(r'@(?:-webkit-)?keyframes\s+[\w-]+\s*\{(?:[^{}]|\{[^{}]*\})*\}', replace, text)
+
+
+def dynamic_tokens(scripts):
+    """Nomes que os scripts podem usar como classe/id/atributo"""
+    tokens = set()
+    for script in scripts:
+        tokens.update(JS_TOKEN_RE.findall(script))
+    return tokens
+
+
+def script_fragments(scripts):
+    """Trechos de HTML dentro de strings/template literals dos scripts"""
+    return [match.group(0)[1:-1] for script in scripts for match in JS_MARKUP_RE.finditer(script)]
+
+
+def prune_page(html, stylesheets, scripts=()):
+    """Calcula o CSS da página.
+
+    stylesheets: [(caminho, texto)] na ordem em que a página carrega.
+    Retorna {'critical': [(caminho, css)], 'pruned': [(caminho, css)], 'stats': {...}}.
+    """
+    document = PageDocument(html, script_fragments(scripts))
+    matcher = Matcher(document, dynamic_tokens(scripts))
+    critical, pruned = [], []
+    original = kept = critical_bytes = 0
+    for path, css in stylesheets:
+        nodes = parse_stylesheet(css)
+        page_css, animations = _select(nodes, matcher, critical=False)
+        page_css = _drop_unused_keyframes(page_css, animations)
+        fold_css, _ = _select(nodes, matcher, critical=True)
+        pruned.append((path, page_css))
+        critical.append((path, fold_css))
+        original += len(css.encode('utf-8'))
+        kept += len(page_css.encode('utf-8'))
+        critical_bytes += len(fold_css.encode('utf-8'))
+    return {
+        'critical': critical,
+        'pruned': pruned,
+        'stats': {'elements': len(document.elements), 'original_bytes': original,
+                  'pruned_bytes': kept, 'critical_bytes': critical_bytes},
+    }
+
+
+def prune_page_files(root, page, stylesheet_keys, script_keys, inline_scripts=()):
+    """prune_page lendo os arquivos do disco (executado no pool do build)"""
+    def read(key):
+        with open(os.path.join(root, key), encoding='utf-8') as f:
+            return f.read()
+    result = prune_page(read(page), [(key, read(key)) for key in stylesheet_keys],
+                        [read(key) for key in script_keys] + list(inline_scripts))
+    return page, result
+
+
+def inputs_key(root, keys):
+    """Hash do conteúdo de todas as entradas de uma página"""
+    digest = hashlib.sha256(f'v{CACHE_VERSION}:{FOLD_ELEMENTS}'.encode())
+    for key in keys:
+        digest.update(key.encode('utf-8') + b'\0')
+        with open(os.path.join(root, key), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class CriticalCssCache:
+    """Resultados de prune_page por página, válidos enquanto as entradas não mudam"""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.pages = {}
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self.pages = data.get('pages', {})
+        except (OSError, ValueError):
+            pass
+
+    def get(self, page, key):
+        entry = self.pages.get(page)
+        if entry and entry['key'] == key:
+            self.hits += 1
+            return entry['result']
+        self.misses += 1
+        return None
+
+    def put(self, page, key, result):
+        self.pages[page] = {'key': key, 'result': result}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'pages': self.pages}, f, ensure_ascii=False)
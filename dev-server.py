@@ -30,12 +30,13 @@ class InteractiveServer:
             self.server = socketserver.TCPServer(("", self.port), http.server.SimpleHTTPRequestHandler)
             self.server.timeout = 1.0  # Timeout para permitir interrupção
             
+            # Marcar como rodando antes da thread: _serve_forever sai se running for False
+            self.running = True
+            
             # Thread para rodar o servidor
             self.server_thread = threading.Thread(target=self._serve_forever, daemon=True)
             self.server_thread.start()
             
-            self.running = True
-            
             timestamp = datetime.now().strftime("%H:%M:%S")
             print(f"✅ [{timestamp}] Servidor iniciado em http://localhost:{self.port}")
             
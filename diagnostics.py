@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Perfil por Amostragem e Autodiagnóstico
+
+Ferramentas para descobrir onde o tempo vai quando o portal fica lento,
+seguras para deixar ligadas em produção:
+
+- StackSampler: a cada 1/hz segundos lê a pilha de todas as threads do
+  servidor (sys._current_frames) e conta as pilhas iguais. Só custa algo
+  enquanto um perfil está rodando; um perfil por vez, com duração máxima.
+  O resultado sai no formato "collapsed" (uma pilha por linha, frames
+  separados por ';' e a contagem no fim), pronto para flamegraph.pl,
+  speedscope ou inferno
+- GCMonitor: pausas do coletor de lixo por geração (via gc.callbacks)
+- process_stats: memória, descritores abertos, CPU e threads do processo
+"""
+
+import collections
+import gc
+import os
+import re
+import sys
+import threading
+import time
+
+DEFAULT_PROFILE_SECONDS = 10.0
+MAX_PROFILE_SECONDS = 60.0
+DEFAULT_HZ = 100
+MAX_HZ = 1000
+
+# Threads que atendem requisições (pool de threads e pool do asyncio)
+HANDLER_THREAD_PREFIX = 'portal-'
+
+# Frame do topo da pilha que indica uma thread parada esperando trabalho
+IDLE_FRAMES = frozenset((
+    ('threading.py', 'wait'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),
+    ('selectors.py', 'select'),
+    ('socket.py', 'accept'),
+))
+
+POOL_SUFFIX_RE = re.compile(r'[-_]\d+$')
+
+
+class ProfilerBusy(Exception):
+    """Já existe um perfil em andamento neste processo"""
+
+
+class StackSampler:
+    """Amostrador de pilhas de todas as threads, sem instrumentar o código"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._labels = {}  # (code, linha) -> "função (arquivo:linha)"
+        self.running = False
+        self.profiles = 0
+        self.last = None
+
+    def _label(self, frame):
+        key = (frame.f_code, frame.f_lineno)
+        label = self._labels.get(key)
+        if label is None:
+            code = frame.f_code
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+            if len(self._labels) < 100_000:
+                self._labels[key] = label
+        return label
+
+    def _collapse(self, frame, thread_name):
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame))
+            frame = frame.f_back
+        labels.append(POOL_SUFFIX_RE.sub('', thread_name))
+        labels.reverse()
+        return ';'.join(labels)
+
+    @staticmethod
+    def _is_idle(frame):
+        code = frame.f_code
+        return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+    def sample(self, seconds=DEFAULT_PROFILE_SECONDS, hz=DEFAULT_HZ, all_threads=False, idle=False):
+        """
+        Amostra as pilhas por `seconds` segundos, `hz` vezes por segundo.
+
+        Por padrão só entram as threads de atendimento e as pilhas ociosas
+        (workers esperando na fila) são descartadas. Retorna
+        (Counter {pilha: amostras}, resumo). Levanta ProfilerBusy se já há
+        um perfil rodando.
+        """
+        seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+        hz = min(max(int(hz), 1), MAX_HZ)
+        with self._lock:
+            if self.running:
+                raise ProfilerBusy("já existe um perfil em andamento")
+            self.running = True
+
+        stacks = collections.Counter()
+        me = threading.get_ident()
+        interval = 1.0 / hz
+        samples = skipped_idle = 0
+        sampling_time = 0.0
+        started = time.perf_counter()
+        deadline = started + seconds
+        try:
+            next_tick = started
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    name = names.get(ident, f'thread-{ident}')
+                    if not all_threads and not name.startswith(HANDLER_THREAD_PREFIX):
+                        continue
+                    if not idle and self._is_idle(frame):
+                        skipped_idle += 1
+                        continue
+                    stacks[self._collapse(frame, name)] += 1
+                del frame
+                samples += 1
+                sampling_time += time.perf_counter() - now
+                next_tick += interval
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(max(0.0, min(delay, deadline - time.perf_counter())))
+                else:
+                    # Atrasado (GIL disputado): não tenta compensar em rajada
+                    next_tick = time.perf_counter()
+        finally:
+            elapsed = time.perf_counter() - started
+            summary = {
+                'seconds': round(elapsed, 3),
+                'hz': hz,
+                'samples': samples,
+                'stacks': len(stacks),
+                'thread_samples': sum(stacks.values()),
+                'idle_skipped': skipped_idle,
+                # Fração do tempo do perfil gasta pelo próprio amostrador
+                'overhead': round(sampling_time / elapsed, 4) if elapsed else 0.0,
+                'finished_at': time.time(),
+            }
+            with self._lock:
+                self.running = False
+                self.profiles += 1
+                self.last = summary
+        return stacks, summary
+
+    def stats(self):
+        return {'running': self.running, 'profiles': self.profiles, 'last': self.last}
+
+
+def collapsed(stacks):
+    """Counter de pilhas -> texto "frame;frame;frame N" (mais frequentes primeiro)"""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class GCMonitor:
+    """Coletas e tempo de pausa do GC por geração"""
+
+    def __init__(self):
+        self._started = None
+        self.collections = [0, 0, 0]
+        self.collected = [0, 0, 0]
+        self.uncollectable = [0, 0, 0]
+        self.pause_total = [0.0, 0.0, 0.0]
+        self.pause_max = [0.0, 0.0, 0.0]
+        self.installed = False
+
+    def install(self):
+        if not self.installed:
+            gc.callbacks.append(self._callback)
+            self.installed = True
+        return self
+
+    def uninstall(self):
+        if self.installed:
+            gc.callbacks.remove(self._callback)
+            self.installed = False
+
+    def _callback(self, phase, info):
+        if phase == 'start':
+            self._started = time.perf_counter()
+            return
+        if self._started is None:
+            return
+        pause = time.perf_counter() - self._started
+        self._started = None
+        generation = info.get('generation', 0)
+        self.collections[generation] += 1
+        self.collected[generation] += info.get('collected', 0)
+        self.uncollectable[generation] += info.get('uncollectable', 0)
+        self.pause_total[generation] += pause
+        if pause > self.pause_max[generation]:
+            self.pause_max[generation] = pause
+
+    def stats(self):
+        generations = []
+        for generation in range(3):
+            generations.append({
+                'collections': self.collections[generation],
+                'collected': self.collected[generation],
+                'uncollectable': self.uncollectable[generation],
+                'pause_total_ms': round(self.pause_total[generation] * 1000, 3),
+                'pause_max_ms': round(self.pause_max[generation] * 1000, 3),
+            })
+        return {
+            'enabled': gc.isenabled(),
+            'thresholds': gc.get_threshold(),
+            'pending': gc.get_count(),
+            'garbage': len(gc.garbage),
+            'generations': generations,
+        }
+
+
+def _read_proc_status():
+    status = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in ('VmRSS', 'VmHWM', 'Threads'):
+                    status[name] = int(value.split()[0])
+    except OSError:
+        pass
+    return status
+
+
+def process_stats():
+    """Memória, CPU, descritores e threads do processo atual"""
+    status = _read_proc_status()
+    times = os.times()
+    try:
+        open_fds = len(os.listdir('/proc/self/fd'))
+    except OSError:
+        open_fds = None
+    pools = collections.Counter(POOL_SUFFIX_RE.sub('', thread.name) for thread in threading.enumerate())
+    return {
+        'pid': os.getpid(),
+        'rss_kb': status.get('VmRSS'),
+        'peak_rss_kb': status.get('VmHWM'),
+        'cpu_user_s': round(times.user, 3),
+        'cpu_system_s': round(times.system, 3),
+        'open_fds': open_fds,
+        'threads': threading.active_count(),
+        'thread_pools': dict(pools),
+    }
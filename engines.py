@@ -0,0 +1,757 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Motores de Servidor Concorrentes
+
+Motores de atendimento usados pelo server.py. Todos recebem a mesma classe de
+handler (PortalScrumHTTPRequestHandler), então o roteamento (do_GET/do_POST,
+/health, /api/*) é idêntico em qualquer modo.
+
+Motores:
+    single    socketserver.TCPServer original (uma requisição por vez)
+    threads   pool fixo de threads alimentado por uma fila limitada
+    asyncio   event loop lê/escreve os sockets; o handler roda em um pool
+
+Com reuse_port=True o socket é aberto com SO_REUSEPORT, permitindo que
+vários processos (modo prefork) escutem a mesma porta. drain() espera as
+requisições em andamento terminarem depois do shutdown().
+
+Conexões persistentes (HTTP/1.1 keep-alive): nos motores threads e asyncio
+a conexão continua aberta entre requisições. No pool de threads a conexão
+ociosa não prende um worker: volta para IdleConnections, que a vigia com um
+selector e a devolve à fila quando a próxima requisição chega (ou a fecha
+quando o prazo de ociosidade vence).
+"""
+
+import asyncio
+import io
+import os
+import collections
+import queue
+import selectors
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 16
+DEFAULT_QUEUE_SIZE = 64
+
+# Resposta enviada quando a fila está cheia: curta, sem passar pelo handler
+OVERLOAD_RESPONSE = (
+    b"HTTP/1.0 503 Service Unavailable\r\n"
+    b"Content-Type: text/plain; charset=utf-8\r\n"
+    b"Content-Length: 20\r\n"
+    b"Retry-After: 1\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+    b"Servidor sobrecarga\n"
+)
+
+# Corpo que não chegou dentro do prazo (o cabeçalho já foi lido)
+BODY_TIMEOUT_RESPONSE = (
+    b"HTTP/1.0 408 Request Timeout\r\n"
+    b"Content-Type: text/plain; charset=utf-8\r\n"
+    b"Content-Length: 28\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+    b"Corpo chegou devagar demais\n"
+)
+
+MAX_HEADER_BYTES = 64 * 1024
+
+# Corpo máximo lido pelo motor asyncio quando o handler não define max_body_bytes
+DEFAULT_MAX_BODY_BYTES = 1024 * 1024
+DEFAULT_DRAIN_TIMEOUT = 5.0
+
+# Keep-alive: prazo de ociosidade entre requisições e requisições por conexão
+DEFAULT_KEEPALIVE_TIMEOUT = 5.0
+DEFAULT_KEEPALIVE_REQUESTS = 100
+DEFAULT_HEADER_TIMEOUT = 30.0
+
+# Conexões ociosas vigiadas ao mesmo tempo; acima disso a mais antiga é fechada
+DEFAULT_MAX_IDLE = 1024
+
+
+class SingleThreadHTTPServer(socketserver.TCPServer):
+    """Servidor original: atende uma conexão por vez"""
+
+    allow_reuse_address = True
+    engine_name = "single"
+
+    def __init__(self, server_address, RequestHandlerClass, bind_and_activate=True, reuse_port=False):
+        self.allow_reuse_port = reuse_port
+        super().__init__(server_address, RequestHandlerClass, bind_and_activate)
+
+    def finish_request(self, request, client_address):
+        """Atende a conexão; retorna True se o handler ficou com ela (ex.: SSE)"""
+        handler = self.RequestHandlerClass(request, client_address, self)
+        return getattr(handler, 'parked', False)
+
+    def process_request(self, request, client_address):
+        if not self.finish_request(request, client_address):
+            self.shutdown_request(request)
+
+    def drain(self, timeout=DEFAULT_DRAIN_TIMEOUT):
+        """Nada a esperar: a requisição atual termina antes do serve_forever retornar"""
+        self.socket.close()
+        return True
+
+    def engine_stats(self):
+        return {"engine": self.engine_name, "workers": 1, "busy": 1, "queue_size": 0, "queue_depth": 0,
+                "open_connections": 1}
+
+
+class IdleConnections:
+    """Conexões keep-alive ociosas do pool de threads, vigiadas por um selector.
+
+    O worker estaciona a conexão com park() e volta para a fila. Quando a
+    próxima requisição chega, a conexão é entregue a dispatch (o
+    process_request do servidor); se o cliente fecha ou o prazo vence, a
+    conexão é fechada aqui mesmo, sem ocupar nenhum worker.
+    """
+
+    def __init__(self, dispatch, max_idle=DEFAULT_MAX_IDLE):
+        self.dispatch = dispatch
+        self.max_idle = max(1, int(max_idle))
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+        self._lock = threading.Lock()
+        self._incoming = []
+        self._parked = collections.OrderedDict()  # socket -> (endereço, requisições, prazo)
+        self._served = {}  # socket devolvido -> requisições já atendidas nele
+        self._closed = False
+        self.parked = 0
+        self.resumed = 0
+        self.reclaimed = 0
+        self.client_closed = 0
+        self.evicted = 0
+        self._thread = threading.Thread(target=self._run, name="keepalive-idle", daemon=True)
+        self._thread.start()
+
+    def park(self, sock, client_address, served, timeout):
+        """Entrega uma conexão ociosa; retorna False se já está fechando"""
+        with self._lock:
+            if self._closed:
+                return False
+            self._incoming.append((sock, client_address, served, time.monotonic() + timeout))
+        self._wake()
+        return True
+
+    def take_served(self, sock):
+        """Requisições já atendidas na conexão (0 para conexões novas)"""
+        with self._lock:
+            return self._served.pop(sock, 0)
+
+    def _wake(self):
+        try:
+            self._wakeup_w.send(b"\0")
+        except OSError:
+            pass
+
+    def _close(self, sock):
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def _forget(self, sock):
+        self._parked.pop(sock, None)
+        try:
+            self._selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+
+    def _register_incoming(self):
+        with self._lock:
+            incoming, self._incoming = self._incoming, []
+        for sock, client_address, served, deadline in incoming:
+            try:
+                self._selector.register(sock, selectors.EVENT_READ)
+            except (ValueError, OSError):
+                self._close(sock)
+                continue
+            self._parked[sock] = (client_address, served, deadline)
+            self.parked += 1
+        while len(self._parked) > self.max_idle:
+            sock = next(iter(self._parked))
+            self._forget(sock)
+            self._close(sock)
+            self.evicted += 1
+
+    def _resume(self, sock):
+        client_address, served, _ = self._parked[sock]
+        self._forget(sock)
+        try:
+            data = sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            data = None
+        except OSError:
+            data = b""
+        if not data:
+            # Cliente encerrou (ou leitura espúria): nada a atender
+            self._close(sock)
+            self.client_closed += 1
+            return
+        with self._lock:
+            self._served[sock] = served
+        self.resumed += 1
+        self.dispatch(sock, client_address)
+
+    def _run(self):
+        while not self._closed:
+            timeout = None
+            if self._parked:
+                _, _, deadline = next(iter(self._parked.values()))
+                timeout = max(0.0, deadline - time.monotonic())
+            for key, _ in self._selector.select(timeout):
+                if key.fileobj is self._wakeup_r:
+                    try:
+                        while self._wakeup_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                if key.fileobj in self._parked:
+                    self._resume(key.fileobj)
+            self._register_incoming()
+            # Prazo igual para todas: a ordem de chegada é a ordem de expiração
+            now = time.monotonic()
+            while self._parked:
+                sock, (_, _, deadline) = next(iter(self._parked.items()))
+                if deadline > now:
+                    break
+                self._forget(sock)
+                self._close(sock)
+                self.reclaimed += 1
+
+    def close_all(self):
+        """Fecha as conexões ociosas (drain) e para de aceitar novas"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wake()
+        self._thread.join(timeout=1)
+        for sock, *_ in self._incoming:
+            self._close(sock)
+        for sock in list(self._parked):
+            self._forget(sock)
+            self._close(sock)
+        self._incoming = []
+        self._selector.close()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
+
+    def __len__(self):
+        return len(self._parked)
+
+    def stats(self):
+        return {
+            "idle": len(self._parked),
+            "max_idle": self.max_idle,
+            "parked": self.parked,
+            "resumed": self.resumed,
+            "reclaimed": self.reclaimed,
+            "client_closed": self.client_closed,
+            "evicted": self.evicted,
+        }
+
+
+class ThreadPoolHTTPServer(socketserver.TCPServer):
+    """Servidor com pool fixo de threads e fila de conexões limitada.
+
+    A thread principal só aceita conexões e as coloca na fila; os workers
+    consomem a fila. Quando a fila enche, a conexão recebe um 503 imediato
+    em vez de esperar indefinidamente.
+    """
+
+    allow_reuse_address = True
+    request_queue_size = 128  # backlog do listen()
+    engine_name = "threads"
+    keepalive = True
+
+    def __init__(self, server_address, RequestHandlerClass,
+                 workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 bind_and_activate=True, reuse_port=False):
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self._pending = queue.Queue(maxsize=self.queue_size)
+        self._threads = []
+        # Workers, a thread das ociosas e a de accept mexem nos contadores
+        self._counter_lock = threading.Lock()
+        self._active = 0
+        self.rejected = 0
+        self.draining = False
+        self.allow_reuse_port = reuse_port
+        super().__init__(server_address, RequestHandlerClass, bind_and_activate)
+        self.idle = IdleConnections(self.process_request)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"portal-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def process_request(self, request, client_address):
+        """Enfileira a conexão para um worker (ou rejeita se lotado)"""
+        try:
+            self._pending.put_nowait((request, client_address))
+        except queue.Full:
+            with self._counter_lock:
+                self.rejected += 1
+            self.idle.take_served(request)
+            try:
+                request.sendall(OVERLOAD_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+
+    def finish_request(self, request, client_address):
+        """Atende a conexão; retorna True se ela ficou estacionada (keep-alive ociosa)"""
+        handler = self.RequestHandlerClass(request, client_address, self)
+        return getattr(handler, 'parked', False)
+
+    def park(self, request, client_address, served, timeout):
+        """Chamado pelo handler entre requisições: a conexão espera fora do worker"""
+        if self.draining:
+            return False
+        return self.idle.park(request, client_address, served, timeout)
+
+    def requests_served(self, request):
+        return self.idle.take_served(request)
+
+    def _worker(self):
+        """Loop de um worker do pool"""
+        while True:
+            item = self._pending.get()
+            if item is None:
+                break
+            request, client_address = item
+            with self._counter_lock:
+                self._active += 1
+            parked = False
+            try:
+                parked = self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                if not parked:
+                    self.shutdown_request(request)
+                with self._counter_lock:
+                    self._active -= 1
+
+    def drain(self, timeout=DEFAULT_DRAIN_TIMEOUT):
+        """Para de aceitar e espera a fila e os workers esvaziarem"""
+        # Conexões ociosas são fechadas; as ativas fecham ao fim da resposta
+        self.draining = True
+        self.idle.close_all()
+        # Conexões já completadas no backlog seriam resetadas pelo close()
+        self.socket.setblocking(False)
+        while True:
+            try:
+                request, client_address = self.socket.accept()
+            except OSError:
+                break
+            request.setblocking(True)
+            self.process_request(request, client_address)
+        self.socket.close()
+        deadline = time.monotonic() + timeout
+        while self._pending.qsize() or self.active():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def server_close(self):
+        super().server_close()
+        self.idle.close_all()
+        for _ in self._threads:
+            self._pending.put(None)
+        for thread in self._threads:
+            thread.join(timeout=1)
+
+    def active(self):
+        """Conexões sendo atendidas por um worker neste instante"""
+        with self._counter_lock:
+            return self._active
+
+    def engine_stats(self):
+        with self._counter_lock:
+            active, rejected = self._active, self.rejected
+        queue_depth = self._pending.qsize()
+        return {
+            "engine": self.engine_name,
+            "workers": self.workers,
+            "busy": active,
+            "queue_size": self.queue_size,
+            "queue_depth": queue_depth,
+            "open_connections": active + queue_depth + len(self.idle),
+            "rejected": rejected,
+            "keepalive": self.idle.stats(),
+        }
+
+
+class _BodyTimeout(Exception):
+    """O corpo da requisição não chegou dentro do prazo"""
+
+
+class _BufferedConnection:
+    """Imita um socket para o handler: lê de um buffer e acumula a resposta.
+
+    Trechos enviados com sendfile() não são lidos para a memória: ficam
+    registrados como (arquivo, offset, count) e o event loop os envia com
+    loop.sendfile() direto para o socket real.
+    """
+
+    def __init__(self, data, loop=None, writer=None):
+        self._rfile = io.BytesIO(data)
+        self._output = []
+        self._loop = loop
+        self._writer = writer
+        self._streaming = False
+
+    def makefile(self, mode, *args, **kwargs):
+        # StreamRequestHandler usa wbufsize=0, então a escrita vai para sendall()
+        return self._rfile
+
+    def sendall(self, data):
+        if self._streaming:
+            if self._writer.is_closing():
+                raise BrokenPipeError("Cliente desconectou")
+            self._loop.call_soon_threadsafe(self._writer.write, bytes(data))
+            return
+        self._output.append(bytes(data))
+
+    def begin_stream(self):
+        """Passa a enviar cada escrita direto ao cliente (ex.: Server-Sent Events)"""
+        if self._loop is None or self._streaming:
+            return
+        pending = [part for part in self._output if isinstance(part, bytes)]
+        self._output = [part for part in self._output if not isinstance(part, bytes)]
+        self._streaming = True
+        if pending:
+            self.sendall(b"".join(pending))
+
+    def sendfile(self, file, offset=0, count=None):
+        if count is None:
+            count = os.fstat(file.fileno()).st_size - offset
+        # O handler fecha o arquivo ao terminar: guardamos um descritor próprio
+        self._output.append((open(os.dup(file.fileno()), 'rb'), offset, count))
+        return count
+
+    def settimeout(self, timeout):
+        pass
+
+    def parts(self):
+        """Resposta em ordem: bytes contíguos ou trechos de arquivo"""
+        merged, pending = [], []
+        for part in self._output:
+            if isinstance(part, bytes):
+                pending.append(part)
+                continue
+            if pending:
+                merged.append(b"".join(pending))
+                pending = []
+            merged.append(part)
+        if pending:
+            merged.append(b"".join(pending))
+        return merged
+
+
+class AsyncioHTTPServer:
+    """Servidor baseado em asyncio.
+
+    O event loop cuida da parte lenta (ler cabeçalhos/corpo e escrever a
+    resposta para o cliente), então um cliente lento não prende nenhum worker.
+    Com a requisição completa em memória, o handler roda em um pool de threads
+    sobre um socket em buffer e devolve a resposta pronta para o loop enviar.
+    """
+
+    engine_name = "asyncio"
+    header_timeout = DEFAULT_HEADER_TIMEOUT
+    drain_timeout = DEFAULT_DRAIN_TIMEOUT
+    keepalive = True
+
+    def __init__(self, server_address, RequestHandlerClass,
+                 workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE, reuse_port=False):
+        self.server_address = server_address
+        self.RequestHandlerClass = RequestHandlerClass
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        # Só a thread do loop mexe nos contadores (os handlers no executor, não)
+        self.rejected = 0
+        self._in_flight = 0
+        self._connections = 0
+        self._idle = set()  # writers de conexões esperando a próxima requisição
+        self.reclaimed = 0
+        self.draining = False
+        self._drained = True
+        self._loop = None
+        self._stop = None
+
+        # Handler que processa exatamente uma requisição do buffer (o
+        # "100 Continue" já foi enviado pelo event loop antes de ler o corpo
+        # e o asyncio já liga TCP_NODELAY no socket real)
+        self._handler_class = type(
+            f"Buffered{RequestHandlerClass.__name__}",
+            (RequestHandlerClass,),
+            {"handle": lambda handler: handler.handle_one_request(),
+             "handle_expect_100": lambda handler: True,
+             "disable_nagle_algorithm": False},
+        )
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="portal-async")
+
+        # Bind imediato para que "porta em uso" apareça como no TCPServer
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        try:
+            self.socket.bind(server_address)
+            self.socket.listen(128)
+        except OSError:
+            self.socket.close()
+            raise
+        self.server_address = self.socket.getsockname()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.server_close()
+
+    def serve_forever(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        server = await asyncio.start_server(self._handle_connection, sock=self.socket,
+                                            limit=MAX_HEADER_BYTES)
+        async with server:
+            await self._stop.wait()
+            # Para de aceitar, atende o que já estava no backlog (o close()
+            # resetaria essas conexões) e deixa as conexões abertas terminarem
+            self._loop.remove_reader(self.socket.fileno())
+            self.draining = True
+            for writer in list(self._idle):
+                writer.close()
+            await asyncio.sleep(0.05)  # handshakes em andamento chegam ao backlog
+            while True:
+                try:
+                    connection, _ = self.socket.accept()
+                except OSError:
+                    break
+                reader, writer = await asyncio.open_connection(sock=connection, limit=MAX_HEADER_BYTES)
+                asyncio.ensure_future(self._handle_connection(reader, writer))
+            server.close()
+            deadline = self._loop.time() + self.drain_timeout
+            while self._connections and self._loop.time() < deadline:
+                await asyncio.sleep(0.05)
+            self._drained = not self._connections
+
+    def shutdown(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    def drain(self, timeout=DEFAULT_DRAIN_TIMEOUT):
+        """A espera acontece dentro do event loop (ver _serve)"""
+        self.socket.close()
+        return self._drained
+
+    def server_close(self):
+        self.socket.close()
+        self._executor.shutdown(wait=False)
+
+    async def _read_request(self, reader, writer, first=b""):
+        """Lê uma requisição completa (cabeçalho + corpo) do cliente.
+        
+        O corpo é lido pelo event loop (um upload lento não ocupa worker)
+        até o limite do handler: acima dele só o que já passou do limite
+        fica no buffer, e o handler responde 413 ao decodificar.
+        """
+        head = first + await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.header_timeout)
+        length = 0
+        chunked = False
+        expect_continue = False
+        for line in head.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                length = int(value.strip() or 0)
+            elif name == b"transfer-encoding":
+                chunked = value.strip().lower() == b"chunked"
+            elif name == b"expect":
+                expect_continue = value.strip().lower() == b"100-continue"
+        max_body = getattr(self.RequestHandlerClass, "max_body_bytes", DEFAULT_MAX_BODY_BYTES)
+        timeout = getattr(self.RequestHandlerClass, "body_timeout", self.header_timeout)
+        if expect_continue and (chunked or 0 < length <= max_body):
+            # O cliente espera a confirmação antes de mandar o corpo
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        try:
+            if chunked:
+                body = await asyncio.wait_for(self._read_chunked(reader, max_body), timeout)
+            elif 0 < length <= max_body:
+                body = await asyncio.wait_for(reader.readexactly(length), timeout)
+            else:
+                body = b""
+        except asyncio.TimeoutError:
+            raise _BodyTimeout() from None
+        return head + body
+    
+    async def _read_chunked(self, reader, max_body):
+        """Corpo chunked mantido no formato original (o handler decodifica)"""
+        parts = []
+        total = 0
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            parts.append(line)
+            size = int(line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                break
+            total += size
+            if total > max_body:
+                break
+            parts.append(await reader.readexactly(size + 2))
+        if total <= max_body:
+            # Trailers até a linha em branco
+            while True:
+                line = await reader.readuntil(b"\r\n")
+                parts.append(line)
+                if line == b"\r\n":
+                    break
+        return b"".join(parts)
+
+    async def _next_request(self, reader, writer, served):
+        """Próxima requisição da conexão, ou None se o cliente saiu/ficou ocioso demais"""
+        first = b""
+        if served:
+            if self.draining:
+                return None
+            # Entre requisições vale o prazo de ociosidade do keep-alive
+            idle_timeout = getattr(self.RequestHandlerClass, "keepalive_timeout",
+                                   DEFAULT_KEEPALIVE_TIMEOUT)
+            self._idle.add(writer)
+            try:
+                first = await asyncio.wait_for(reader.readexactly(1), idle_timeout)
+            except asyncio.TimeoutError:
+                self.reclaimed += 1
+                return None
+            finally:
+                self._idle.discard(writer)
+        return await self._read_request(reader, writer, first)
+
+    async def _handle_connection(self, reader, writer):
+        client_address = writer.get_extra_info("peername")[:2]
+        self._connections += 1
+        served = 0
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    raw = await self._next_request(reader, writer, served)
+                except _BodyTimeout:
+                    writer.write(BODY_TIMEOUT_RESPONSE)
+                    await writer.drain()
+                    return
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        asyncio.TimeoutError, ValueError, ConnectionError):
+                    return
+                if raw is None:
+                    return
+
+                if self._in_flight >= self.workers + self.queue_size:
+                    self.rejected += 1
+                    writer.write(OVERLOAD_RESPONSE)
+                    await writer.drain()
+                    return
+
+                self._in_flight += 1
+                try:
+                    response, keep_alive, served = await self._loop.run_in_executor(
+                        self._executor, self._dispatch, raw, client_address, writer, served)
+                finally:
+                    self._in_flight -= 1
+
+                await self._write_response(writer, response)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self._connections -= 1
+
+    async def _write_response(self, writer, parts):
+        """Envia a resposta; trechos de arquivo vão por loop.sendfile()"""
+        try:
+            for part in parts:
+                if isinstance(part, bytes):
+                    writer.write(part)
+                    continue
+                file, offset, count = part
+                await writer.drain()
+                await self._loop.sendfile(writer.transport, file, offset, count)
+            await writer.drain()
+        finally:
+            for part in parts:
+                if not isinstance(part, bytes):
+                    part[0].close()
+
+    def _dispatch(self, raw, client_address, writer=None, served=0):
+        """Executa o handler sobre a requisição em buffer (roda no pool).
+
+        Retorna (partes da resposta, manter a conexão, requisições atendidas).
+        """
+        connection = _BufferedConnection(raw, self._loop, writer)
+        connection.requests_served = served
+        try:
+            handler = self._handler_class(connection, client_address, self)
+        except Exception:
+            # Mesmo comportamento do socketserver: loga e segue
+            import traceback
+            traceback.print_exc()
+            return connection.parts(), False, served + 1
+        keep_alive = not getattr(handler, 'close_connection', True) and not connection._streaming
+        return connection.parts(), keep_alive, getattr(handler, 'requests_on_connection', served + 1)
+
+    def requests_served(self, request):
+        return getattr(request, 'requests_served', 0)
+
+    def engine_stats(self):
+        return {
+            "engine": self.engine_name,
+            "workers": self.workers,
+            "busy": min(self._in_flight, self.workers),
+            "queue_size": self.queue_size,
+            "queue_depth": max(0, self._in_flight - self.workers),
+            "in_flight": self._in_flight,
+            "open_connections": self._connections,
+            "rejected": self.rejected,
+            "keepalive": {"idle": len(self._idle), "reclaimed": self.reclaimed},
+        }
+
+
+ENGINES = {
+    "single": SingleThreadHTTPServer,
+    "threads": ThreadPoolHTTPServer,
+    "asyncio": AsyncioHTTPServer,
+}
+
+
+def create_server(engine, server_address, handler, workers=DEFAULT_WORKERS,
+                  queue_size=DEFAULT_QUEUE_SIZE, reuse_port=False):
+    """Cria o servidor do motor escolhido"""
+    if engine not in ENGINES:
+        raise ValueError(f"Motor desconhecido: {engine} (opções: {', '.join(ENGINES)})")
+    if reuse_port and not hasattr(socket, "SO_REUSEPORT"):
+        raise OSError("SO_REUSEPORT não é suportado neste sistema")
+    if engine == "single":
+        return SingleThreadHTTPServer(server_address, handler, reuse_port=reuse_port)
+    return ENGINES[engine](server_address, handler, workers=workers, queue_size=queue_size,
+                           reuse_port=reuse_port)
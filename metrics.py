@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Métricas de Requisições
+
+Instrumentação em processo para o PortalScrumHTTPRequestHandler:
+contagem por rota, bytes enviados, status HTTP, hits/misses do cache e
+histogramas de latência com buckets logarítmicos (p50/p95/p99).
+
+Cada thread grava no seu próprio "shard" (sem lock no caminho da
+requisição); /api/stats e /metrics somam os shards na leitura. O custo
+por requisição é de poucos microssegundos.
+"""
+
+import math
+import threading
+import time
+
+# Buckets logarítmicos: 8 por oitava (~9% de resolução), de 1 µs a ~70 s
+BUCKETS_PER_OCTAVE = 8
+MAX_BUCKET = 26 * BUCKETS_PER_OCTAVE
+
+# Limites exportados no histograma Prometheus (segundos)
+PROMETHEUS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                      0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+EXACT_ROUTES = frozenset(('/', '/health', '/metrics', '/api/stats', '/api/blog/search',
+                          '/api/newsletter', '/api/contact'))
+PREFIX_ROUTES = ('/assets/css/', '/assets/js/', '/assets/images/', '/blog/', '/pages/', '/api/',
+                 '/debug/')
+
+
+def route_label(path):
+    """Agrupa o path em uma rota com cardinalidade limitada"""
+    path = path.split('?', 1)[0]
+    if path in EXACT_ROUTES:
+        return path
+    for prefix in PREFIX_ROUTES:
+        if path.startswith(prefix):
+            return prefix + '*'
+    return 'other'
+
+
+def bucket_index(seconds):
+    micros = seconds * 1e6
+    if micros <= 1:
+        return 0
+    return min(MAX_BUCKET, int(math.log2(micros) * BUCKETS_PER_OCTAVE) + 1)
+
+
+def bucket_upper_bound(index):
+    """Limite superior do bucket, em segundos"""
+    return 2 ** (index / BUCKETS_PER_OCTAVE) / 1e6
+
+
+class Histogram:
+    """Histograma de latência com buckets logarítmicos esparsos"""
+
+    __slots__ = ('buckets', 'count', 'total')
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        index = bucket_index(seconds)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+
+    def merge(self, other):
+        for index, count in list(other.buckets.items()):
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+
+    def percentile(self, fraction):
+        """Percentil aproximado (limite superior do bucket), em segundos"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                return bucket_upper_bound(index)
+        return bucket_upper_bound(max(self.buckets))
+
+    def cumulative(self, limits):
+        """Contagens acumuladas até cada limite (formato Prometheus)"""
+        ordered = sorted(self.buckets.items())
+        result, seen, position = [], 0, 0
+        for limit in limits:
+            while position < len(ordered) and bucket_upper_bound(ordered[position][0]) <= limit:
+                seen += ordered[position][1]
+                position += 1
+            result.append(seen)
+        return result
+
+
+class RouteStats:
+    __slots__ = ('count', 'bytes', 'statuses', 'latency', 'cache')
+
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.statuses = {}
+        self.latency = Histogram()
+        self.cache = {}
+
+    def merge(self, other):
+        self.count += other.count
+        self.bytes += other.bytes
+        for status, count in list(other.statuses.items()):
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        for state, count in list(other.cache.items()):
+            self.cache[state] = self.cache.get(state, 0) + count
+        self.latency.merge(other.latency)
+
+
+class Metrics:
+    """Registro de métricas com um shard por thread"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'routes', None)
+        if shard is None:
+            shard = self._local.routes = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def record(self, route, status, nbytes, seconds, cache_status=None):
+        """Registra uma requisição (chamado pelo handler ao terminar)"""
+        shard = self._shard()
+        stats = shard.get(route)
+        if stats is None:
+            stats = shard[route] = RouteStats()
+        stats.count += 1
+        stats.bytes += nbytes
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.latency.observe(seconds)
+        if cache_status:
+            stats.cache[cache_status] = stats.cache.get(cache_status, 0) + 1
+
+    def snapshot(self):
+        """Soma os shards: {rota: RouteStats}"""
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            for route, stats in list(shard.items()):
+                merged.setdefault(route, RouteStats()).merge(stats)
+        return merged
+
+    def summary(self):
+        """Resumo em JSON para /api/stats"""
+        routes = self.snapshot()
+        total = RouteStats()
+        for stats in routes.values():
+            total.merge(stats)
+
+        def describe(stats):
+            hits = stats.cache.get('hit', 0)
+            lookups = hits + stats.cache.get('miss', 0)
+            return {
+                'requests': stats.count,
+                'bytes_sent': stats.bytes,
+                'status': {str(code): count for code, count in sorted(stats.statuses.items())},
+                'cache_hit_ratio': round(hits / lookups, 4) if lookups else None,
+                'latency_ms': {
+                    'mean': round(stats.latency.total / stats.latency.count * 1000, 3) if stats.latency.count else 0.0,
+                    'p50': round(stats.latency.percentile(0.50) * 1000, 3),
+                    'p95': round(stats.latency.percentile(0.95) * 1000, 3),
+                    'p99': round(stats.latency.percentile(0.99) * 1000, 3),
+                },
+            }
+
+        return {
+            'uptime': round(time.time() - self.started_at, 3),
+            'total': describe(total),
+            'routes': {route: describe(stats) for route, stats in sorted(routes.items())},
+        }
+
+    def prometheus(self, extra=()):
+        """Exposição no formato texto do Prometheus"""
+        routes = self.snapshot()
+        lines = [
+            '# HELP portal_uptime_seconds Tempo desde o início do servidor.',
+            '# TYPE portal_uptime_seconds gauge',
+            f'portal_uptime_seconds {time.time() - self.started_at:.3f}',
+            '# HELP portal_requests_total Requisições atendidas por rota e status.',
+            '# TYPE portal_requests_total counter',
+        ]
+        for route, stats in sorted(routes.items()):
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f'portal_requests_total{{route="{route}",status="{status}"}} {count}')
+        lines += ['# HELP portal_response_bytes_total Bytes enviados por rota.',
+                  '# TYPE portal_response_bytes_total counter']
+        for route, stats in sorted(routes.items()):
+            lines.append(f'portal_response_bytes_total{{route="{route}"}} {stats.bytes}')
+        lines += ['# HELP portal_cache_lookups_total Consultas ao cache de conteúdo por resultado.',
+                  '# TYPE portal_cache_lookups_total counter']
+        for route, stats in sorted(routes.items()):
+            for state, count in sorted(stats.cache.items()):
+                lines.append(f'portal_cache_lookups_total{{route="{route}",result="{state}"}} {count}')
+        lines += ['# HELP portal_request_duration_seconds Latência das requisições.',
+                  '# TYPE portal_request_duration_seconds histogram']
+        for route, stats in sorted(routes.items()):
+            histogram = stats.latency
+            for limit, count in zip(PROMETHEUS_BUCKETS, histogram.cumulative(PROMETHEUS_BUCKETS)):
+                lines.append(f'portal_request_duration_seconds_bucket{{route="{route}",le="{limit}"}} {count}')
+            lines.append(f'portal_request_duration_seconds_bucket{{route="{route}",le="+Inf"}} {histogram.count}')
+            lines.append(f'portal_request_duration_seconds_sum{{route="{route}"}} {histogram.total:.6f}')
+            lines.append(f'portal_request_duration_seconds_count{{route="{route}"}} {histogram.count}')
+        for name, kind, help_text, value in extra:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+class CountingWriter:
+    """Envolve o wfile do handler contando os bytes escritos"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return self.raw.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Modo Prefork (master + workers)
+
+python server.py --prefork N sobe um processo master que não atende
+requisições, apenas cuida de N workers:
+
+- Cada worker é um server.py completo que abre a mesma porta com
+  SO_REUSEPORT; o kernel distribui as conexões entre eles (um núcleo
+  de CPU por worker)
+- Worker que morre é recriado (com espera crescente se ele cair logo
+  ao subir, para não entrar em loop)
+- SIGHUP no master faz um reload gradual: para cada worker, sobe um
+  substituto com o código/arquivos novos, espera ele estar escutando e
+  só então pede ao antigo para parar (SIGTERM); o antigo deixa de aceitar
+  conexões e termina as requisições em andamento antes de sair
+- SIGTERM/SIGINT no master encerram todos os workers da mesma forma
+- Cada worker publica suas estatísticas em um diretório compartilhado;
+  o /health de qualquer worker mostra o total de todos
+- Hot reload: só o master varre o projeto (SiteWatcher) e grava cada lote
+  de mudanças em changes.json; os workers seguem esse arquivo com um stat
+  por intervalo (ChangeFollower) em vez de N varreduras da árvore
+"""
+
+import json
+import os
+import select
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from watcher import SiteWatcher
+
+DEFAULT_STATS_DIR = os.path.join('.cache', 'prefork')
+STATS_INTERVAL = 1.0
+READY_TIMEOUT = 30.0
+DEFAULT_DRAIN_TIMEOUT = 30.0
+
+# Worker que cai antes disso conta como falha ao subir (backoff)
+MIN_HEALTHY_SECONDS = 2.0
+MAX_RESTART_DELAY = 10.0
+
+# Lotes de mudanças guardados em changes.json (o worker lê a cada intervalo)
+CHANGES_FILE = 'changes.json'
+MAX_CHANGE_BATCHES = 64
+
+# Opções do master que não são repassadas aos workers (opção, recebe valor)
+MASTER_ONLY_OPTIONS = {'--prefork': True, '--no-browser': False}
+
+
+def worker_argv(argv):
+    """Argumentos do master sem as opções que só valem para ele"""
+    result, skip = [], False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        name = arg.split('=', 1)[0]
+        if name in MASTER_ONLY_OPTIONS:
+            skip = MASTER_ONLY_OPTIONS[name] and '=' not in arg
+            continue
+        result.append(arg)
+    return result
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _write_json(path, data):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+# ----------------------------------------------------------------------
+# Lado do worker
+# ----------------------------------------------------------------------
+
+class ChangeFollower:
+    """No worker, faz o papel do SiteWatcher lendo os lotes gravados pelo master"""
+
+    def __init__(self, stats_dir, interval):
+        self.path = os.path.join(stats_dir, CHANGES_FILE)
+        self.interval = interval
+        self._listeners = []
+        self._stop = threading.Event()
+        self._stat_key = None
+        # Só interessa o que mudar daqui para frente
+        self._seq = self._read()[0]
+        self.polls = 0
+        self.changes = 0
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _read(self):
+        """(último seq, lotes) do arquivo do master"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            return data['seq'], data['batches']
+        except (OSError, ValueError, KeyError):
+            return 0, []
+
+    def poll(self):
+        self.polls += 1
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return []
+        if (st.st_mtime_ns, st.st_size) == self._stat_key:
+            return []
+        self._stat_key = (st.st_mtime_ns, st.st_size)
+        seq, batches = self._read()
+        changed = sorted({rel for batch_seq, files in batches if batch_seq > self._seq for rel in files})
+        self._seq = max(self._seq, seq)
+        if changed:
+            self.changes += len(changed)
+            for callback in self._listeners:
+                try:
+                    callback(changed)
+                except Exception as e:
+                    print(f"⚠️  Erro ao processar mudanças: {e}")
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def start(self):
+        threading.Thread(target=self._run, name='prefork-changes', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {'source': 'master', 'polls': self.polls, 'changes': self.changes,
+                'interval': self.interval}
+
+
+class WorkerRuntime:
+    """Integra um server.py rodando como worker ao master"""
+
+    def __init__(self, worker_id, generation, stats_dir, ready_fd=None,
+                 drain_timeout=DEFAULT_DRAIN_TIMEOUT):
+        self.worker_id = worker_id
+        self.generation = generation
+        self.stats_dir = stats_dir
+        self.ready_fd = ready_fd
+        self.drain_timeout = drain_timeout
+        self.started_at = time.time()
+        self.stopping = threading.Event()
+        self.stats_path = os.path.join(stats_dir, f'worker-{os.getpid()}.json')
+
+    @classmethod
+    def from_arg(cls, spec, stats_dir, ready_fd=None, drain_timeout=DEFAULT_DRAIN_TIMEOUT):
+        """--worker ID:GERAÇÃO"""
+        worker_id, _, generation = spec.partition(':')
+        return cls(int(worker_id), int(generation or 0), stats_dir, ready_fd, drain_timeout)
+
+    def notify_ready(self):
+        """Avisa o master que o socket está escutando"""
+        if self.ready_fd is None:
+            return
+        try:
+            os.write(self.ready_fd, b'R')
+            os.close(self.ready_fd)
+        except OSError:
+            pass
+        self.ready_fd = None
+
+    def serve(self, httpd, collect_stats):
+        """serve_forever até o SIGTERM do master; depois drena e retorna"""
+        # Ctrl+C chega a todo o grupo de processos: quem coordena é o master
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda signum, frame: self._begin_stop(httpd))
+        if hasattr(httpd, 'drain_timeout'):
+            httpd.drain_timeout = self.drain_timeout
+        publisher = threading.Thread(target=self._publish_loop, args=(httpd, collect_stats),
+                                     name='prefork-stats', daemon=True)
+        publisher.start()
+        self.notify_ready()
+        httpd.serve_forever()
+        drained = httpd.drain(self.drain_timeout)
+        if not drained:
+            print(f"⚠️  Worker {self.worker_id}: requisições ainda em andamento após "
+                  f"{self.drain_timeout:.0f}s; encerrando mesmo assim")
+        try:
+            os.remove(self.stats_path)
+        except OSError:
+            pass
+
+    def _begin_stop(self, httpd):
+        if self.stopping.is_set():
+            return
+        self.stopping.set()
+        # shutdown() espera o serve_forever sair: não pode rodar na thread dele
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+    def _publish_loop(self, httpd, collect_stats):
+        while not self.stopping.is_set():
+            try:
+                data = {
+                    'pid': os.getpid(),
+                    'id': self.worker_id,
+                    'generation': self.generation,
+                    'started_at': self.started_at,
+                    'updated_at': time.time(),
+                    'server': httpd.engine_stats(),
+                }
+                data.update(collect_stats())
+                _write_json(self.stats_path, data)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Worker {self.worker_id}: erro ao publicar estatísticas: {e}")
+            self.stopping.wait(STATS_INTERVAL)
+
+
+def aggregate_stats(stats_dir):
+    """Visão do conjunto de workers para o /health"""
+    workers, totals, statuses = [], {'requests': 0, 'bytes_sent': 0}, {}
+    master = None
+    try:
+        names = sorted(os.listdir(stats_dir))
+    except OSError:
+        names = []
+    for name in names:
+        if not name.endswith('.json') or name == CHANGES_FILE:
+            continue
+        try:
+            with open(os.path.join(stats_dir, name), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not _pid_alive(data.get('pid', 0)):
+            continue
+        if name == 'master.json':
+            master = data
+            continue
+        workers.append(data)
+        totals['requests'] += data.get('requests', 0)
+        totals['bytes_sent'] += data.get('bytes_sent', 0)
+        for status, count in data.get('status', {}).items():
+            statuses[status] = statuses.get(status, 0) + count
+    totals['status'] = dict(sorted(statuses.items()))
+    workers.sort(key=lambda data: (data.get('id', 0), data.get('generation', 0)))
+    return {'master': master, 'workers': workers, 'totals': totals}
+
+
+# ----------------------------------------------------------------------
+# Lado do master
+# ----------------------------------------------------------------------
+
+class WorkerProcess:
+    __slots__ = ('worker_id', 'generation', 'process', 'started_at')
+
+    def __init__(self, worker_id, generation, process):
+        self.worker_id = worker_id
+        self.generation = generation
+        self.process = process
+        self.started_at = time.monotonic()
+
+
+class PreforkMaster:
+    """Sobe, vigia, recria e recarrega os workers"""
+
+    def __init__(self, workers, argv, stats_dir=DEFAULT_STATS_DIR,
+                 drain_timeout=DEFAULT_DRAIN_TIMEOUT, script=None, watch_interval=None):
+        self.count = max(1, int(workers))
+        self.argv = worker_argv(argv)
+        self.stats_dir = os.path.abspath(stats_dir)
+        self.drain_timeout = drain_timeout
+        self.script = script or os.path.abspath(sys.argv[0])
+        self.slots = {}
+        self.generation = 0
+        self.restarts = 0
+        self.reloads = 0
+        self.started_at = time.time()
+        self._respawn_at = {}
+        self._fast_failures = {}
+        self._reload_requested = False
+        self._stopping = False
+        self.watch_interval = watch_interval
+        self.watcher = None
+        self._change_seq = 0
+        self._change_batches = []
+
+    # ------------------------------------------------------------------
+
+    def _spawn(self, worker_id, generation):
+        """Inicia um worker e espera ele escutar na porta; None se falhar"""
+        read_fd, write_fd = os.pipe()
+        command = [sys.executable, self.script] + self.argv + [
+            '--no-browser',
+            '--worker', f'{worker_id}:{generation}',
+            '--stats-dir', self.stats_dir,
+            '--ready-fd', str(write_fd),
+            '--drain-s', str(self.drain_timeout),
+        ]
+        try:
+            process = subprocess.Popen(command, pass_fds=(write_fd,))
+        finally:
+            os.close(write_fd)
+        try:
+            ready, _, _ = select.select([read_fd], [], [], READY_TIMEOUT)
+            ok = bool(ready) and os.read(read_fd, 1) == b'R'
+        finally:
+            os.close(read_fd)
+        if not ok:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            return None
+        return WorkerProcess(worker_id, generation, process)
+
+    def _stop_worker(self, worker, wait=True):
+        """SIGTERM (drena e sai); SIGKILL se passar do prazo"""
+        if worker.process.poll() is None:
+            worker.process.send_signal(signal.SIGTERM)
+        if not wait:
+            return
+        try:
+            worker.process.wait(timeout=self.drain_timeout + 5)
+        except subprocess.TimeoutExpired:
+            print(f"⚠️  Worker {worker.worker_id} não encerrou a tempo; SIGKILL")
+            worker.process.kill()
+            worker.process.wait()
+        self._remove_stats(worker.process.pid)
+
+    def _remove_stats(self, pid):
+        try:
+            os.remove(os.path.join(self.stats_dir, f'worker-{pid}.json'))
+        except OSError:
+            pass
+
+    def _reap(self):
+        """Recria workers que morreram (com backoff para falhas ao subir)"""
+        now = time.monotonic()
+        for worker_id, worker in list(self.slots.items()):
+            if worker is None or worker.process.poll() is None:
+                continue
+            code = worker.process.returncode
+            self._remove_stats(worker.process.pid)
+            self.slots[worker_id] = None
+            lived = now - worker.started_at
+            failures = self._fast_failures.get(worker_id, 0) + 1 if lived < MIN_HEALTHY_SECONDS else 0
+            self._fast_failures[worker_id] = failures
+            delay = min(MAX_RESTART_DELAY, 0.5 * (2 ** failures)) if failures else 0
+            self._respawn_at[worker_id] = now + delay
+            print(f"💥 Worker {worker_id} (pid {worker.process.pid}) saiu com código {code}; "
+                  f"recriando{f' em {delay:.1f}s' if delay else ''}")
+        for worker_id, when in list(self._respawn_at.items()):
+            if when > now or self._stopping:
+                continue
+            del self._respawn_at[worker_id]
+            worker = self._spawn(worker_id, self.generation)
+            if worker is None:
+                self._fast_failures[worker_id] = self._fast_failures.get(worker_id, 0) + 1
+                delay = min(MAX_RESTART_DELAY, 0.5 * (2 ** self._fast_failures[worker_id]))
+                self._respawn_at[worker_id] = time.monotonic() + delay
+                print(f"❌ Worker {worker_id} não subiu; nova tentativa em {delay:.1f}s")
+                continue
+            self.slots[worker_id] = worker
+            self.restarts += 1
+
+    def _rolling_reload(self):
+        """Troca um worker por vez: o novo escuta antes do antigo sair"""
+        self.generation += 1
+        print(f"🔄 Reload gradual (geração {self.generation})...")
+        for worker_id in sorted(self.slots):
+            old = self.slots[worker_id]
+            new = self._spawn(worker_id, self.generation)
+            if new is None:
+                print(f"❌ Worker {worker_id} da geração {self.generation} não subiu; "
+                      f"mantendo os workers atuais")
+                return
+            self.slots[worker_id] = new
+            if old is not None:
+                self._stop_worker(old)
+            if self._stopping:
+                return
+        self.reloads += 1
+        print(f"✅ Reload concluído: {self.count} workers na geração {self.generation}")
+
+    def _publish(self):
+        _write_json(os.path.join(self.stats_dir, 'master.json'), {
+            'pid': os.getpid(),
+            'workers': self.count,
+            'alive': sum(1 for worker in self.slots.values()
+                         if worker is not None and worker.process.poll() is None),
+            'generation': self.generation,
+            'restarts': self.restarts,
+            'reloads': self.reloads,
+            'started_at': self.started_at,
+        })
+
+    # ------------------------------------------------------------------
+
+    def _record_changes(self, changed):
+        """Listener do watcher do master: acrescenta o lote ao changes.json"""
+        self._change_seq += 1
+        self._change_batches.append((self._change_seq, changed))
+        del self._change_batches[:-MAX_CHANGE_BATCHES]
+        _write_json(os.path.join(self.stats_dir, CHANGES_FILE),
+                    {'seq': self._change_seq, 'batches': self._change_batches})
+
+    def _on_reload(self, signum, frame):
+        self._reload_requested = True
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def run(self, on_ready=None):
+        os.makedirs(self.stats_dir, exist_ok=True)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        if self.watch_interval is not None:
+            # Antes dos workers: eles começam a seguir a partir do seq atual
+            _write_json(os.path.join(self.stats_dir, CHANGES_FILE), {'seq': 0, 'batches': []})
+            self.watcher = SiteWatcher(os.getcwd(), interval=self.watch_interval)
+            self.watcher.add_listener(self._record_changes)
+            self.watcher.start()
+            print(f"👀 Hot reload no master ({self.watcher.stats()['files']} arquivos observados)")
+
+        for worker_id in range(1, self.count + 1):
+            worker = self._spawn(worker_id, self.generation)
+            if worker is None:
+                print(f"❌ Worker {worker_id} não subiu; encerrando")
+                self._stopping = True
+                break
+            self.slots[worker_id] = worker
+        if not self._stopping:
+            print(f"👷 {self.count} workers no ar (master pid {os.getpid()}; "
+                  f"kill -HUP {os.getpid()} para reload gradual)")
+            if on_ready is not None:
+                on_ready()
+
+        while not self._stopping:
+            self._reap()
+            if self._reload_requested:
+                self._reload_requested = False
+                self._rolling_reload()
+            try:
+                self._publish()
+            except OSError:
+                pass
+            time.sleep(0.2)
+
+        if self.watcher is not None:
+            self.watcher.stop()
+        print("⏹️  Encerrando workers (aguardando requisições em andamento)...")
+        workers = [worker for worker in self.slots.values() if worker is not None]
+        for worker in workers:
+            self._stop_worker(worker, wait=False)
+        for worker in workers:
+            self._stop_worker(worker)
+        for name in ('master.json', CHANGES_FILE):
+            try:
+                os.remove(os.path.join(self.stats_dir, name))
+            except OSError:
+                pass
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Preload dos Recursos Críticos de Cada Página
+
+O navegador só descobre os CSS e scripts de uma página depois de receber e
+começar a interpretar o HTML. Com a lista pronta, o servidor avisa antes:
+
+- extract_preloads(): lê o HTML uma vez (quando a página entra no cache)
+  e devolve os recursos críticos do mesmo site, na ordem do documento:
+  folhas de estilo, scripts externos e os <link rel=preload> já escritos
+- A lista vive na CacheEntry (e no manifesto persistido): muda junto com
+  o HTML, e no modo produção já traz as URLs com fingerprint
+- link_header(): valor do header `Link: <...>; rel=preload; as=style`
+  enviado com a resposta HTML e, com --early-hints, também numa resposta
+  intermediária 103 antes de a página ficar pronta
+"""
+
+import posixpath
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+# Mais que isso disputa banda com o próprio HTML
+MAX_PRELOADS = 8
+
+PRELOAD_AS = frozenset(('style', 'script', 'font', 'image', 'fetch', 'document'))
+
+
+class _PreloadParser(HTMLParser):
+    """Coleta (ref, as, crossorigin) dos recursos que bloqueiam a página"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.found = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'link':
+            href = attrs.get('href')
+            rels = set((attrs.get('rel') or '').lower().split())
+            if not href:
+                return
+            if 'stylesheet' in rels and (attrs.get('media') or 'all').lower() not in ('print', 'none'):
+                self.found.append((href, 'style', None))
+            elif 'preload' in rels and (attrs.get('as') or '').lower() in PRELOAD_AS:
+                self.found.append((href, attrs['as'].lower(), attrs.get('crossorigin')))
+            elif 'modulepreload' in rels:
+                self.found.append((href, 'module', None))
+        elif tag == 'script' and attrs.get('src'):
+            kind = 'module' if (attrs.get('type') or '').lower() == 'module' else 'script'
+            self.found.append((attrs['src'], kind, None))
+
+
+def resolve_ref(key, ref):
+    """Ref do HTML de `key` (ex.: pages/a.html) -> path absoluto, ou None se externa"""
+    ref = ref.strip()
+    parts = urlsplit(ref)
+    if parts.scheme or parts.netloc or not parts.path or ref.startswith('#'):
+        return None
+    if parts.path.startswith('/'):
+        path = posixpath.normpath(parts.path)
+    else:
+        path = posixpath.normpath(posixpath.join('/' + posixpath.dirname(key), parts.path))
+    return f'{path}?{parts.query}' if parts.query else path
+
+
+def extract_preloads(body, key):
+    """Recursos críticos de uma página: tupla de (url, as, crossorigin)"""
+    parser = _PreloadParser()
+    try:
+        parser.feed(body.decode('utf-8', 'replace'))
+        parser.close()
+    except AssertionError:
+        # HTMLParser ainda levanta AssertionError em marcação muito quebrada
+        pass
+    hints, seen = [], set()
+    for ref, kind, crossorigin in parser.found:
+        url = resolve_ref(key, ref)
+        if url is None or url in seen:
+            continue
+        seen.add(url)
+        hints.append((url, kind, crossorigin))
+        if len(hints) >= MAX_PRELOADS:
+            break
+    return tuple(hints)
+
+
+def link_header(hints):
+    """Valor do header Link para os preloads (None se não houver)"""
+    links = []
+    for url, kind, crossorigin in hints:
+        if kind == 'module':
+            link = f'<{url}>; rel=modulepreload'
+        else:
+            link = f'<{url}>; rel=preload; as={kind}'
+            if crossorigin is not None:
+                link += f'; crossorigin={crossorigin}' if crossorigin else '; crossorigin'
+        links.append(link)
+    return ', '.join(links) or None
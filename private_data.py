@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Diretório dos Dados Privados
+
+O servidor publica a pasta do projeto inteira, então nada com dados de
+visitantes (formulários, inscritos, logs de acesso, capturas de tráfego)
+pode ficar dentro dela. O padrão é um diretório fora do projeto:
+
+- $PORTAL_DATA_DIR, se definido
+- senão $XDG_DATA_HOME/portal-scrum (normalmente ~/.local/share/portal-scrum)
+
+Além disso, o servidor responde 404 para /data/, /.cache/ e caminhos com
+segmentos ocultos (is_private_path), mesmo que algo seja gravado ali com
+--data-dir, --access-log ou --capture.
+"""
+
+import os
+import posixpath
+from urllib.parse import unquote
+
+# Pastas do projeto que nunca saem como arquivo do site
+PRIVATE_DIRS = frozenset(('data', '.cache'))
+
+# Único segmento oculto público (ACME, security.txt, ...)
+PUBLIC_DOT_DIRS = frozenset(('.well-known',))
+
+# Onde os dados ficavam antes (dentro da pasta publicada)
+LEGACY_DIRECTORY = os.path.join('data', 'submissions')
+
+
+def data_home():
+    """Diretório base dos dados privados (fora da pasta publicada)"""
+    base = os.environ.get('PORTAL_DATA_DIR')
+    if base:
+        return base
+    xdg = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(xdg, 'portal-scrum')
+
+
+def data_path(*parts):
+    return os.path.join(data_home(), *parts)
+
+
+def is_private_path(url_path):
+    """URL que aponta para dados, caches ou arquivos ocultos do projeto?"""
+    # Mesma decodificação do translate_path: /%64ata/ e /pages/../data/ também contam
+    path = posixpath.normpath(unquote(url_path.split('?', 1)[0]))
+    segments = [segment for segment in path.split('/') if segment]
+    if not segments:
+        return False
+    if segments[0] in PRIVATE_DIRS:
+        return True
+    return any(segment.startswith('.') and segment not in PUBLIC_DOT_DIRS for segment in segments)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Limite de Taxa e Descarte por Sobrecarga
+
+Protege as rotas de POST (/api/contact, /api/newsletter) de rajadas de bots
+sem afetar o tráfego estático:
+
+- Token bucket por (rota, IP do cliente): cada rota tem sua taxa e rajada
+  máxima; sem fichas o cliente recebe 429 com Retry-After
+- A tabela de buckets é limitada (LRU) e expira sozinha: um bucket parado
+  tempo suficiente para encher de novo equivale a um cliente novo e é
+  removido na próxima varredura
+- Limite global de requisições em andamento nas rotas limitadas: acima dele
+  a resposta é um 503 imediato com Retry-After, antes de ler o corpo
+- Contadores por rota (permitidas, 429, 503) para o /health e o /metrics
+
+No modo prefork cada worker tem a sua tabela (o limite efetivo por cliente
+pode chegar a N vezes o configurado).
+"""
+
+import collections
+import re
+import threading
+import time
+
+DEFAULT_MAX_CLIENTS = 10000
+DEFAULT_MAX_INFLIGHT = 8
+
+# Rodadas de admit() entre duas varreduras de buckets expirados
+SWEEP_EVERY = 256
+
+# Sugestão de espera quando o servidor está saturado (503)
+SHED_RETRY_AFTER = 1
+
+PERIODS = {'s': 1, 'sec': 1, 'min': 60, 'm': 60, 'h': 3600}
+
+# 5/min, 10/30s, 100/h:20 (rajada de 20)
+RULE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*/\s*(\d*(?:\.\d+)?)\s*([a-z]*)\s*(?::\s*(\d+))?\s*$')
+
+
+class RouteLimit:
+    """Taxa de uma rota: `rate` fichas por segundo, até `burst` acumuladas"""
+
+    __slots__ = ('rate', 'burst')
+
+    def __init__(self, rate, burst):
+        if rate <= 0 or burst < 1:
+            raise ValueError("taxa e rajada precisam ser positivas")
+        self.rate = rate
+        self.burst = burst
+
+    @property
+    def refill_seconds(self):
+        """Tempo para um bucket vazio encher de novo"""
+        return self.burst / self.rate
+
+    def describe(self):
+        return {'per_minute': round(self.rate * 60, 3), 'burst': self.burst}
+
+
+DEFAULT_RULES = {
+    '/api/contact': RouteLimit(5 / 60, 5),
+    '/api/newsletter': RouteLimit(10 / 60, 10),
+}
+
+
+def parse_rule(text):
+    """'5/min' -> RouteLimit(5/60, 5); '100/h:20' -> RouteLimit(100/3600, 20)"""
+    match = RULE_RE.match(text.lower())
+    if not match:
+        raise ValueError(f"regra inválida: {text!r}")
+    count, amount, unit, burst = match.groups()
+    if unit and unit not in PERIODS:
+        raise ValueError(f"unidade inválida em {text!r} (use s, min ou h)")
+    seconds = float(amount or 1) * PERIODS.get(unit, 1)
+    count = float(count)
+    return RouteLimit(count / seconds, int(burst) if burst else max(1, int(count)))
+
+
+def parse_rules(spec):
+    """'/api/contact=5/min,/api/newsletter=20/min:5' -> {rota: RouteLimit}"""
+    rules = dict(DEFAULT_RULES)
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        route, _, rule = item.partition('=')
+        rules[route.strip()] = parse_rule(rule)
+    return rules
+
+
+class RouteCounters:
+    __slots__ = ('allowed', 'limited', 'shed')
+
+    def __init__(self):
+        self.allowed = 0
+        self.limited = 0
+        self.shed = 0
+
+
+class RateLimiter:
+    """Token buckets por cliente + limite global de requisições em andamento"""
+
+    def __init__(self, rules=None, max_clients=DEFAULT_MAX_CLIENTS, max_inflight=DEFAULT_MAX_INFLIGHT,
+                 clock=time.monotonic):
+        self.rules = dict(DEFAULT_RULES if rules is None else rules)
+        self.max_clients = max(1, max_clients)
+        self.max_inflight = max_inflight
+        self.clock = clock
+        self._buckets = collections.OrderedDict()  # (rota, cliente) -> [fichas, último acesso]
+        self._lock = threading.Lock()
+        self._counters = {route: RouteCounters() for route in self.rules}
+        self._admits = 0
+        self.inflight = 0
+        self.peak_inflight = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def limits(self, route):
+        return route in self.rules
+
+    def admit(self, route, client):
+        """
+        Decide se a requisição pode seguir.
+
+        Retorna None quando admitida (chame release() ao terminar) ou
+        (status, retry_after) com 503 para servidor saturado e 429 para
+        cliente acima da taxa.
+        """
+        rule = self.rules[route]
+        counters = self._counters[route]
+        with self._lock:
+            # Saturado: descarta sem gastar ficha do cliente
+            if self.max_inflight and self.inflight >= self.max_inflight:
+                counters.shed += 1
+                return 503, SHED_RETRY_AFTER
+
+            now = self.clock()
+            key = (route, client)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(rule.burst), now]
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(rule.burst, bucket[0] + (now - bucket[1]) * rule.rate)
+                bucket[1] = now
+
+            self._admits += 1
+            if self._admits % SWEEP_EVERY == 0:
+                self._sweep(now)
+
+            if bucket[0] < 1.0:
+                counters.limited += 1
+                return 429, max(1, int((1.0 - bucket[0]) / rule.rate + 0.999))
+
+            bucket[0] -= 1.0
+            counters.allowed += 1
+            self.inflight += 1
+            if self.inflight > self.peak_inflight:
+                self.peak_inflight = self.inflight
+        return None
+
+    def release(self):
+        with self._lock:
+            self.inflight -= 1
+
+    def _sweep(self, now):
+        """Remove do início da LRU os buckets que já teriam enchido de novo"""
+        buckets = self._buckets
+        while buckets:
+            (route, _), (_, last) = next(iter(buckets.items()))
+            if now - last < self.rules[route].refill_seconds:
+                break
+            buckets.popitem(last=False)
+            self.expired += 1
+
+    def stats(self):
+        with self._lock:
+            routes = {route: dict(rule.describe(),
+                                  allowed=self._counters[route].allowed,
+                                  limited=self._counters[route].limited,
+                                  shed=self._counters[route].shed)
+                      for route, rule in self.rules.items()}
+            return {
+                'routes': routes,
+                'clients': len(self._buckets),
+                'max_clients': self.max_clients,
+                'evicted': self.evicted,
+                'expired': self.expired,
+                'inflight': self.inflight,
+                'peak_inflight': self.peak_inflight,
+                'max_inflight': self.max_inflight,
+            }
+
+    def totals(self):
+        """Somatório dos contadores (para o /metrics)"""
+        with self._lock:
+            return {
+                'limited': sum(counter.limited for counter in self._counters.values()),
+                'shed': sum(counter.shed for counter in self._counters.values()),
+                'inflight': self.inflight,
+                'clients': len(self._buckets),
+            }
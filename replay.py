@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Replay do Tráfego Capturado
+
+Reproduz contra um servidor local as requisições gravadas com
+`python server.py --capture`, respeitando o intervalo original entre elas
+(ou acelerado), para validar mudanças no servidor com a mistura real de
+artigos, assets e formulários em vez de uma carga sintética:
+
+- --speed 1 mantém os intervalos, 10 comprime 10x, "max" dispara tudo o
+  mais rápido que --concurrency conexões conseguem
+- Cada cliente reaproveita a sua conexão (keep-alive), como um navegador
+- Compara o status de cada resposta com o status capturado e agrupa as
+  divergências por método, path e status
+- Latência p50/p90/p99/máx no total e por rota, lado a lado com a
+  duração registrada na captura; o atraso do agendador ("lag") mostra
+  quando o próprio cliente não deu conta do ritmo pedido
+
+POSTs reais são reenviados: os formulários vão para o --data-dir do
+servidor de teste, e o limite de taxa (429) costuma disparar em replays
+acelerados (suba o servidor com --rate-limit off).
+
+Uso:
+    python server.py replay                                # capture/traffic*.jsonl dos dados privados
+    python server.py replay --speed 10 --concurrency 32
+    python server.py replay captura.jsonl --speed max --url http://localhost:3000
+"""
+
+import argparse
+import glob
+import http.client
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from metrics import route_label
+from traffic_capture import DEFAULT_CAPTURE_PATH, decode_body
+
+DEFAULT_URL = 'http://localhost:8000'
+DEFAULT_CONCURRENCY = 16
+DEFAULT_OUTPUT = os.path.join('.cache', 'replay-last.json')
+REQUEST_TIMEOUT = 30.0
+
+# O replay usa a própria conexão e o próprio Host
+SKIPPED_HEADERS = frozenset(('host', 'content-length', 'connection', 'keep-alive'))
+
+# Lag do agendador acima disto indica que o cliente não acompanhou o ritmo
+LAG_WARNING_MS = 50.0
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        'count': len(values),
+        'p50': round(percentile(values, 0.50), 2),
+        'p90': round(percentile(values, 0.90), 2),
+        'p95': round(percentile(values, 0.95), 2),
+        'p99': round(percentile(values, 0.99), 2),
+        'max': round(values[-1], 2) if values else 0.0,
+    }
+
+
+def default_files():
+    base, ext = os.path.splitext(DEFAULT_CAPTURE_PATH)
+    # Inclui os arquivos por worker do modo prefork (traffic-w1.jsonl, ...)
+    return sorted(glob.glob(f'{base}{ext}') + glob.glob(f'{base}-w*{ext}'))
+
+
+def load_requests(paths, methods=None, limit=0):
+    """Registros de requisição de todos os arquivos, em ordem de chegada"""
+    records = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Última linha pode estar incompleta se o servidor caiu
+                    continue
+                if record.get('type') != 'request':
+                    continue
+                if methods and record['method'] not in methods:
+                    continue
+                records.append(record)
+    records.sort(key=lambda record: record['ts'])
+    return records[:limit] if limit else records
+
+
+class Replayer:
+    """Dispara os registros no ritmo pedido com `concurrency` conexões"""
+
+    def __init__(self, base_url=DEFAULT_URL, concurrency=DEFAULT_CONCURRENCY, speed=1.0):
+        parts = urlsplit(base_url if '://' in base_url else f'http://{base_url}')
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or 80
+        self.base_url = f'http://{parts.netloc}'
+        self.concurrency = max(1, concurrency)
+        # 0 = o mais rápido possível
+        self.speed = speed
+        self.results = []
+        self._lock = threading.Lock()
+
+    def _send(self, conn, record):
+        headers = {name: value for name, value in record['headers']
+                   if name.lower() not in SKIPPED_HEADERS}
+        body = decode_body(record) if record['method'] in ('POST', 'PUT', 'PATCH') else None
+        conn.request(record['method'], record['path'], body=body, headers=headers)
+        response = conn.getresponse()
+        data = response.read()
+        if response.will_close:
+            conn.close()
+        return response.status, len(data)
+
+    def _worker(self, jobs):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=REQUEST_TIMEOUT)
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            record, scheduled = job
+            started = time.perf_counter()
+            status, nbytes, error = None, 0, None
+            # Conexão ociosa fechada pelo servidor: tenta de novo numa nova
+            # (POST não, para não gravar o formulário duas vezes)
+            for attempt in range(1 if record['method'] == 'POST' else 2):
+                try:
+                    status, nbytes = self._send(conn, record)
+                    error = None
+                    break
+                except (http.client.HTTPException, OSError) as e:
+                    conn.close()
+                    error = f'{type(e).__name__}: {e}'
+            finished = time.perf_counter()
+            result = {
+                'method': record['method'],
+                'path': record['path'],
+                'route': route_label(record['path']),
+                'expected': record.get('status'),
+                'status': status,
+                'error': error,
+                'bytes': nbytes,
+                'ms': (finished - started) * 1000,
+                'lag_ms': max(0.0, (started - scheduled) * 1000) if self.speed else 0.0,
+                'captured_ms': record.get('duration_ms'),
+                'comparable': 'truncated' not in record,
+            }
+            with self._lock:
+                self.results.append(result)
+        conn.close()
+
+    def run(self, records):
+        """Reproduz os registros; retorna o tempo total em segundos"""
+        jobs = queue.Queue(maxsize=self.concurrency * 4)
+        workers = [threading.Thread(target=self._worker, args=(jobs,), name=f'replay-{index}',
+                                    daemon=True) for index in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        started = time.perf_counter()
+        first_ts = records[0]['ts'] if records else 0.0
+        for record in records:
+            scheduled = started
+            if self.speed:
+                scheduled = started + (record['ts'] - first_ts) / self.speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            jobs.put((record, scheduled))
+        for _ in workers:
+            jobs.put(None)
+        for worker in workers:
+            worker.join()
+        return time.perf_counter() - started
+
+
+def build_report(results, elapsed, records, args):
+    ok = [result for result in results if result['status'] is not None]
+    mismatches = Counter()
+    compared = 0
+    for result in ok:
+        if result['expected'] is None or not result['comparable']:
+            continue
+        compared += 1
+        if result['status'] != result['expected']:
+            mismatches[(result['method'], result['path'].split('?', 1)[0],
+                        result['expected'], result['status'])] += 1
+    routes = {}
+    for route in sorted({result['route'] for result in ok}):
+        subset = [result for result in ok if result['route'] == route]
+        routes[route] = {
+            'replay_ms': summarize([result['ms'] for result in subset]),
+            'captured_ms': summarize([result['captured_ms'] for result in subset
+                                      if result['captured_ms'] is not None]),
+            'status': dict(Counter(str(result['status']) for result in subset)),
+        }
+    span = (records[-1]['ts'] - records[0]['ts']) if records else 0.0
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'base_url': args.url,
+        'files': args.files,
+        'speed': args.speed,
+        'concurrency': args.concurrency,
+        'requests': len(results),
+        'errors': len(results) - len(ok),
+        'captured_seconds': round(span, 3),
+        'seconds': round(elapsed, 3),
+        'rps': round(len(results) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': summarize([result['ms'] for result in ok]),
+        'lag_ms': summarize([result['lag_ms'] for result in results]),
+        'status': dict(Counter(str(result['status']) for result in results)),
+        'compared': compared,
+        'mismatches': [{'method': method, 'path': path, 'expected': expected, 'status': status,
+                        'count': count}
+                       for (method, path, expected, status), count in mismatches.most_common()],
+        'mismatch_count': sum(mismatches.values()),
+        'routes': routes,
+    }
+
+
+def print_report(report):
+    latency = report['latency_ms']
+    print(f"\n📊 {report['requests']} requisições em {report['seconds']:.2f}s "
+          f"({report['rps']:.1f} req/s; captura original: {report['captured_seconds']:.1f}s)")
+    print(f"   latência p50 {latency['p50']:.1f} ms, p90 {latency['p90']:.1f} ms, "
+          f"p99 {latency['p99']:.1f} ms, máx {latency['max']:.1f} ms")
+    print(f"   status {', '.join(f'{status}: {count}' for status, count in sorted(report['status'].items()))}")
+    print(f"\n{'rota':<22} {'req':>6} {'p50':>8} {'p95':>8} {'p99':>8}   {'capturado p50/p95':>18}")
+    for route, data in report['routes'].items():
+        replay, captured = data['replay_ms'], data['captured_ms']
+        print(f"{route[:22]:<22} {replay['count']:>6} {replay['p50']:>8.1f} {replay['p95']:>8.1f} "
+              f"{replay['p99']:>8.1f}   {captured['p50']:>8.1f}/{captured['p95']:<8.1f}")
+    if report['lag_ms']['p99'] > LAG_WARNING_MS:
+        print(f"\n⚠️  O cliente atrasou até {report['lag_ms']['p99']:.0f} ms (p99) em relação ao ritmo "
+              f"pedido: aumente --concurrency ou reduza --speed")
+    if report['errors']:
+        print(f"\n❌ {report['errors']} requisições sem resposta")
+    if report['mismatches']:
+        print(f"\n❌ {report['mismatch_count']} de {report['compared']} respostas com status "
+              f"diferente do capturado:")
+        for item in report['mismatches'][:15]:
+            print(f"   {item['method']} {item['path']}: {item['expected']} -> {item['status']} "
+                  f"({item['count']}x)")
+        if any(item['status'] == 429 for item in report['mismatches']):
+            print("💡 429: suba o servidor de teste com --rate-limit off para replays acelerados")
+
+
+def parse_speed(value):
+    if value.lower() in ('max', '0'):
+        return 0.0
+    speed = float(value.lower().rstrip('x'))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError('a velocidade deve ser positiva ou "max"')
+    return speed
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='server.py replay',
+                                     description='Reproduz o tráfego capturado com --capture')
+    parser.add_argument('files', nargs='*',
+                        help='arquivos da captura (padrão: ~/.local/share/portal-scrum/capture/traffic*.jsonl)')
+    parser.add_argument('--url', default=DEFAULT_URL, help=f'servidor alvo (padrão: {DEFAULT_URL})')
+    parser.add_argument('--speed', type=parse_speed, default=1.0,
+                        help='1 = ritmo original, 10 = 10x mais rápido, max = sem esperar (padrão: 1)')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='conexões simultâneas (padrão: 16)')
+    parser.add_argument('--methods', default='',
+                        help='só estes métodos, ex.: GET,HEAD (padrão: todos)')
+    parser.add_argument('--limit', type=int, default=0, help='reproduz só as N primeiras requisições')
+    parser.add_argument('--max-mismatch', type=float, default=0.0,
+                        help='fração de status divergentes tolerada antes do código 1 (padrão: 0)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='onde gravar o resultado (JSON)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    args.files = args.files or default_files()
+    if not args.files:
+        print(f"❌ Nenhuma captura encontrada em {os.path.dirname(DEFAULT_CAPTURE_PATH)}/")
+        print("💡 Grave tráfego antes: python server.py --capture")
+        return 2
+    methods = {method.strip().upper() for method in args.methods.split(',') if method.strip()}
+    try:
+        records = load_requests(args.files, methods=methods, limit=args.limit)
+    except OSError as e:
+        print(f"❌ Não foi possível ler a captura: {e}")
+        return 2
+    if not records:
+        print("❌ A captura não tem requisições para reproduzir")
+        return 2
+
+    replayer = Replayer(args.url, concurrency=args.concurrency, speed=args.speed)
+    speed = 'máxima' if not args.speed else f'{args.speed:g}x'
+    print(f"🎬 Replay de {len(records)} requisições contra {replayer.base_url} "
+          f"(velocidade {speed}, {replayer.concurrency} conexões)")
+    elapsed = replayer.run(records)
+    report = build_report(replayer.results, elapsed, records, args)
+    print_report(report)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n📄 Resultado: {args.output}")
+
+    if report['errors'] == len(records):
+        print("💡 O servidor está rodando? python server.py --no-browser")
+        return 2
+    mismatch_rate = report['mismatch_count'] / report['compared'] if report['compared'] else 0.0
+    if report['errors'] or mismatch_rate > args.max_mismatch:
+        return 1
+    print("✅ Todas as respostas com o status capturado")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Leitura do Corpo das Requisições
+
+Substitui o `rfile.read(int(Content-Length))` dos formulários:
+
+- Lê o corpo em pedaços (Content-Length ou Transfer-Encoding: chunked),
+  sem nunca pedir mais do que o limite configurado
+- Content-Length acima do limite vira 413 antes de ler qualquer byte;
+  no chunked o 413 sai assim que a soma dos pedaços passa do limite
+- Timeout por leitura no socket e prazo total para o corpo inteiro: um
+  upload lento recebe 408 em vez de prender o worker
+- Decodificação incremental: urlencoded campo a campo, multipart por
+  partes (arquivos não ficam em memória, só os metadados) e JSON
+  acumulado até o limite
+"""
+
+import json
+import re
+import socket
+import time
+from urllib.parse import unquote_plus
+
+DEFAULT_MAX_BODY_BYTES = 1024 * 1024
+DEFAULT_BODY_TIMEOUT = 30.0
+READ_CHUNK_BYTES = 64 * 1024
+
+MAX_FIELDS = 1000
+MAX_CHUNK_LINE = 1024
+MAX_PART_HEADER_BYTES = 16 * 1024
+
+PARAM_RE = re.compile(r';\s*([\w-]+)\s*=\s*(?:"((?:[^"\\]|\\.)*)"|([^;\s]*))')
+
+
+class BodyError(Exception):
+    """Corpo inválido; `status` é a resposta HTTP adequada (400, 408, 413, ...)"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_header_params(value):
+    """'multipart/form-data; boundary="x"' -> ('multipart/form-data', {'boundary': 'x'})"""
+    value = value or ''
+    main, _, _ = value.partition(';')
+    params = {}
+    for match in PARAM_RE.finditer(value[len(main):]):
+        quoted = match.group(2)
+        params[match.group(1).lower()] = quoted.replace('\\"', '"') if quoted is not None else match.group(3)
+    return main.strip().lower(), params
+
+
+def _add_field(fields, name, value):
+    if name in fields:
+        current = fields[name]
+        if isinstance(current, list):
+            current.append(value)
+        else:
+            fields[name] = [current, value]
+    else:
+        if len(fields) >= MAX_FIELDS:
+            raise BodyError(413, "Campos demais no formulário")
+        fields[name] = value
+
+
+# ----------------------------------------------------------------------
+# Leitura do corpo
+# ----------------------------------------------------------------------
+
+class BodyReader:
+    """Itera sobre o corpo da requisição em pedaços, respeitando limite e prazo"""
+
+    def __init__(self, rfile, headers, max_bytes=DEFAULT_MAX_BODY_BYTES,
+                 timeout=DEFAULT_BODY_TIMEOUT, connection=None):
+        self.rfile = rfile
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.connection = connection
+        self.bytes_read = 0
+
+        encoding = (headers.get('Transfer-Encoding') or '').strip().lower()
+        length = headers.get('Content-Length')
+        self.chunked = encoding == 'chunked'
+        if encoding and not self.chunked:
+            raise BodyError(501, f"Transfer-Encoding não suportado: {encoding}")
+        self.length = 0
+        if not self.chunked and length is not None:
+            try:
+                self.length = int(length)
+            except ValueError:
+                raise BodyError(400, "Content-Length inválido") from None
+            if self.length < 0:
+                raise BodyError(400, "Content-Length inválido")
+            if self.length > self.max_bytes:
+                raise BodyError(413, f"Corpo maior que {self.max_bytes} bytes")
+
+    def __iter__(self):
+        deadline = time.monotonic() + self.timeout
+        self._settimeout = getattr(self.connection, 'settimeout', None)
+        try:
+            chunks = self._chunked(deadline) if self.chunked else self._sized(deadline)
+            for data in chunks:
+                self.bytes_read += len(data)
+                if self.bytes_read > self.max_bytes:
+                    raise BodyError(413, f"Corpo maior que {self.max_bytes} bytes")
+                yield data
+        except (socket.timeout, TimeoutError):
+            raise BodyError(408, "Tempo esgotado lendo o corpo da requisição") from None
+        finally:
+            if self._settimeout is not None:
+                self._settimeout(None)
+
+    def _wait_limit(self, deadline):
+        """Cada leitura do socket espera no máximo o que resta do prazo"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise BodyError(408, "Tempo esgotado lendo o corpo da requisição")
+        if self._settimeout is not None:
+            self._settimeout(remaining)
+
+    def _read1(self, size, deadline):
+        self._wait_limit(deadline)
+        data = self.rfile.read1(size)
+        if not data:
+            raise BodyError(400, "Conexão encerrada no meio do corpo")
+        return data
+
+    def _sized(self, deadline):
+        remaining = self.length
+        while remaining > 0:
+            data = self._read1(min(remaining, READ_CHUNK_BYTES), deadline)
+            remaining -= len(data)
+            yield data
+
+    def _chunked(self, deadline):
+        while True:
+            self._wait_limit(deadline)
+            line = self.rfile.readline(MAX_CHUNK_LINE)
+            if not line.endswith(b'\n'):
+                raise BodyError(400, "Chunk malformado")
+            try:
+                size = int(line.split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                raise BodyError(400, "Tamanho de chunk inválido") from None
+            if size == 0:
+                break
+            if self.bytes_read + size > self.max_bytes:
+                raise BodyError(413, f"Corpo maior que {self.max_bytes} bytes")
+            while size > 0:
+                data = self._read1(min(size, READ_CHUNK_BYTES), deadline)
+                size -= len(data)
+                yield data
+            if self.rfile.readline(MAX_CHUNK_LINE).strip():
+                raise BodyError(400, "Chunk malformado")
+        # Trailers: ignorados até a linha em branco
+        for _ in range(100):
+            self._wait_limit(deadline)
+            if not self.rfile.readline(MAX_CHUNK_LINE).strip():
+                return
+        raise BodyError(400, "Trailers demais")
+
+
+# ----------------------------------------------------------------------
+# Decodificadores incrementais
+# ----------------------------------------------------------------------
+
+class UrlencodedDecoder:
+    """a=1&b=2 decodificado campo a campo conforme os bytes chegam"""
+
+    def __init__(self, params=None):
+        self.fields = {}
+        self._pending = b''
+
+    def feed(self, data):
+        pieces = (self._pending + data).split(b'&')
+        self._pending = pieces.pop()
+        for piece in pieces:
+            self._field(piece)
+
+    def _field(self, piece):
+        if not piece:
+            return
+        name, _, value = piece.decode('utf-8', 'replace').partition('=')
+        _add_field(self.fields, unquote_plus(name), unquote_plus(value))
+
+    def close(self):
+        self._field(self._pending.strip())
+        self._pending = b''
+        return self.fields
+
+
+class JsonDecoder:
+    """JSON precisa do documento inteiro: acumula (o BodyReader limita o tamanho)"""
+
+    def __init__(self, params=None):
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        self._buffer += data
+
+    def close(self):
+        text = self._buffer.decode('utf-8', 'replace')
+        try:
+            return json.loads(text)
+        except ValueError:
+            return {"raw": text}
+
+
+class MultipartDecoder:
+    """multipart/form-data processado parte a parte.
+
+    Campos de texto viram valores no dicionário; arquivos são contados e
+    descartados, ficando só {"filename", "content_type", "size"}.
+    """
+
+    def __init__(self, params):
+        boundary = (params or {}).get('boundary')
+        if not boundary or len(boundary) > 200:
+            raise BodyError(400, "multipart sem boundary")
+        self.fields = {}
+        self._delimiter = b'--' + boundary.encode('latin-1')
+        self._separator = b'\r\n' + self._delimiter
+        self._buffer = b''
+        self._state = 'preamble'
+        self._part = None
+
+    def feed(self, data):
+        self._buffer += data
+        while self._step():
+            pass
+
+    def _step(self):
+        """Avança a máquina de estados; retorna False quando precisa de mais bytes"""
+        buffer = self._buffer
+        if self._state == 'preamble':
+            index = buffer.find(self._delimiter)
+            if index < 0:
+                # Guarda só o bastante para achar um delimitador partido
+                self._buffer = buffer[-len(self._delimiter):]
+                return False
+            self._buffer = buffer[index + len(self._delimiter):]
+            self._state = 'after_delimiter'
+            return True
+        if self._state == 'after_delimiter':
+            if len(buffer) < 2:
+                return False
+            if buffer.startswith(b'--'):
+                self._state = 'epilogue'
+                self._buffer = b''
+                return False
+            end = buffer.find(b'\r\n\r\n')
+            if end < 0:
+                if len(buffer) > MAX_PART_HEADER_BYTES:
+                    raise BodyError(400, "Cabeçalho de parte multipart muito grande")
+                return False
+            self._start_part(buffer[:end].decode('utf-8', 'replace'))
+            self._buffer = buffer[end + 4:]
+            self._state = 'body'
+            return True
+        if self._state == 'body':
+            index = buffer.find(self._separator)
+            if index < 0:
+                # Tudo menos um possível começo de delimitador pode ser consumido
+                keep = len(self._separator) - 1
+                if len(buffer) > keep:
+                    self._part_data(buffer[:-keep])
+                    self._buffer = buffer[-keep:]
+                return False
+            self._part_data(buffer[:index])
+            self._finish_part()
+            self._buffer = buffer[index + len(self._separator):]
+            self._state = 'after_delimiter'
+            return True
+        self._buffer = b''
+        return False
+
+    def _start_part(self, head):
+        headers = {}
+        for line in head.split('\r\n'):
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        _, params = parse_header_params(headers.get('content-disposition', ''))
+        self._part = {
+            'name': params.get('name', ''),
+            'filename': params.get('filename'),
+            'content_type': headers.get('content-type', 'text/plain'),
+            'size': 0,
+            'data': bytearray(),
+        }
+
+    def _part_data(self, data):
+        part = self._part
+        part['size'] += len(data)
+        if part['filename'] is None:
+            part['data'] += data
+
+    def _finish_part(self):
+        part, self._part = self._part, None
+        if part['filename'] is None:
+            value = part['data'].decode('utf-8', 'replace')
+        else:
+            value = {'filename': part['filename'], 'content_type': part['content_type'],
+                     'size': part['size']}
+        _add_field(self.fields, part['name'], value)
+
+    def close(self):
+        if self._state != 'epilogue':
+            raise BodyError(400, "multipart incompleto")
+        return self.fields
+
+
+DECODERS = {
+    'application/x-www-form-urlencoded': UrlencodedDecoder,
+    'application/json': JsonDecoder,
+    'multipart/form-data': MultipartDecoder,
+}
+
+
+def read_form(rfile, headers, max_bytes=DEFAULT_MAX_BODY_BYTES, timeout=DEFAULT_BODY_TIMEOUT,
+              connection=None, on_data=None):
+    """
+    Lê e decodifica o corpo de um formulário.
+
+    Retorna (campos, bytes lidos). Levanta BodyError com o status HTTP
+    quando o corpo é grande demais, lento demais ou malformado. Tipos de
+    conteúdo desconhecidos são tratados como urlencoded. `on_data`, se
+    informado, recebe cada pedaço do corpo já decodificado do chunked.
+    """
+    reader = BodyReader(rfile, headers, max_bytes=max_bytes, timeout=timeout, connection=connection)
+    content_type, params = parse_header_params(headers.get('Content-Type'))
+    decoder = DECODERS.get(content_type, UrlencodedDecoder)(params)
+    for data in reader:
+        if on_data is not None:
+            on_data(data)
+        decoder.feed(data)
+    return decoder.close(), reader.bytes_read
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Tabela de Rotas, Cache Negativo e Regras do netlify.toml
+
+- Router: rotas exatas em um dicionário e rotas por prefixo em uma lista
+  ordenada (a mais longa primeiro), montadas uma vez no main; respostas
+  constantes (APIs mock) já ficam serializadas em bytes
+- NegativeCache: caminhos que deram 404 recentemente, com limite de
+  entradas (LRU) e validade; scans de crawlers respondem 404 sem tocar o
+  disco. O watcher limpa o cache quando algum arquivo aparece
+- NetlifyRules: [[redirects]] e [[headers]] do netlify.toml, compilados
+  para regex; o servidor local se comporta como o deploy (regras com
+  force = false só valem quando o arquivo não existe, como no Netlify)
+"""
+
+import collections
+import functools
+import json
+import os
+import re
+import threading
+import time
+
+try:
+    import tomllib  # Python 3.11+
+except ImportError:
+    tomllib = None
+
+DEFAULT_NEGATIVE_ENTRIES = 4096
+DEFAULT_NEGATIVE_TTL = 5.0
+HEADER_CACHE_ENTRIES = 4096
+
+REDIRECT_STATUSES = frozenset((301, 302, 303, 307, 308))
+
+# Condições que dependem da infraestrutura do Netlify (GeoIP, login)
+UNSUPPORTED_CONDITIONS = frozenset(('country', 'role', 'cookie'))
+
+
+class ConstantResponse:
+    """Resposta que nunca muda: corpo serializado uma única vez"""
+
+    __slots__ = ('body', 'content_type')
+
+    def __init__(self, payload, content_type='application/json'):
+        if isinstance(payload, bytes):
+            self.body = payload
+        else:
+            self.body = json.dumps(payload).encode()
+        self.content_type = content_type
+
+    def __call__(self, handler, parsed):
+        handler.send_response(200)
+        handler.send_header('Content-type', self.content_type)
+        handler.send_header('Content-Length', str(len(self.body)))
+        handler.end_headers()
+        if handler.command != 'HEAD':
+            handler.wfile.write(self.body)
+
+
+class Router:
+    """Rotas exatas e por prefixo; o destino recebe (handler, parsed_url)"""
+
+    def __init__(self):
+        self.exact = {}
+        self.prefixes = []
+
+    def add(self, path, target):
+        self.exact[path] = target
+
+    def add_constant(self, path, payload, content_type='application/json'):
+        self.exact[path] = ConstantResponse(payload, content_type)
+
+    def add_prefix(self, prefix, target):
+        self.prefixes.append((prefix, target))
+        self.prefixes.sort(key=lambda item: -len(item[0]))
+
+    def resolve(self, path):
+        target = self.exact.get(path)
+        if target is not None:
+            return target
+        for prefix, target in self.prefixes:
+            if path.startswith(prefix):
+                return target
+        return None
+
+    def stats(self):
+        return {'exact': len(self.exact), 'prefixes': [prefix for prefix, _ in self.prefixes]}
+
+
+class NegativeCache:
+    """Caminhos inexistentes recentes (LRU limitado, com validade)"""
+
+    def __init__(self, max_entries=DEFAULT_NEGATIVE_ENTRIES, ttl=DEFAULT_NEGATIVE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, path):
+        with self._lock:
+            expires = self._entries.get(path)
+            if expires is not None:
+                if expires > time.monotonic():
+                    self._entries.move_to_end(path)
+                    self.hits += 1
+                    return True
+                del self._entries[path]
+            self.misses += 1
+            return False
+
+    def add(self, path):
+        with self._lock:
+            self._entries[path] = time.monotonic() + self.ttl
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'entries': len(self._entries), 'max_entries': self.max_entries, 'ttl': self.ttl,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+# ----------------------------------------------------------------------
+# netlify.toml
+# ----------------------------------------------------------------------
+
+def compile_pattern(pattern):
+    """'/blog/:slug/*' -> regex com grupos nomeados (splat = o que casou com *)"""
+    pattern = pattern.rstrip('/') or '/'
+    parts = []
+    for index, segment in enumerate(pattern.split('/')[1:]):
+        if segment == '*':
+            # "/blog/*" também casa com "/blog"
+            parts.append('(?:/(?P<splat>.*))?' if index else '/(?P<splat>.*)')
+        elif segment.startswith(':'):
+            parts.append(f'/(?P<{segment[1:]}>[^/]+)')
+        else:
+            parts.append('/' + re.escape(segment))
+    return re.compile('^' + (''.join(parts) or '/') + '$')
+
+
+def accepted_languages(header):
+    """'pt-BR,pt;q=0.9,en;q=0.8' -> ['pt-br', 'pt', 'en']"""
+    languages = []
+    for item in (header or '').split(','):
+        tag = item.split(';', 1)[0].strip().lower()
+        if tag and tag != '*':
+            languages.append(tag)
+    return languages
+
+
+class RedirectRule:
+    __slots__ = ('source', 'regex', 'to', 'status', 'force', 'languages')
+
+    def __init__(self, source, to, status=301, force=False, languages=()):
+        self.source = source
+        self.regex = compile_pattern(source)
+        self.to = to
+        self.status = status
+        self.force = force
+        self.languages = tuple(language.lower() for language in languages)
+
+    def match(self, path, accept_language):
+        match = self.regex.match(path)
+        if match is None:
+            return None
+        if self.languages:
+            accepted = accepted_languages(accept_language)
+            if not any(tag == wanted or tag.split('-', 1)[0] == wanted
+                       for tag in accepted for wanted in self.languages):
+                return None
+        target = self.to
+        for name, value in match.groupdict().items():
+            target = target.replace(f':{name}', value or '')
+        return target
+
+
+class NetlifyRules:
+    """[[redirects]] e [[headers]] do netlify.toml"""
+
+    def __init__(self, redirects=(), headers=(), skipped=0, path=None):
+        self.redirects = list(redirects)
+        self.header_rules = list(headers)
+        self.skipped = skipped
+        self.path = path
+        self.forced = [rule for rule in self.redirects if rule.force]
+        self.shadowable = [rule for rule in self.redirects if not rule.force]
+        self.headers_for = functools.lru_cache(maxsize=HEADER_CACHE_ENTRIES)(self._headers_for)
+        self.redirected = 0
+        self.rewritten = 0
+
+    @classmethod
+    def load(cls, path):
+        """Lê o netlify.toml; sem o arquivo (ou sem tomllib) não há regras"""
+        if tomllib is None or not os.path.exists(path):
+            return cls(path=path)
+        with open(path, 'rb') as f:
+            config = tomllib.load(f)
+
+        redirects, skipped = [], 0
+        for entry in config.get('redirects', []):
+            conditions = {name.lower(): value for name, value in (entry.get('conditions') or {}).items()}
+            to = entry.get('to', '')
+            # Proxy para outro host, query params e condições de GeoIP/login não existem localmente
+            if (not entry.get('from') or not to.startswith('/') or entry.get('query')
+                    or UNSUPPORTED_CONDITIONS & conditions.keys()):
+                skipped += 1
+                continue
+            languages = conditions.get('language', [])
+            if isinstance(languages, str):
+                languages = [languages]
+            redirects.append(RedirectRule(entry['from'], to, int(entry.get('status', 301)),
+                                          bool(entry.get('force', False)), languages))
+
+        headers = []
+        for entry in config.get('headers', []):
+            values = entry.get('values') or {}
+            if entry.get('for') and values:
+                headers.append((compile_pattern(entry['for']),
+                                tuple((name, ' '.join(str(value).split())) for name, value in values.items())))
+        return cls(redirects, headers, skipped, path)
+
+    def match(self, path, accept_language, forced):
+        """(status, destino) da primeira regra que casa, ou None"""
+        path = path.rstrip('/') or '/'
+        for rule in self.forced if forced else self.shadowable:
+            target = rule.match(path, accept_language)
+            if target is not None:
+                return rule.status, target
+        return None
+
+    def _headers_for(self, path):
+        path = path.rstrip('/') or '/'
+        headers = []
+        for regex, values in self.header_rules:
+            if regex.match(path):
+                headers.extend(values)
+        return tuple(headers)
+
+    def stats(self):
+        return {
+            'file': self.path,
+            'redirects': len(self.redirects),
+            'headers': len(self.header_rules),
+            'skipped': self.skipped,
+            'redirected': self.redirected,
+            'rewritten': self.rewritten,
+        }
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Índice de Busca Full-Text
+
+Índice invertido sobre blog/*.html e pages/*.html usado por
+/api/blog/search.
+
+- Fonte: páginas com template em templates/site/ são lidas do renderer
+  (o mesmo HTML que o servidor entrega), não do arquivo exportado; editar
+  um template já muda a busca, sem esperar o `server.py render`
+
+- Extração: remove marcação, scripts/estilos e o "chrome" compartilhado
+  (header, nav, footer), mantendo título, descrição e texto do conteúdo
+- Normalização: minúsculas, remoção de acentos (ação -> acao), stopwords
+  do português e um stemmer leve por sufixos
+- Ranking: BM25 (k1=1.2, b=0.75)
+- Persistência: o índice é salvo em .cache/search-index.json; no próximo
+  boot só os arquivos cujo mtime/tamanho mudou são reindexados
+"""
+
+import glob
+import json
+import math
+import os
+import posixpath
+import re
+import threading
+import time
+import unicodedata
+from functools import lru_cache
+from html.parser import HTMLParser
+
+from templating import TemplateError
+
+INDEX_VERSION = 1
+DEFAULT_INDEX_PATH = os.path.join('.cache', 'search-index.json')
+SOURCES = ('blog/*.html', 'pages/*.html')
+CATEGORY_SOURCE = 'pages/blog.html'
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_BOOST = 3  # termos do título contam como se aparecessem 3 vezes
+SNIPPET_CHARS = 160
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+STOPWORDS = frozenset("""
+a ao aos as ate com como da das de dela dele deles do dos e ela elas ele eles
+em entre era essa esse esta este eu foi for ha isso isto ja la mais mas me
+mesmo muito na nao nas nem no nos nossa nosso num numa o os ou para pela pelas
+pelo pelos por qual quando que quem se sem ser seu seus so sua suas tambem te
+tem todo todos tu um uma umas uns voce voces
+the and of to in is for on with
+""".split())
+
+# Sufixos do mais longo para o mais curto; só o primeiro que casar é removido
+SUFFIXES = (
+    'amentos', 'imentos', 'amento', 'imento', 'mente', 'idades', 'idade',
+    'acoes', 'icoes', 'acao', 'icao', 'ancias', 'encias', 'ancia', 'encia',
+    'adoras', 'adores', 'adora', 'ador', 'istas', 'ista', 'ismos', 'ismo',
+    'aveis', 'iveis', 'avel', 'ivel', 'ando', 'endo', 'indo',
+    'adas', 'ados', 'idas', 'idos', 'ada', 'ado', 'ida', 'ido',
+    'oes', 'aes', 'ais', 'eis', 'ns', 'es', 's', 'a', 'o', 'e',
+)
+MIN_STEM = 3
+
+SKIP_TAGS = frozenset(('script', 'style', 'nav', 'footer', 'noscript', 'svg'))
+SKIP_CLASSES = frozenset(('header-portal',))
+BLOCK_TAGS = frozenset(('p', 'div', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+                        'section', 'article', 'br', 'tr', 'td', 'blockquote'))
+
+
+@lru_cache(maxsize=4096)
+def fold_char(char):
+    """Minúscula sem acento, sempre com exatamente um caractere"""
+    lower = char.lower()
+    if len(lower) != 1:
+        return char
+    base = [c for c in unicodedata.normalize('NFKD', lower) if not unicodedata.combining(c)]
+    return base[0] if len(base) == 1 else lower
+
+
+def fold(text):
+    """Remove acentos mantendo os offsets do texto original"""
+    return ''.join(map(fold_char, text))
+
+
+def stem(word):
+    """Stemmer leve para português (sufixos comuns)"""
+    if len(word) <= MIN_STEM:
+        return word
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """Gera (termo, offset, tamanho) para cada palavra relevante do texto"""
+    for match in TOKEN_RE.finditer(fold(text)):
+        word = match.group()
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        yield stem(word), match.start(), match.end() - match.start()
+
+
+def query_terms(query):
+    terms = []
+    for term, _, _ in tokenize(query):
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+class _PageTextParser(HTMLParser):
+    """Extrai título, descrição, tags e texto visível de uma página"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ''
+        self.h1 = ''
+        self.description = ''
+        self.tags = []
+        self._chunks = []
+        self._skip_tag = None
+        self._skip_depth = 0
+        self._in = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        if self._skip_tag:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+        elif tag in SKIP_TAGS or SKIP_CLASSES.intersection(classes):
+            self._skip_tag, self._skip_depth = tag, 1
+        elif tag == 'meta' and attrs.get('name') == 'description':
+            self.description = attrs.get('content') or ''
+        elif tag in ('title', 'h1'):
+            self._in = tag
+        elif tag == 'span' and 'tag' in classes:
+            self._in = 'tag'
+        if tag in BLOCK_TAGS:
+            self._chunks.append('\n')
+
+    def handle_endtag(self, tag):
+        if self._skip_tag:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if not self._skip_depth:
+                    self._skip_tag = None
+        elif tag in ('title', 'h1', 'span'):
+            self._in = None
+
+    def handle_data(self, data):
+        if self._in == 'title':
+            self.title += data
+            return
+        if self._skip_tag:
+            return
+        if self._in == 'h1':
+            self.h1 += data
+        elif self._in == 'tag':
+            self.tags.append(data.strip())
+        self._chunks.append(data)
+
+    @property
+    def text(self):
+        raw = ''.join(self._chunks)
+        lines = (' '.join(line.split()) for line in raw.split('\n'))
+        return '\n'.join(line for line in lines if line)
+
+
+def extract_document(html):
+    """Converte o HTML de uma página em um documento indexável"""
+    parser = _PageTextParser()
+    parser.feed(html)
+    parser.close()
+    title = ' '.join((parser.h1 or parser.title).split())
+    title = title.split(' | ')[0]
+    return {
+        'title': title,
+        'description': ' '.join(parser.description.split()),
+        'tags': [t for t in parser.tags if t],
+        'text': parser.text,
+    }
+
+
+def parse_categories(html):
+    """Categorias dos artigos a partir dos cards de pages/blog.html"""
+    categories = {}
+    card_re = re.compile(r'<article class="article-card" data-category="([^"]+)".*?href="\.\./(blog/[^"]+)"', re.S)
+    for category, href in card_re.findall(html):
+        categories.setdefault(href, category)
+    return categories
+
+
+class SearchIndex:
+    """Índice invertido com ranking BM25, persistido em disco"""
+
+    def __init__(self, root, index_path=DEFAULT_INDEX_PATH, refresh_interval=2.0, renderer=None):
+        self.root = os.path.abspath(root)
+        self.renderer = renderer
+        self.index_path = os.path.join(self.root, index_path)
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        # Uma reindexação por vez: sem ela, uma thread atrasada instalaria _docs velhos
+        self._refresh_lock = threading.Lock()
+        self._docs = {}
+        self._postings = {}
+        self._avg_length = 0.0
+        self._checked_at = 0.0
+        self._categories = {}
+        self.last_build = {}
+
+    # ------------------------------------------------------------------
+    # Construção
+    # ------------------------------------------------------------------
+
+    def _source_files(self):
+        files = {}
+        for pattern in SOURCES:
+            for path in glob.glob(os.path.join(self.root, pattern)):
+                rel = os.path.relpath(path, self.root).replace(os.sep, '/')
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files[rel] = (st.st_mtime_ns, st.st_size)
+        if self.renderer is not None:
+            # Página de template: a versão é a dos templates de que ela depende
+            for rel in self.renderer.pages:
+                if posixpath.dirname(rel) + '/*.html' not in SOURCES:
+                    continue
+                page = self._rendered(rel)
+                if page is not None:
+                    files[rel] = (page.mtime_ns, len(page.body))
+        return files
+
+    def _rendered(self, rel):
+        if self.renderer is None or not self.renderer.handles(rel):
+            return None
+        try:
+            return self.renderer.render(rel)
+        except TemplateError:
+            # Template quebrado: fica com o HTML exportado até ser corrigido
+            return None
+
+    def _read_source(self, rel):
+        """HTML de `rel`: renderizado do template ou lido do disco"""
+        page = self._rendered(rel)
+        if page is not None:
+            return page.body.decode('utf-8', 'replace')
+        with open(os.path.join(self.root, rel), encoding='utf-8', errors='replace') as f:
+            return f.read()
+
+    def _category_for(self, rel, doc):
+        if rel in self._categories:
+            return self._categories[rel]
+        if rel.startswith('pages/'):
+            return 'pagina'
+        if doc['tags']:
+            return fold(doc['tags'][0]).replace(' ', '')
+        return 'blog'
+
+    def _index_file(self, rel, stat_key):
+        doc = extract_document(self._read_source(rel))
+        terms = {}
+        length = 0
+        for term, offset, size in tokenize(doc['text']):
+            terms.setdefault(term, []).extend((offset, size))
+            length += 1
+        title_terms = set(term for term, _, _ in tokenize(doc['title']))
+        doc.update({
+            'mtime_ns': stat_key[0],
+            'size': stat_key[1],
+            'category': self._category_for(rel, doc),
+            'length': length + TITLE_BOOST * len(title_terms),
+            'terms': terms,
+            'title_terms': sorted(title_terms),
+        })
+        return doc
+
+    def _rebuild_postings(self, docs):
+        postings = {}
+        for rel, doc in docs.items():
+            for term, offsets in doc['terms'].items():
+                postings.setdefault(term, {})[rel] = len(offsets) // 2
+            for term in doc['title_terms']:
+                per_doc = postings.setdefault(term, {})
+                per_doc[rel] = per_doc.get(rel, 0) + TITLE_BOOST
+        total = sum(doc['length'] for doc in docs.values())
+        return postings, (total / len(docs) if docs else 0.0)
+
+    def refresh(self, force=False, wait=True):
+        """Reindexa apenas arquivos novos ou alterados; retorna quantos mudaram
+
+        Com wait=False (buscas), retorna 0 se outra thread já está reindexando.
+        """
+        if not self._refresh_lock.acquire(blocking=wait):
+            return 0
+        try:
+            return self._refresh(force)
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh(self, force):
+        started = time.perf_counter()
+        files = self._source_files()
+        docs = dict(self._docs)
+        if force:
+            docs = {}
+
+        # Categorias vêm dos cards do blog: se a listagem mudou, reindexa tudo
+        categories_changed = False
+        listing = docs.get(CATEGORY_SOURCE)
+        if CATEGORY_SOURCE in files and (listing is None or
+                                         (listing['mtime_ns'], listing['size']) != files[CATEGORY_SOURCE]):
+            try:
+                self._categories = parse_categories(self._read_source(CATEGORY_SOURCE))
+            except OSError:
+                self._categories = {}
+            categories_changed = True
+
+        changed = 0
+        for rel in list(docs):
+            if rel not in files:
+                del docs[rel]
+                changed += 1
+        for rel, stat_key in files.items():
+            doc = docs.get(rel)
+            if doc is not None and (doc['mtime_ns'], doc['size']) == stat_key and not categories_changed:
+                continue
+            try:
+                docs[rel] = self._index_file(rel, stat_key)
+            except OSError:
+                docs.pop(rel, None)
+            changed += 1
+
+        if changed or force:
+            postings, avg_length = self._rebuild_postings(docs)
+            with self._lock:
+                self._docs, self._postings, self._avg_length = docs, postings, avg_length
+            self.save()
+        self._checked_at = time.monotonic()
+        self.last_build = {
+            'documents': len(docs),
+            'reindexed': changed,
+            'seconds': round(time.perf_counter() - started, 4),
+        }
+        return changed
+
+    def load(self):
+        """Carrega o índice salvo e reindexa só o que mudou desde então"""
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                self._docs = data['docs']
+                self._categories = data.get('categories', {})
+        except (OSError, ValueError, KeyError):
+            self._docs = {}
+        if self._docs:
+            self._postings, self._avg_length = self._rebuild_postings(self._docs)
+        self.refresh()
+        return self
+
+    def save(self):
+        data = {'version': INDEX_VERSION, 'categories': self._categories, 'docs': self._docs}
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            # Um arquivo temporário por processo e thread (modo prefork)
+            tmp_path = f'{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"⚠️  Não foi possível salvar o índice de busca: {e}")
+
+    def maybe_refresh(self):
+        """Revalida os arquivos no máximo a cada `refresh_interval` segundos"""
+        if time.monotonic() - self._checked_at >= self.refresh_interval:
+            self.refresh(wait=False)
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def search(self, query, limit=10, category=None):
+        """Busca BM25; retorna dicionário pronto para a API"""
+        started = time.perf_counter()
+        terms = query_terms(query or '')
+        with self._lock:
+            docs, postings, avg_length = self._docs, self._postings, self._avg_length
+
+        if category in (None, '', 'all'):
+            category = None
+        total_docs = len(docs)
+        scores = {}
+        for term in terms:
+            per_doc = postings.get(term)
+            if not per_doc:
+                continue
+            idf = math.log(1 + (total_docs - len(per_doc) + 0.5) / (len(per_doc) + 0.5))
+            for rel, tf in per_doc.items():
+                doc = docs[rel]
+                if category and doc['category'] != category:
+                    continue
+                norm = 1 - BM25_B + BM25_B * doc['length'] / (avg_length or 1)
+                scores[rel] = scores.get(rel, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        results = []
+        for rel, score in ranked[:max(1, limit)]:
+            doc = docs[rel]
+            snippet, matches = self._snippet(doc, terms)
+            results.append({
+                'title': doc['title'],
+                'url': rel,
+                'category': doc['category'],
+                'score': round(score, 4),
+                'excerpt': snippet,
+                'matches': matches,
+            })
+        return {
+            'query': query,
+            'category': category or 'all',
+            'total': len(ranked),
+            'results': results,
+            'took_ms': round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    def _snippet(self, doc, terms):
+        """Trecho em volta da primeira ocorrência e offsets [início, tamanho]"""
+        text = doc['text']
+        hits = []
+        for term in terms:
+            offsets = doc['terms'].get(term, ())
+            hits.extend((offsets[i], offsets[i + 1]) for i in range(0, len(offsets), 2))
+        if not hits:
+            return (doc['description'] or text[:SNIPPET_CHARS]), []
+        hits.sort()
+        first = hits[0][0]
+        start = max(0, first - SNIPPET_CHARS // 3)
+        if start:
+            space = text.find(' ', start)
+            start = space + 1 if 0 <= space < first else start
+        end = min(len(text), start + SNIPPET_CHARS)
+        snippet = text[start:end].replace('\n', ' ')
+        matches = [[offset - start, size] for offset, size in hits if start <= offset and offset + size <= end]
+        return snippet, matches
+
+    def stats(self):
+        return {
+            'documents': len(self._docs),
+            'articles': sum(1 for rel in self._docs if rel.startswith('blog/')),
+            'terms': len(self._postings),
+            'last_build': self.last_build,
+        }
@@ -8,16 +8,33 @@ Este script cria um servidor web local para testar o Portal Scrum (www.scrum.com
 com todas as funcionalidades necessárias para desenvolvimento.
 
 Uso:
-    python server.py [porta]
+    python server.py [porta] [opções]
+    python server.py build [--out dist] [--bundle] [--critical-css] [--jobs N] [--no-minify] [--clean]
+    python server.py render [--check] [--out DIR]
+    python server.py crawl [--url URL] [--concurrency N] [--budget-kb KB] [--budget-requests N]
+    python server.py replay [ARQ ...] [--url URL] [--speed 1|10|max] [--concurrency N]
     
 Exemplos:
-    python server.py          # Porta padrão 8000
-    python server.py 3000     # Porta personalizada
+    python server.py                      # Porta padrão 8000
+    python server.py 3000                 # Porta personalizada
+    python server.py --engine asyncio     # Motor asyncio
+    python server.py --workers 32 --queue 128
+    python server.py --prefork 4          # 4 processos (um por núcleo)
+    python server.py build --bundle       # dist/ minificado, com hash e bundles
+    python server.py build --critical-css # + CSS por página e CSS crítico no <head>
+    python server.py render               # templates/site/ -> index.html, pages/, blog/
+    python server.py crawl                # peso por página e links quebrados (servidor rodando)
+    python server.py --capture            # grava o tráfego (fora da pasta publicada)
+    python server.py replay --speed 10    # reproduz o tráfego gravado 10x mais rápido
 """
 
+import argparse
+import glob
+import hmac
 import http.server
-import socketserver
 import os
+import socket
+import stat
 import sys
 import webbrowser
 import threading
@@ -25,40 +42,365 @@ import time
 from urllib.parse import urlparse, parse_qs
 import json
 import datetime
+import queue
+
+import engines
+import prefork
+from access_log import DEFAULT_PATH as ACCESS_LOG_PATH, AccessLog, parse_sample_rates
+from traffic_capture import DEFAULT_CAPTURE_MAX_BYTES, DEFAULT_CAPTURE_PATH, TrafficCapture
+from diagnostics import (DEFAULT_HZ, DEFAULT_PROFILE_SECONDS, GCMonitor, ProfilerBusy,
+                         StackSampler, collapsed, process_stats)
+from content_cache import (ContentCache, cache_key_for, guess_content_type,
+                           if_range_matches, is_cacheable, not_modified, parse_range)
+from search_index import SearchIndex
+from preload_hints import link_header
+from site_manifest import SiteManifest
+from private_data import LEGACY_DIRECTORY, is_private_path
+from submissions import DEFAULT_DIRECTORY, SubmissionStore
+from subscribers import SubscriberIndex, normalize_email
+from templating import TemplateError, TemplateRenderer
+from metrics import CountingWriter, Metrics, route_label
+from rate_limit import DEFAULT_MAX_INFLIGHT, RateLimiter, parse_rules
+from router import (DEFAULT_NEGATIVE_TTL, REDIRECT_STATUSES, NegativeCache,
+                    NetlifyRules, Router)
+from request_body import DEFAULT_BODY_TIMEOUT, DEFAULT_MAX_BODY_BYTES, BodyError, read_form
+from watcher import (HEARTBEAT_SECONDS, LIVE_RELOAD_PATH, MAX_CLIENTS, LiveReloadHub, SiteWatcher,
+                     inject_live_reload)
+
+# Assets com fingerprint nunca mudam: o navegador pode guardá-los por um ano
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+NOT_MODIFIED_HEADERS = ('ETag', 'Last-Modified', 'Vary')
+
+# Arquivos a partir deste tamanho não entram no cache e saem via sendfile
+DEFAULT_SENDFILE_THRESHOLD = 256 * 1024
+COPY_CHUNK_SIZE = 64 * 1024
+
+# Com o watcher limpando o cache negativo a cada mudança, o 404 pode durar mais
+NEGATIVE_TTL_WATCHED = 60.0
+
+# Sem --debug-token, o diagnóstico só responde a estes clientes (e só no modo dev)
+LOOPBACK_ADDRESSES = frozenset(('127.0.0.1', '::1', '::ffff:127.0.0.1'))
 
 class PortalScrumHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     """Handler personalizado para o Portal Scrum com funcionalidades extras"""
     
+    # Cache de conteúdo compartilhado por todos os workers (configurado no main)
+    content_cache = None
+    
+    # Modo produção: ETag/304 e cache longo para assets com fingerprint
+    production = False
+    cache_control = None
+    
+    sendfile_threshold = DEFAULT_SENDFILE_THRESHOLD
+    
+    # Páginas de templates/site/ (layout e partials compilados, páginas memorizadas)
+    renderer = None
+    
+    # Índice de busca do blog (construído no main)
+    search_index = None
+    
+    # Log durável de formulários (contato/newsletter)
+    submission_store = None
+    
+    # Índice de inscritos da newsletter (mmap + Bloom) para deduplicar
+    subscriber_index = None
+    
+    # Métricas de requisições (/api/stats e /metrics)
+    metrics = None
+    
+    # Hot reload: watcher do projeto e conexões SSE dos navegadores
+    watcher = None
+    live_reload = None
+    
+    # Log de acesso em JSON Lines (gravado em background)
+    access_log = None
+    
+    # Captura das requisições para o replay (--capture; desligada por padrão)
+    traffic_capture = None
+    request_body = None
+    request_parsed = False
+    
+    # Rotas do GET (montadas no main), 404 recentes e regras do netlify.toml
+    router = None
+    negative_cache = None
+    netlify = None
+    
+    # Modo prefork: diretório onde os workers publicam suas estatísticas
+    prefork_stats_dir = None
+    
+    # Limite de taxa por cliente e de POSTs em andamento (429/503)
+    rate_limiter = None
+    
+    # Corpo dos formulários: tamanho máximo (413) e prazo para chegar (408)
+    max_body_bytes = DEFAULT_MAX_BODY_BYTES
+    body_timeout = DEFAULT_BODY_TIMEOUT
+    
+    # Link: rel=preload nas páginas HTML e, opcionalmente, 103 Early Hints
+    preload_links = True
+    early_hints = False
+    
+    # Diagnóstico (/debug/profile e /debug/state) e pausas do GC
+    profiler = None
+    gc_monitor = None
+    debug_token = None
+    
+    # HTTP/1.1: a conexão continua aberta entre requisições (keep-alive)
+    # enquanto o motor permitir, até keepalive_requests ou keepalive_timeout
+    # segundos ociosa; o cabeçalho da requisição tem header_timeout para chegar
+    protocol_version = 'HTTP/1.1'
+    # Cabeçalho e corpo saem em writes separados: sem TCP_NODELAY o segundo
+    # espera o ACK atrasado do cliente (~40 ms) em toda resposta keep-alive
+    disable_nagle_algorithm = True
+    keepalive_timeout = engines.DEFAULT_KEEPALIVE_TIMEOUT
+    keepalive_requests = engines.DEFAULT_KEEPALIVE_REQUESTS
+    header_timeout = engines.DEFAULT_HEADER_TIMEOUT
+    parked = False
+    connection_header_sent = False
+    content_length_sent = False
+    keep_on_error = False
+    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=os.getcwd(), **kwargs)
     
+    def setup(self):
+        super().setup()
+        self.wfile = CountingWriter(self.wfile)
+        # Conexão devolvida pelo keep-alive: continua a contagem de requisições
+        requests_served = getattr(self.server, 'requests_served', None)
+        self.requests_on_connection = requests_served(self.request) if requests_served else 0
+    
+    def handle(self):
+        """Atende as requisições da conexão; ociosa, ela espera fora do worker"""
+        self.close_connection = True
+        self.connection.settimeout(self.header_timeout)
+        self.handle_one_request()
+        while not self.close_connection:
+            ready = self.next_request_ready()
+            if ready is None:
+                park = getattr(self.server, 'park', None)
+                if park is not None:
+                    self.parked = park(self.connection, self.client_address,
+                                       self.requests_on_connection, self.keepalive_timeout)
+                return
+            if not ready:
+                return
+            self.connection.settimeout(self.header_timeout)
+            self.handle_one_request()
+    
+    def next_request_ready(self):
+        """True se a próxima requisição já chegou, False se o cliente fechou, None se ociosa"""
+        self.connection.settimeout(0)
+        try:
+            # Requisições em pipeline podem já estar no buffer do rfile
+            if self.rfile.peek(1):
+                return True
+            return bool(self.connection.recv(1, socket.MSG_PEEK))
+        except BlockingIOError:
+            return None
+        except OSError:
+            return False
+    
+    def parse_request(self):
+        """Marca o início da requisição (após ler a request line)"""
+        self.request_started = time.perf_counter()
+        self.request_arrival = time.time()
+        self.request_body = None
+        self.request_parsed = False
+        self.response_status = None
+        self.cache_status = None
+        self.bytes_before = self.wfile.bytes_written
+        self.requests_on_connection += 1
+        if not super().parse_request():
+            return False
+        self.request_parsed = True
+        # Cabeçalho completo: o prazo agora é do corpo (request_body) ou nenhum
+        self.connection.settimeout(None)
+        if self.command != 'POST' and (self.headers.get('Transfer-Encoding')
+                                       or self.headers.get('Content-Length', '0').strip() not in ('', '0')):
+            # Corpo que ninguém vai ler deixaria lixo no início da próxima requisição
+            self.close_connection = True
+        return True
+    
+    def handle_expect_100(self):
+        """100 Continue sem os headers da resposta final (CORS, cache, Connection)"""
+        self.send_response_only(100)
+        http.server.BaseHTTPRequestHandler.end_headers(self)
+        return True
+    
+    def handle_one_request(self):
+        """Processa uma requisição e registra suas métricas"""
+        self.response_status = None
+        self.connection_header_sent = False
+        self.content_length_sent = False
+        super().handle_one_request()
+        if self.response_status is None:
+            return
+        nbytes = self.wfile.bytes_written - self.bytes_before
+        elapsed = time.perf_counter() - self.request_started
+        if self.metrics is not None:
+            self.metrics.record(route_label(self.path), self.response_status,
+                                nbytes, elapsed, self.cache_status)
+        if self.access_log is not None:
+            headers = getattr(self, 'headers', None)
+            self.access_log.request(self.command, self.path, self.response_status, nbytes, elapsed,
+                                    client=self.client_address[0], cache=self.cache_status,
+                                    user_agent=headers.get('User-Agent') if headers else None)
+        capture = self.traffic_capture
+        if capture is not None and self.request_parsed and capture.wants(self.path):
+            capture.capture(self.command, self.path, self.headers, self.request_body,
+                            self.request_arrival, self.response_status, elapsed,
+                            client=self.client_address[0])
+    
+    def send_response(self, code, message=None):
+        self.response_status = code
+        super().send_response(code, message)
+    
+    def send_header(self, keyword, value):
+        """Registra Connection e Content-Length para decidir o keep-alive"""
+        name = keyword.lower()
+        if name == 'connection':
+            if self.keep_on_error and value.lower() == 'close':
+                # Só o "close" automático do send_error; a decisão fica com o end_headers
+                self.keep_on_error = False
+                return
+            self.connection_header_sent = True
+        elif name == 'content-length':
+            self.content_length_sent = True
+        super().send_header(keyword, value)
+    
+    def send_error(self, code, message=None, explain=None):
+        """Erros de GET/HEAD (ex.: 404 de uma imagem) não derrubam a conexão"""
+        self.keep_on_error = getattr(self, 'command', None) in ('GET', 'HEAD') and code != 408
+        try:
+            super().send_error(code, message, explain)
+        finally:
+            self.keep_on_error = False
+    
+    def keep_alive_allowed(self):
+        """A conexão pode continuar aberta depois desta resposta?"""
+        server = self.server
+        if self.close_connection or not getattr(server, 'keepalive', False) or getattr(server, 'draining', False):
+            return False
+        if self.keepalive_timeout <= 0 or self.requests_on_connection >= self.keepalive_requests:
+            return False
+        # Sem Content-Length o fim da resposta só pode ser o fim da conexão
+        return (self.content_length_sent or self.command == 'HEAD'
+                or self.response_status in (204, 304) or (self.response_status or 0) < 200)
+    
+    def send_connection_headers(self):
+        """Connection: close, ou keep-alive com o prazo e as requisições restantes"""
+        if not self.keep_alive_allowed():
+            self.send_header('Connection', 'close')
+            return
+        if self.request_version == 'HTTP/1.0':
+            self.send_header('Connection', 'keep-alive')
+        remaining = self.keepalive_requests - self.requests_on_connection
+        self.send_header('Keep-Alive', f'timeout={self.keepalive_timeout:g}, max={remaining}')
+    
     def end_headers(self):
         """Adiciona headers customizados para desenvolvimento"""
-        self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-        self.send_header('Pragma', 'no-cache')
-        self.send_header('Expires', '0')
+        if self.production:
+            # Sem política explícita o navegador sempre revalida (ETag/304)
+            self.send_header('Cache-Control', self.cache_control or 'no-cache')
+            self.cache_control = None
+        else:
+            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+            self.send_header('Pragma', 'no-cache')
+            self.send_header('Expires', '0')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        if self.netlify is not None:
+            for name, value in self.netlify.headers_for(getattr(self, 'path', '/').split('?', 1)[0]):
+                self.send_header(name, value)
+        if not self.connection_header_sent:
+            self.send_connection_headers()
         super().end_headers()
     
     def do_GET(self):
         """Handle GET requests with custom routing"""
         parsed_path = urlparse(self.path)
+        route = self.router.resolve(parsed_path.path) if self.router is not None else None
+        if route is not None:
+            route(self, parsed_path)
+        else:
+            self.serve_site(parsed_path)
+    
+    def do_HEAD(self):
+        """Handle HEAD requests (usa o cache quando possível)"""
+        self.serve_site(urlparse(self.path), head_only=True)
+    
+    def serve_site(self, parsed_path, head_only=False):
+        """Arquivos do site: redirects do netlify.toml, cache, disco e 404"""
         path = parsed_path.path
+        if is_private_path(path):
+            # Dados de visitantes, caches e dotfiles nunca saem, nem por reescrita
+            self.send_error(404, "File not found")
+            return
+        if self.netlify is not None and self.serve_netlify_rule(parsed_path, True, head_only):
+            return
+        if self.negative_cache is None or path not in self.negative_cache:
+            if self.serve_cached(path, head_only) or self.serve_static_file(head_only):
+                return
+            if os.path.isdir(self.translate_path(self.path)):
+                # Listagem, index.html ou redirect para "dir/" ficam com o SimpleHTTPRequestHandler
+                if head_only:
+                    super().do_HEAD()
+                else:
+                    super().do_GET()
+                return
+            if self.negative_cache is not None:
+                self.negative_cache.add(path)
+        else:
+            self.cache_status = 'negative'
+        # Regras com force = false só valem quando o arquivo não existe
+        if self.netlify is not None and self.serve_netlify_rule(parsed_path, False, head_only):
+            return
+        self.send_error(404, "File not found")
+    
+    def serve_netlify_rule(self, parsed_path, forced, head_only=False):
+        """Aplica o primeiro [[redirects]] que casar; retorna False se nenhum casou"""
+        decision = self.netlify.match(parsed_path.path, self.headers.get('Accept-Language'), forced)
+        if decision is None:
+            return False
+        status, target = decision
+        if status in REDIRECT_STATUSES:
+            if parsed_path.query and '?' not in target:
+                target = f'{target}?{parsed_path.query}'
+            self.netlify.redirected += 1
+            self.send_response(status)
+            self.send_header('Location', target)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return True
         
-        # Roteamento customizado
-        if path == '/':
-            self.serve_file('index.html')
-        elif path == '/health':
-            self.serve_health_check()
-        elif path == '/api/newsletter':
-            self.serve_newsletter_api(parsed_path.query)
-        elif path.startswith('/api/'):
-            self.serve_api_endpoint(path)
+        # Reescrita: serve o destino no lugar, com o status da regra (200, 404 personalizado...)
+        target_path = urlparse(target).path
+        if target_path == parsed_path.path:
+            return False
+        if status == 200:
+            served = (self.serve_cached(target_path, head_only)
+                      or self.serve_static_file(head_only, target_path))
         else:
-            # Servir arquivos estáticos normalmente
-            super().do_GET()
+            served = self.serve_file_with_status(target_path, status, head_only)
+        if served:
+            self.netlify.rewritten += 1
+        return served
+    
+    def serve_file_with_status(self, path, status, head_only=False):
+        """Página do site enviada com outro status (ex.: 404 personalizado)"""
+        try:
+            with open(self.translate_path(path), 'rb') as f:
+                content = f.read()
+        except OSError:
+            return False
+        self.send_response(status)
+        self.send_header('Content-type', guess_content_type(path))
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(content)
+        return True
     
     def do_POST(self):
         """Handle POST requests (formulários)"""
@@ -66,34 +408,238 @@ class PortalScrumHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         path = parsed_path.path
         
         if path == '/api/contact':
-            self.handle_contact_form()
+            handle = self.handle_contact_form
         elif path == '/api/newsletter':
-            self.handle_newsletter_signup()
+            handle = self.handle_newsletter_signup
         else:
             self.send_error(404, "API endpoint not found")
+            return
+        
+        limiter = self.rate_limiter
+        if limiter is None or not limiter.limits(path):
+            handle()
+            return
+        rejection = limiter.admit(path, self.client_address[0])
+        if rejection is not None:
+            self.send_rejection(*rejection)
+            return
+        try:
+            handle()
+        finally:
+            limiter.release()
+    
+    def send_rejection(self, status, retry_after):
+        """429/503 imediato, sem ler o corpo da requisição"""
+        if status == 429:
+            message = "Muitas requisições; tente novamente em instantes"
+        else:
+            message = "Servidor ocupado; tente novamente em instantes"
+        body = json.dumps({"success": False, "message": message,
+                           "retry_after": retry_after}).encode()
+        # O corpo não lido impede reaproveitar a conexão
+        self.close_connection = True
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Retry-After', str(retry_after))
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def serve_cached(self, path, head_only=False):
+        """Serve um arquivo do cache em memória; retorna False se não cacheável"""
+        if self.content_cache is None:
+            return self.serve_rendered(path, head_only)
+        key = cache_key_for(path)
+        if not key:
+            return False
+        if self.early_hints and not head_only and key.endswith('.html'):
+            # Antes do lookup: a página pode ainda precisar de render/compressão
+            self.send_early_hints(self.content_cache.known_preloads(key))
+        try:
+            # URL com fingerprint direto para o original: o stat do nome com hash sempre
+            # falharia e o lookup ainda invalidaria a entrada e o manifesto a cada acesso
+            entry, immutable = self.content_cache.get_fingerprinted(key)
+            hit = True
+            if entry is None:
+                entry, hit = self.content_cache.lookup(key)
+        except TemplateError as e:
+            self.send_template_error(e)
+            return True
+        if entry is None:
+            return False
+        self.cache_status = 'hit' if hit else 'miss'
+        
+        body, headers = entry.select(self.headers.get('Accept-Encoding'))
+        if self.production:
+            self.cache_control = IMMUTABLE_CACHE_CONTROL if immutable else 'no-cache'
+            if entry.not_modified(self.headers.get('If-None-Match'),
+                                  self.headers.get('If-Modified-Since')):
+                self.send_response(304)
+                for name, value in headers:
+                    if name in NOT_MODIFIED_HEADERS:
+                        self.send_header(name, value)
+                self.end_headers()
+                return True
+        
+        range_header = self.headers.get('Range')
+        if range_header and if_range_matches(self.headers.get('If-Range'),
+                                             entry.etag, entry.last_modified):
+            try:
+                byte_range = parse_range(range_header, len(entry.body))
+            except ValueError:
+                self.send_range_not_satisfiable(len(entry.body))
+                return True
+            if byte_range is not None:
+                start, end = byte_range
+                self.send_response(206)
+                for name, value in entry.headers:
+                    if name != 'Content-Length':
+                        self.send_header(name, value)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{len(entry.body)}')
+                self.send_header('Content-Length', str(end - start + 1))
+                self.end_headers()
+                if not head_only:
+                    self.wfile.write(entry.body[start:end + 1])
+                return True
+        
+        self.send_response(200)
+        self.send_header('Accept-Ranges', 'bytes')
+        for name, value in headers:
+            self.send_header(name, value)
+        if self.preload_links and entry.preload:
+            self.send_header('Link', link_header(entry.preload))
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+        return True
+    
+    def send_early_hints(self, hints):
+        """103 Early Hints com os preloads já conhecidos da página"""
+        link = link_header(hints)
+        # Navegadores só usam o 103 em navegações (Sec-Fetch-Mode: navigate);
+        # outros clientes, como o http.client, tratariam o 103 como a resposta
+        if (link is None or self.request_version != 'HTTP/1.1'
+                or self.headers.get('Sec-Fetch-Mode') != 'navigate'):
+            return
+        self.send_response_only(103)
+        self.send_header('Link', link)
+        http.server.BaseHTTPRequestHandler.end_headers(self)
+    
+    def serve_rendered(self, path, head_only=False):
+        """Página de template sem o cache de conteúdo (--cache-mb 0)"""
+        key = cache_key_for(path)
+        if self.renderer is None or not key:
+            return False
+        try:
+            page = self.renderer.render(key)
+        except TemplateError as e:
+            self.send_template_error(e)
+            return True
+        if page is None:
+            return False
+        body = page.body if self.live_reload is None else inject_live_reload(page.body)
+        self.cache_status = 'bypass'
+        self.send_response(200)
+        self.send_header('Content-type', guess_content_type(key))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+        return True
+    
+    def send_template_error(self, error):
+        """500 com o arquivo e a linha do template quebrado"""
+        self.log_error("Template inválido: %s", error)
+        self.send_error(500, "Template inválido", explain=str(error))
+    
+    def serve_static_file(self, head_only=False, path=None):
+        """Serve arquivos fora do cache (ex.: grandes) com Range e sendfile.
+        
+        Retorna False para diretórios e arquivos inexistentes, que continuam
+        com o serve_site (listagem, index.html, redirects, 404).
+        """
+        fs_path = self.translate_path(path or self.path)
+        try:
+            f = open(fs_path, 'rb')
+        except OSError:
+            return False
+        with f:
+            st = os.fstat(f.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                return False
+            self.cache_status = 'bypass'
+            size = st.st_size
+            etag = f'{st.st_mtime_ns:x}-{size:x}'
+            last_modified = self.date_time_string(st.st_mtime)
+            if not_modified(self.headers.get('If-None-Match'),
+                            self.headers.get('If-Modified-Since'), etag, st.st_mtime_ns):
+                # Mesma revalidação do serve_cached: grandes e robots.txt também ganham 304
+                self.send_response(304)
+                self.send_header('Last-Modified', last_modified)
+                self.send_header('ETag', f'"{etag}"')
+                self.end_headers()
+                return True
+            
+            start, end, status = 0, size - 1, 200
+            range_header = self.headers.get('Range')
+            if range_header and if_range_matches(self.headers.get('If-Range'), etag, last_modified):
+                try:
+                    byte_range = parse_range(range_header, size)
+                except ValueError:
+                    self.send_range_not_satisfiable(size)
+                    return True
+                if byte_range is not None:
+                    (start, end), status = byte_range, 206
+            
+            count = max(0, end - start + 1)
+            self.send_response(status)
+            self.send_header('Content-type', guess_content_type(fs_path))
+            self.send_header('Content-Length', str(count))
+            self.send_header('Last-Modified', last_modified)
+            self.send_header('ETag', f'"{etag}"')
+            self.send_header('Accept-Ranges', 'bytes')
+            if status == 206:
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.end_headers()
+            if not head_only and count:
+                self.send_file_body(f, start, count)
+        return True
+    
+    def send_file_body(self, f, offset, count):
+        """Envia parte de um arquivo: sendfile acima do limite, cópia abaixo"""
+        if count >= self.sendfile_threshold and hasattr(self.connection, 'sendfile'):
+            # Zero-copy: o kernel copia direto do page cache para o socket
+            self.wfile.bytes_written += self.connection.sendfile(f, offset, count)
+            return
+        f.seek(offset)
+        remaining = count
+        while remaining > 0:
+            chunk = f.read(min(COPY_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            self.wfile.write(chunk)
+            remaining -= len(chunk)
+    
+    def send_range_not_satisfiable(self, size):
+        """Resposta 416 para intervalos inválidos ou múltiplos"""
+        self.send_response(416)
+        self.send_header('Content-Range', f'bytes */{size}')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
     
     def serve_file(self, filename):
         """Serve um arquivo específico"""
         try:
+            if self.serve_cached('/' + filename):
+                return
             if os.path.exists(filename):
                 with open(filename, 'rb') as f:
                     content = f.read()
                 
-                # Determinar content type
-                if filename.endswith('.html'):
-                    content_type = 'text/html; charset=utf-8'
-                elif filename.endswith('.css'):
-                    content_type = 'text/css; charset=utf-8'
-                elif filename.endswith('.js'):
-                    content_type = 'application/javascript; charset=utf-8'
-                elif filename.endswith('.json'):
-                    content_type = 'application/json; charset=utf-8'
-                else:
-                    content_type = 'application/octet-stream'
-                
                 self.send_response(200)
-                self.send_header('Content-type', content_type)
-                self.send_header('Content-length', len(content))
+                self.send_header('Content-type', guess_content_type(filename))
+                self.send_header('Content-Length', str(len(content)))
                 self.end_headers()
                 self.wfile.write(content)
             else:
@@ -110,105 +656,472 @@ class PortalScrumHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             "version": "1.0",
             "uptime": time.time() - start_time
         }
+        if hasattr(self.server, 'engine_stats'):
+            health_data["server"] = self.server.engine_stats()
+        if self.content_cache is not None:
+            health_data["cache"] = self.content_cache.stats()
+        if self.renderer is not None:
+            health_data["templates"] = self.renderer.stats()
+        if self.search_index is not None:
+            health_data["search"] = self.search_index.stats()
+        if self.submission_store is not None:
+            health_data["submissions"] = self.submission_store.stats()
+        if self.subscriber_index is not None:
+            health_data["subscribers"] = self.subscriber_index.stats()
+        if self.watcher is not None:
+            health_data["watcher"] = dict(self.watcher.stats(), clients=self.live_reload.clients)
+        if self.access_log is not None:
+            health_data["access_log"] = self.access_log.stats()
+        if self.traffic_capture is not None:
+            health_data["capture"] = self.traffic_capture.stats()
+        if self.rate_limiter is not None:
+            health_data["rate_limit"] = self.rate_limiter.stats()
+        if self.router is not None:
+            health_data["router"] = self.router.stats()
+        if self.negative_cache is not None:
+            health_data["negative_cache"] = self.negative_cache.stats()
+        if self.netlify is not None:
+            health_data["netlify"] = self.netlify.stats()
+        if self.prefork_stats_dir is not None:
+            health_data["prefork"] = prefork.aggregate_stats(self.prefork_stats_dir)
+            health_data["prefork"]["this_worker"] = os.getpid()
         
+        body = json.dumps(health_data, indent=2).encode()
         self.send_response(200)
         self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(json.dumps(health_data, indent=2).encode())
+        self.wfile.write(body)
     
-    def serve_newsletter_api(self, query_params):
-        """API mock para newsletter"""
-        response = {
-            "success": True,
-            "message": "Newsletter signup simulated successfully!",
-            "timestamp": datetime.datetime.now().isoformat()
-        }
-        
+    def serve_live_reload(self):
+        """Server-Sent Events: avisa o navegador quando arquivos mudam"""
+        if isinstance(self.connection, socket.socket):
+            self.attach_live_reload()
+            return
+        client = self.live_reload.subscribe()
+        if client is None:
+            self.send_error(503, "Too many live-reload connections")
+            return
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'text/event-stream; charset=utf-8')
+            self.end_headers()
+            # No motor asyncio a resposta passa a ir direto para o socket
+            begin_stream = getattr(self.connection, 'begin_stream', None)
+            if begin_stream is not None:
+                begin_stream()
+            self.wfile.write(b'retry: 1000\n\n')
+            while True:
+                try:
+                    event = client.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    self.wfile.write(b': ping\n\n')
+                    continue
+                self.wfile.write(f'event: reload\ndata: {event}\n\n'.encode())
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.live_reload.unsubscribe(client)
+            self.close_connection = True
+    
+    def attach_live_reload(self):
+        """SSE em socket real: depois dos headers o hub assume a conexão e o worker fica livre"""
+        if not self.live_reload.has_room():
+            self.send_error(503, "Too many live-reload connections")
+            return
+        self.close_connection = True
         self.send_response(200)
-        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-type', 'text/event-stream; charset=utf-8')
         self.end_headers()
-        self.wfile.write(json.dumps(response).encode())
-    
-    def serve_api_endpoint(self, path):
-        """Serve endpoints de API mock"""
-        # Mock APIs para desenvolvimento
-        mock_responses = {
-            '/api/blog/search': {
-                "results": [
-                    {"title": "O que é Scrum?", "url": "blog/o-que-e-scrum.html"},
-                    {"title": "TaskTracker Features", "url": "blog/tasktracker-ferramenta-scrum.html"}
-                ]
-            },
-            '/api/stats': {
-                "visitors": 1234,
-                "articles": 10,
-                "languages": ["pt-BR", "en"]
-            }
-        }
+        try:
+            self.wfile.write(b'retry: 1000\n\n')
+        except OSError:
+            return
+        # parked: o motor não fecha o socket, que agora é do hub
+        self.parked = self.live_reload.attach(self.connection)
+    
+    def serve_stats(self):
+        """Estatísticas reais de tráfego, latência e cache"""
+        stats = self.metrics.summary()
+        stats["articles"] = 0
+        if self.search_index is not None:
+            stats["articles"] = self.search_index.stats().get("articles", 0)
+        stats["languages"] = ["pt-BR", "en"]
+        if hasattr(self.server, 'engine_stats'):
+            stats["server"] = self.server.engine_stats()
+        if self.content_cache is not None:
+            stats["cache"] = self.content_cache.stats()
         
-        if path in mock_responses:
-            self.send_response(200)
+        self.send_json(200, stats)
+    
+    def serve_metrics(self):
+        """Métricas no formato texto do Prometheus"""
+        extra = []
+        if self.content_cache is not None:
+            cache = self.content_cache.stats()
+            extra.append(('portal_cache_bytes', 'gauge', 'Bytes ocupados pelo cache de conteúdo.', cache["bytes"]))
+            extra.append(('portal_cache_entries', 'gauge', 'Arquivos no cache de conteúdo.', cache["entries"]))
+            extra.append(('portal_cache_evictions_total', 'counter', 'Entradas removidas por falta de espaço.', cache["evictions"]))
+        if hasattr(self.server, 'engine_stats'):
+            engine = self.server.engine_stats()
+            extra.append(('portal_queue_depth', 'gauge', 'Conexões aguardando um worker.', engine.get("queue_depth", 0)))
+            extra.append(('portal_rejected_total', 'counter', 'Conexões recusadas por sobrecarga.', engine.get("rejected", 0)))
+            if "keepalive" in engine:
+                extra.append(('portal_keepalive_idle', 'gauge', 'Conexões keep-alive ociosas.', engine["keepalive"]["idle"]))
+        if self.negative_cache is not None:
+            extra.append(('portal_negative_cache_hits_total', 'counter', '404 respondidos sem acessar o disco.', self.negative_cache.hits))
+        if self.rate_limiter is not None:
+            limits = self.rate_limiter.totals()
+            extra.append(('portal_rate_limited_total', 'counter', 'POSTs recusados com 429 (cliente acima da taxa).', limits["limited"]))
+            extra.append(('portal_shed_total', 'counter', 'POSTs recusados com 503 (servidor saturado).', limits["shed"]))
+            extra.append(('portal_post_inflight', 'gauge', 'POSTs limitados em andamento.', limits["inflight"]))
+            extra.append(('portal_rate_limit_clients', 'gauge', 'Clientes na tabela de limite de taxa.', limits["clients"]))
+        body = self.metrics.prometheus(extra).encode()
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def debug_allowed(self):
+        """Com token: Authorization: Bearer <token> ou X-Debug-Token. Sem token: só localhost no modo dev"""
+        if self.debug_token:
+            authorization = self.headers.get('Authorization', '')
+            if authorization[:7].lower() == 'bearer ':
+                supplied = authorization[7:].strip()
+            else:
+                supplied = self.headers.get('X-Debug-Token', '')
+            if hmac.compare_digest(supplied.encode(), self.debug_token.encode()):
+                return True
+            body = json.dumps({"success": False, "message": "Token de diagnóstico inválido"}).encode()
+            self.send_response(401)
+            self.send_header('WWW-Authenticate', 'Bearer realm="debug"')
             self.send_header('Content-type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
             self.end_headers()
-            self.wfile.write(json.dumps(mock_responses[path]).encode())
-        else:
-            self.send_error(404, f"API endpoint {path} not found")
+            self.wfile.write(body)
+            return False
+        if not self.production and self.client_address[0] in LOOPBACK_ADDRESSES:
+            return True
+        self.send_json(403, {"success": False, "message": "Diagnóstico exige --debug-token"})
+        return False
+    
+    def serve_profile(self, query_string):
+        """Perfil por amostragem: GET /debug/profile?seconds=10&hz=100 -> pilhas collapsed"""
+        if not self.debug_allowed():
+            return
+        self.cache_control = 'no-store'
+        params = parse_qs(query_string)
+        try:
+            seconds = float(params.get('seconds', [DEFAULT_PROFILE_SECONDS])[0])
+            hz = int(params.get('hz', [DEFAULT_HZ])[0])
+        except ValueError:
+            self.send_json(400, {"success": False, "message": "seconds e hz precisam ser números"})
+            return
+        if getattr(self.server, 'engine_name', None) == 'single':
+            self.send_json(409, {"success": False,
+                                 "message": "O motor single só tem uma thread; use --engine threads ou asyncio"})
+            return
+        all_threads = params.get('all', ['0'])[0] not in ('0', 'false', '')
+        idle = params.get('idle', ['0'])[0] not in ('0', 'false', '')
+        try:
+            stacks, summary = self.profiler.sample(seconds, hz, all_threads=all_threads, idle=idle)
+        except ProfilerBusy as e:
+            self.send_json(409, {"success": False, "message": str(e)})
+            return
+        
+        body = collapsed(stacks).encode()
+        self.send_response(200)
+        self.send_header('Content-type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Profile-Pid', str(os.getpid()))
+        self.send_header('X-Profile-Seconds', str(summary['seconds']))
+        self.send_header('X-Profile-Samples', str(summary['samples']))
+        self.send_header('X-Profile-Overhead', str(summary['overhead']))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def serve_debug_state(self):
+        """Autodiagnóstico: saturação, fila, conexões, caches e GC deste processo"""
+        if not self.debug_allowed():
+            return
+        state = {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "uptime": time.time() - start_time,
+            "process": process_stats(),
+        }
+        if hasattr(self.server, 'engine_stats'):
+            engine = self.server.engine_stats()
+            engine["saturation"] = round(engine.get("busy", 0) / max(1, engine["workers"]), 3)
+            state["server"] = engine
+        if self.gc_monitor is not None:
+            state["gc"] = self.gc_monitor.stats()
+        if self.profiler is not None:
+            state["profiler"] = self.profiler.stats()
+        if self.metrics is not None:
+            state["requests"] = self.metrics.summary()["total"]
+        if self.content_cache is not None:
+            state["cache"] = self.content_cache.stats()
+        if self.renderer is not None:
+            state["templates"] = self.renderer.stats()
+        if self.negative_cache is not None:
+            state["negative_cache"] = self.negative_cache.stats()
+        if self.rate_limiter is not None:
+            state["rate_limit"] = self.rate_limiter.totals()
+        if self.live_reload is not None:
+            state["live_reload_clients"] = self.live_reload.clients
+        self.cache_control = 'no-store'
+        self.send_json(200, state)
+    
+    def serve_newsletter_api(self, query_params):
+        """Consulta de inscrição: GET /api/newsletter?email=..."""
+        if self.subscriber_index is None:
+            self.send_json(200, {
+                "success": True,
+                "message": "Newsletter signup simulated successfully!",
+                "timestamp": datetime.datetime.now().isoformat()
+            })
+            return
+        email = normalize_email(parse_qs(query_params).get('email', [''])[0])
+        if email is None:
+            self.send_json(400, {"success": False, "message": "Informe um e-mail válido em ?email="})
+            return
+        since = self.subscriber_index.lookup(email)
+        self.send_json(200, {
+            "email": email,
+            "subscribed": since is not None,
+            "since": datetime.datetime.fromtimestamp(since).isoformat() if since is not None else None
+        })
+    
+    def send_json(self, status, payload):
+        """Resposta JSON com Content-Length"""
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def serve_blog_search(self, query_string):
+        """Busca full-text nos artigos e páginas (BM25)"""
+        params = parse_qs(query_string)
+        query = params.get('q', [''])[0].strip()
+        category = params.get('category', [''])[0].strip().lower()
+        try:
+            limit = min(50, max(1, int(params.get('limit', ['10'])[0])))
+        except ValueError:
+            limit = 10
+        
+        if self.search_index is None:
+            self.send_error(503, "Search index not available")
+            return
+        self.search_index.maybe_refresh()
+        response = self.search_index.search(query, limit=limit, category=category)
+        
+        self.send_json(200, response)
+    
+    def serve_unknown_api(self, path):
+        """/api/* sem rota: 404 sem procurar no disco"""
+        self.send_error(404, f"API endpoint {path} not found")
+    
+    def read_form_data(self):
+        """Lê e decodifica o corpo do formulário (urlencoded, JSON ou multipart).
+        
+        Retorna (campos, bytes) ou None depois de responder o erro
+        (413 grande demais, 408 lento demais, 400 malformado).
+        """
+        on_data = None
+        if self.traffic_capture is not None:
+            self.request_body = bytearray()
+            on_data = self.request_body.extend
+        try:
+            return read_form(self.rfile, self.headers, max_bytes=self.max_body_bytes,
+                             timeout=self.body_timeout, connection=self.connection,
+                             on_data=on_data)
+        except BodyError as e:
+            # O resto do corpo não foi lido: a conexão não pode ser reaproveitada
+            self.close_connection = True
+            self.send_error(e.status, explain=str(e))
+        except (ConnectionError, OSError):
+            self.close_connection = True
+        return None
+    
+    def store_submission(self, kind, fields):
+        """Grava a submissão no log durável; retorna o id (ou None)"""
+        if self.submission_store is None:
+            return None
+        return self.submission_store.submit(kind, fields,
+                                            client=self.client_address[0],
+                                            user_agent=self.headers.get('User-Agent', ''))
     
     def handle_contact_form(self):
         """Handle formulário de contato"""
+        form = self.read_form_data()
+        if form is None:
+            return
         try:
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            # Log do formulário (em produção, salvaria no banco)
-            print(f"\n📧 FORMULÁRIO DE CONTATO RECEBIDO:")
-            print(f"Timestamp: {datetime.datetime.now()}")
-            print(f"Data: {post_data.decode('utf-8')}")
-            print("-" * 50)
+            fields, nbytes = form
+            submission_id = self.store_submission('contact', fields)
+            self.log_submission('contact', submission_id, nbytes)
             
             response = {
                 "success": True,
-                "message": "Mensagem enviada com sucesso! (simulado)",
+                "message": "Mensagem enviada com sucesso!",
+                "id": submission_id,
                 "timestamp": datetime.datetime.now().isoformat()
             }
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.send_json(200, response)
             
         except Exception as e:
             self.send_error(500, f"Error processing contact form: {str(e)}")
     
     def handle_newsletter_signup(self):
         """Handle cadastro newsletter"""
+        form = self.read_form_data()
+        if form is None:
+            return
         try:
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            print(f"\n📬 NEWSLETTER SIGNUP:")
-            print(f"Timestamp: {datetime.datetime.now()}")
-            print(f"Data: {post_data.decode('utf-8')}")
-            print("-" * 50)
+            fields, nbytes = form
+            email = None
+            if self.subscriber_index is not None:
+                email = normalize_email(fields.get('email') if isinstance(fields, dict) else None)
+                if email is None:
+                    self.send_json(400, {"success": False, "message": "Informe um e-mail válido"})
+                    return
+                # add() é atômico: de duas inscrições iguais simultâneas só uma grava
+                if not self.subscriber_index.add(email):
+                    self.send_json(200, {"success": True, "already_subscribed": True,
+                                         "message": "Este e-mail já está inscrito na newsletter"})
+                    return
+            try:
+                submission_id = self.store_submission('newsletter', fields)
+            except Exception:
+                # Sem o registro gravado a inscrição não existe: desfaz para o retry funcionar
+                if email is not None:
+                    self.subscriber_index.remove(email)
+                raise
+            self.log_submission('newsletter', submission_id, nbytes)
             
             response = {
                 "success": True,
-                "message": "Inscrição na newsletter realizada! (simulado)"
+                "message": "Inscrição na newsletter realizada!",
+                "id": submission_id
             }
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.send_json(200, response)
             
         except Exception as e:
             self.send_error(500, f"Error processing newsletter signup: {str(e)}")
     
+    def log_submission(self, kind, submission_id, nbytes):
+        """Registra o recebimento de um formulário (o conteúdo fica no SubmissionStore)"""
+        if self.access_log is not None:
+            self.access_log.event(kind, id=submission_id, bytes=nbytes,
+                                  client=self.client_address[0])
+        else:
+            self.log_message("%s recebido (id %s, %d bytes)", kind, submission_id, nbytes)
+    
+    def log_request(self, code='-', size='-'):
+        """Com o log de acesso ativo a requisição é registrada ao terminar"""
+        if self.access_log is None:
+            super().log_request(code, size)
+    
+    def log_error(self, format, *args):
+        if self.access_log is not None:
+            self.access_log.event('error', format % args, client=self.client_address[0])
+        else:
+            self.log_message(format, *args)
+    
     def log_message(self, format, *args):
         """Log personalizado com timestamp"""
+        if self.access_log is not None:
+            self.access_log.event('message', format % args)
+            return
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"[{timestamp}] {format % args}")
 
+def worker_summary(handler):
+    """Totais do worker publicados para o /health agregado do prefork"""
+    total = handler.metrics.summary()['total']
+    return {'requests': total['requests'], 'bytes_sent': total['bytes_sent'],
+            'status': total['status'], 'latency_ms': total['latency_ms']}
+
+def build_router(handler):
+    """Tabela de rotas do GET, montada uma vez conforme o que está ligado"""
+    router = Router()
+    router.add('/', lambda h, parsed: h.serve_file('index.html'))
+    router.add('/health', lambda h, parsed: h.serve_health_check())
+    if handler.metrics is not None:
+        router.add('/metrics', lambda h, parsed: h.serve_metrics())
+        router.add('/api/stats', lambda h, parsed: h.serve_stats())
+    else:
+        # Mock para desenvolvimento (serializado uma vez)
+        router.add_constant('/api/stats', {"visitors": 1234, "articles": 10, "languages": ["pt-BR", "en"]})
+    if handler.live_reload is not None:
+        router.add(LIVE_RELOAD_PATH, lambda h, parsed: h.serve_live_reload())
+    if handler.profiler is not None:
+        router.add('/debug/profile', lambda h, parsed: h.serve_profile(parsed.query))
+        router.add('/debug/state', lambda h, parsed: h.serve_debug_state())
+    router.add('/api/newsletter', lambda h, parsed: h.serve_newsletter_api(parsed.query))
+    router.add('/api/blog/search', lambda h, parsed: h.serve_blog_search(parsed.query))
+    router.add_prefix('/api/', lambda h, parsed: h.serve_unknown_api(parsed.path))
+    return router
+
+def warn_generated_edits(renderer, changed):
+    """Avisa quando alguém edita à mão um HTML que é saída do render"""
+    for rel in changed:
+        if not renderer.handles(rel):
+            continue
+        try:
+            edited = renderer.is_stale(rel)
+        except TemplateError:
+            continue
+        if edited:
+            # O `render` reescreve o arquivo com o mesmo conteúdo do template: sem aviso
+            print(f"⚠️  {rel} é gerado de templates/site/{rel}: a edição não aparece no "
+                  f"servidor e some no próximo `python server.py render`")
+
+def create_reload_listener(handler):
+    """Aplica as mudanças do watcher no lugar: cache, índice e navegadores"""
+    def on_change(changed):
+        # Arquivo novo pode ser um caminho que estava no cache de 404
+        if handler.negative_cache is not None:
+            handler.negative_cache.clear()
+        if handler.netlify is not None and 'netlify.toml' in changed:
+            handler.netlify = load_netlify_rules()
+        if handler.renderer is not None:
+            # Partial/layout alterado: só as páginas que dependem dele
+            rendered = set()
+            for rel in changed:
+                rendered |= handler.renderer.invalidate(rel)
+            changed = list(changed) + sorted(rendered - set(changed))
+            warn_generated_edits(handler.renderer, [rel for rel in changed if rel not in rendered])
+        site_files = [rel for rel in changed if is_cacheable(rel) or rel.endswith('.html')]
+        if not site_files:
+            return
+        if handler.content_cache is not None:
+            for rel in site_files:
+                handler.content_cache.invalidate(rel)
+        if handler.search_index is not None and any(rel.endswith('.html') for rel in site_files):
+            handler.search_index.refresh()
+        handler.live_reload.publish(site_files)
+        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+        print(f"🔄 [{timestamp}] {len(site_files)} arquivo(s) alterado(s): {', '.join(site_files[:5])}")
+    return on_change
+
+def load_netlify_rules():
+    """Regras do netlify.toml (ou nenhuma, se o arquivo for inválido)"""
+    try:
+        rules = NetlifyRules.load(os.path.join(os.getcwd(), 'netlify.toml'))
+    except (ValueError, OSError) as e:
+        print(f"⚠️  netlify.toml ignorado: {e}")
+        return NetlifyRules()
+    print(f"🧭 netlify.toml: {len(rules.redirects)} redirects, {len(rules.header_rules)} regras de headers"
+          + (f" ({rules.skipped} redirects sem suporte local ignorados)" if rules.skipped else ""))
+    return rules
+
 def check_project_structure():
     """Verifica se estamos no diretório correto do projeto"""
     required_files = ['index.html', 'pages', 'assets']
@@ -286,78 +1199,399 @@ def print_help():
 🔧 PORTAL SCRUM - SERVIDOR LOCAL
 
 Uso:
-    python server.py [porta]
+    python server.py [porta] [opções]
 
 Opções:
-    porta           Porta do servidor (padrão: 8000)
-    --help, -h      Exibe esta ajuda
+    porta               Porta do servidor (padrão: 8000)
+    --engine MOTOR      single | threads | asyncio (padrão: threads)
+    --workers N         Threads de atendimento (padrão: 16)
+    --queue N           Conexões aguardando worker antes do 503 (padrão: 64)
+    --cache-mb N        Memória máxima do cache de arquivos (padrão: 64, 0 desliga)
+    --no-compress       Não gera variantes gzip/deflate dos arquivos de texto
+    --no-manifest       Não usa o manifesto do site (.cache/site-manifest.json):
+                        ETags e variantes comprimidas são recalculadas a cada boot
+    --no-preload        Não envia "Link: rel=preload" com os CSS/JS de cada página
+    --early-hints       Envia os preloads também numa resposta 103 Early Hints,
+                        antes de a página ficar pronta (navegações de navegador,
+                        Sec-Fetch-Mode: navigate)
+    --sendfile-kb N     Arquivos a partir deste tamanho saem via sendfile,
+                        sem passar pelo cache (padrão: 256)
+    --data-dir DIR      Onde gravar os formulários, fora da pasta publicada
+                        (padrão: ~/.local/share/portal-scrum/submissions;
+                        a base muda com PORTAL_DATA_DIR)
+    --durability-ms N   Janela para juntar formulários em um fsync (padrão: 200)
+    --watch / --no-watch
+                        Hot reload no lugar + live-reload no navegador
+                        (padrão: ligado no modo dev, desligado em produção)
+    --watch-ms N        Intervalo de varredura do watcher (padrão: 250)
+    --mode MODO         dev | production (padrão: dev)
+                        production: ETag/Last-Modified, respostas 304 e
+                        assets com fingerprint servidos como immutable
+    --access-log ARQ    Log de acesso em JSON Lines, fora da pasta publicada
+                        (padrão: ~/.local/share/portal-scrum/logs/access.jsonl,
+                        "off" desliga); rotaciona a cada --log-max-mb (padrão: 10)
+    --log-sample REGRAS Amostragem por rota, ex.: "/assets/*=0.1,/metrics=0"
+                        (erros e requisições lentas são sempre registrados)
+    --quiet             Não mostra as requisições no console
+                        (padrão: mostra no modo dev)
+    --capture [ARQ]     Grava as requisições (headers, corpo, instante) para o
+                        "server.py replay", fora da pasta publicada (padrão:
+                        ~/.local/share/portal-scrum/capture/traffic.jsonl);
+                        para ao chegar em --capture-mb (padrão: 100)
+    --rate-limit REGRAS Taxa por IP nas rotas de POST, ex.:
+                        "/api/contact=5/min,/api/newsletter=20/min:5" (":N" é a
+                        rajada; padrão: contato 5/min, newsletter 10/min; "off" desliga)
+    --max-inflight N    POSTs limitados em andamento antes do 503 (padrão: 8)
+    --max-body-kb N     Tamanho máximo do corpo dos formulários; acima disso 413
+                        (padrão: 1024)
+    --body-timeout-s N  Prazo para o corpo chegar por completo; depois 408
+                        (padrão: 30)
+    --keepalive-s N     Conexão ociosa entre requisições fica aberta por N
+                        segundos (HTTP/1.1 keep-alive; padrão: 5, 0 desliga)
+    --keepalive-requests N
+                        Requisições por conexão antes de fechá-la (padrão: 100)
+    --no-netlify        Ignora os [[redirects]] e [[headers]] do netlify.toml
+    --debug-token T     Exige o token em /debug/profile e /debug/state
+                        (Authorization: Bearer T; também via PORTAL_DEBUG_TOKEN).
+                        Sem token só localhost acessa, e só no modo dev
+    --no-debug          Desliga os endpoints de diagnóstico
+    --prefork N         Master + N processos worker na mesma porta (SO_REUSEPORT);
+                        worker que cai é recriado, kill -HUP <pid do master>
+                        faz reload gradual sem derrubar conexões
+    --drain-s N         Prazo para um worker terminar as requisições em
+                        andamento ao parar/recarregar (padrão: 30)
+    --no-browser        Não abre o navegador
+    --help, -h          Exibe esta ajuda
 
 Exemplos:
-    python server.py          # Porta 8000
-    python server.py 3000     # Porta 3000
-    python server.py --help   # Ajuda
+    python server.py                      # Porta 8000
+    python server.py 3000                 # Porta 3000
+    python server.py --engine asyncio     # Event loop + pool de threads
+    python server.py --workers 32 --queue 128
+    python server.py --prefork 4          # 4 processos (um por núcleo)
+    python server.py --help               # Ajuda
 
 Endpoints disponíveis:
     GET  /                    # Página inicial
     GET  /health             # Health check
-    GET  /api/stats          # Estatísticas mock
-    POST /api/contact        # Formulário contato
-    POST /api/newsletter     # Newsletter signup
+    GET  /api/stats          # Estatísticas de tráfego (latência, cache, status)
+    GET  /metrics            # Métricas no formato Prometheus
+    GET  /debug/profile      # Perfil por amostragem: ?seconds=10&hz=100 (pilhas collapsed)
+    GET  /debug/state        # Workers ocupados, fila, conexões, caches e GC
+    GET  /api/blog/search    # Busca: ?q=termo&limit=10&category=scrum
+    GET  /api/newsletter     # Consulta inscrição: ?email=ana@exemplo.com
+    POST /api/contact        # Formulário contato (gravado no --data-dir)
+    POST /api/newsletter     # Newsletter signup (gravado no --data-dir, sem duplicar)
 
 Funcionalidades:
-    ✅ Servidor HTTP com hot-reload
+    ✅ Servidor HTTP com hot-reload (sem reiniciar, via Server-Sent Events)
+    ✅ Atendimento concorrente (pool de threads ou asyncio)
+    ✅ HTTP/1.1 keep-alive sem prender workers com conexões ociosas
+    ✅ Cache em memória de páginas e assets (LRU + mtime)
+    ✅ Layout e partials compartilhados (templates/), exportados com "server.py render"
+    ✅ Compressão gzip/deflate pré-calculada (Accept-Encoding)
+    ✅ Manifesto do site persistido: restart sem recomprimir nem refazer hashes
+    ✅ Preload dos CSS/JS de cada página (header Link e 103 Early Hints)
+    ✅ Modo produção com ETag, 304 e assets imutáveis
+    ✅ Range (206) e envio zero-copy (sendfile) de arquivos grandes
+    ✅ Busca full-text (BM25) em blog/ e pages/
+    ✅ Formulários gravados em JSON Lines com escrita em lote
+    ✅ Limite de taxa por IP e descarte por sobrecarga nos POSTs (429/503)
+    ✅ Métricas por rota com histogramas de latência (p50/p95/p99)
     ✅ Mock APIs para formulários
     ✅ Headers CORS para desenvolvimento
+    ✅ Redirects e headers do netlify.toml, como no deploy
     ✅ Log de requisições detalhado
+    ✅ Captura do tráfego real e replay acelerado ("server.py replay")
     ✅ Abertura automática do navegador
     ✅ Validação da estrutura do projeto
 """
     print(help_text)
 
+def parse_args(argv):
+    """Interpreta a linha de comando"""
+    parser = argparse.ArgumentParser(prog='server.py', add_help=False)
+    parser.add_argument('port', nargs='?', default='8000')
+    parser.add_argument('--engine', choices=sorted(engines.ENGINES), default='threads')
+    parser.add_argument('--workers', type=int, default=engines.DEFAULT_WORKERS)
+    parser.add_argument('--queue', type=int, default=engines.DEFAULT_QUEUE_SIZE)
+    parser.add_argument('--cache-mb', type=int, default=64)
+    parser.add_argument('--no-compress', action='store_true')
+    parser.add_argument('--no-manifest', action='store_true')
+    parser.add_argument('--no-preload', action='store_true')
+    parser.add_argument('--early-hints', action='store_true')
+    parser.add_argument('--sendfile-kb', type=int, default=DEFAULT_SENDFILE_THRESHOLD // 1024)
+    parser.add_argument('--data-dir', default=DEFAULT_DIRECTORY)
+    parser.add_argument('--durability-ms', type=int, default=200)
+    parser.add_argument('--watch', dest='watch', action='store_true', default=None)
+    parser.add_argument('--no-watch', dest='watch', action='store_false')
+    parser.add_argument('--watch-ms', type=int, default=250)
+    parser.add_argument('--mode', choices=['dev', 'production'], default='dev')
+    parser.add_argument('--access-log', default=ACCESS_LOG_PATH)
+    parser.add_argument('--log-max-mb', type=int, default=10)
+    parser.add_argument('--log-sample', default='')
+    parser.add_argument('--quiet', action='store_true')
+    parser.add_argument('--capture', nargs='?', const=DEFAULT_CAPTURE_PATH, default=None)
+    parser.add_argument('--capture-mb', type=int, default=DEFAULT_CAPTURE_MAX_BYTES // (1024 * 1024))
+    parser.add_argument('--rate-limit', default='')
+    parser.add_argument('--max-inflight', type=int, default=DEFAULT_MAX_INFLIGHT)
+    parser.add_argument('--max-body-kb', type=int, default=DEFAULT_MAX_BODY_BYTES // 1024)
+    parser.add_argument('--body-timeout-s', type=float, default=DEFAULT_BODY_TIMEOUT)
+    parser.add_argument('--keepalive-s', type=float, default=engines.DEFAULT_KEEPALIVE_TIMEOUT)
+    parser.add_argument('--keepalive-requests', type=int, default=engines.DEFAULT_KEEPALIVE_REQUESTS)
+    parser.add_argument('--no-netlify', action='store_true')
+    parser.add_argument('--debug-token', default=None)
+    parser.add_argument('--no-debug', action='store_true')
+    parser.add_argument('--prefork', type=int, default=0)
+    parser.add_argument('--drain-s', type=float, default=prefork.DEFAULT_DRAIN_TIMEOUT)
+    parser.add_argument('--stats-dir', default=prefork.DEFAULT_STATS_DIR)
+    # Uso interno: repassados pelo master a cada worker
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--ready-fd', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--no-browser', action='store_true')
+    parser.add_argument('--help', '-h', action='store_true')
+    return parser.parse_args(argv)
+
 def main():
     """Função principal"""
     global start_time
     start_time = time.time()
     
+    # Subcomando de build (gera dist/)
+    if sys.argv[1:2] == ['build']:
+        import build
+        sys.exit(build.main(sys.argv[2:]))
+    
+    # Subcomando de exportação dos templates (HTML estático)
+    if sys.argv[1:2] == ['render']:
+        import templating
+        sys.exit(templating.main(sys.argv[2:]))
+
+    # Subcomando do crawler (orçamento por página e links quebrados)
+    if sys.argv[1:2] == ['crawl']:
+        import crawler
+        sys.exit(crawler.main(sys.argv[2:]))
+    
+    # Subcomando de replay do tráfego capturado com --capture
+    if sys.argv[1:2] == ['replay']:
+        import replay
+        sys.exit(replay.main(sys.argv[2:]))
+
     # Verificar argumentos
-    if len(sys.argv) > 1 and sys.argv[1] in ['--help', '-h']:
+    args = parse_args(sys.argv[1:])
+    if args.help:
         print_help()
         return
     
     # Determinar porta
-    port = 8000
-    if len(sys.argv) > 1:
-        try:
-            port = int(sys.argv[1])
-            if not (1024 <= port <= 65535):
-                raise ValueError("Porta deve estar entre 1024 e 65535")
-        except ValueError as e:
-            print(f"❌ Erro na porta: {e}")
-            print("💡 Usando porta padrão 8000")
-            port = 8000
+    try:
+        port = int(args.port)
+        if not (1024 <= port <= 65535):
+            raise ValueError("Porta deve estar entre 1024 e 65535")
+    except ValueError as e:
+        print(f"❌ Erro na porta: {e}")
+        print("💡 Usando porta padrão 8000")
+        port = 8000
     
-    print_banner()
+    # Worker do modo prefork: o master já validou o projeto
+    runtime = None
+    if args.worker:
+        runtime = prefork.WorkerRuntime.from_arg(args.worker, args.stats_dir,
+                                                 args.ready_fd, args.drain_s)
+    else:
+        print_banner()
+        
+        # Verificar estrutura do projeto
+        print("🔍 Verificando estrutura do projeto...")
+        if not check_project_structure():
+            return
+        
+        print("✅ Estrutura do projeto verificada")
+        
+        # Criar imagens placeholder se necessário
+        create_mock_images()
     
-    # Verificar estrutura do projeto
-    print("🔍 Verificando estrutura do projeto...")
-    if not check_project_structure():
+    # Modo prefork: este processo só coordena os workers
+    if args.prefork > 0 and runtime is None:
+        server_url = f"http://localhost:{port}"
+        print(f"\n🚀 Modo prefork: {args.prefork} workers em {server_url} (SO_REUSEPORT)")
+        watch = (args.mode != 'production') if args.watch is None else args.watch
+        master = prefork.PreforkMaster(args.prefork, sys.argv[1:], stats_dir=args.stats_dir,
+                                       drain_timeout=args.drain_s,
+                                       watch_interval=max(10, args.watch_ms) / 1000 if watch else None)
+        on_ready = None
+        if not args.no_browser:
+            # open_browser dorme antes de abrir: fora do loop que vigia os workers
+            def on_ready():
+                threading.Thread(target=open_browser, args=(server_url,), daemon=True).start()
+        master.run(on_ready=on_ready)
         return
     
-    print("✅ Estrutura do projeto verificada")
-    
-    # Criar imagens placeholder se necessário
-    create_mock_images()
-    
     # Configurar servidor
     handler = PortalScrumHTTPRequestHandler
+    handler.metrics = Metrics()
+    handler.production = args.mode == 'production'
+    handler.sendfile_threshold = max(1, args.sendfile_kb) * 1024
+    handler.max_body_bytes = max(1, args.max_body_kb) * 1024
+    handler.body_timeout = max(0.1, args.body_timeout_s)
+    handler.keepalive_timeout = max(0.0, args.keepalive_s)
+    handler.keepalive_requests = max(1, args.keepalive_requests)
+    handler.preload_links = not args.no_preload
+    handler.early_hints = args.early_hints
+    if handler.production and args.cache_mb <= 0:
+        print("⚠️  Modo produção precisa do cache; usando --cache-mb 64")
+        args.cache_mb = 64
+    watch = (not handler.production) if args.watch is None else args.watch
+    
+    # Templates: compilados sob demanda, páginas memorizadas até uma dependência mudar
+    renderer = TemplateRenderer(os.getcwd(), check_interval=60.0 if watch else 1.0)
+    if renderer.enabled:
+        handler.renderer = renderer
+        print(f"🧩 Templates: {len(renderer.pages)} páginas renderizadas de templates/site/")
+        try:
+            stale = renderer.export(check=True)['stale']
+        except TemplateError as e:
+            stale = []
+            print(f"❌ Template inválido: {e}")
+        if stale:
+            print(f"⚠️  {len(stale)} HTML(s) gerado(s) diferem dos templates ({', '.join(stale[:3])}); "
+                  f"o deploy roda `render --check` e vai falhar. Edite templates/site/ e rode: "
+                  f"python server.py render")
+    # Manifesto do site: hash/ETag e variantes comprimidas sobrevivem ao restart
+    manifest = None
+    if args.cache_mb > 0 and not args.no_manifest:
+        manifest = SiteManifest(os.getcwd()).load()
+        print(f"🗂️  Manifesto: {len(manifest)} arquivos já processados "
+              f"(índice lido em {manifest.load_ms:.1f} ms)")
+    if args.cache_mb > 0:
+        handler.content_cache = ContentCache(os.getcwd(), max_bytes=args.cache_mb * 1024 * 1024,
+                                             max_entry_bytes=handler.sendfile_threshold - 1,
+                                             # Com o watcher invalidando, o cache não precisa re-stat
+                                             check_interval=60.0 if watch else 1.0,
+                                             compress_variants=not args.no_compress,
+                                             fingerprint_html=handler.production,
+                                             html_filters=[inject_live_reload] if watch else (),
+                                             renderer=handler.renderer,
+                                             manifest=manifest)
+    if manifest is not None:
+        # Só o que mudou desde o último boot é relido e recomprimido, fora do caminho das requisições
+        threading.Thread(target=handler.content_cache.warm, name='manifest-warm', daemon=True).start()
+        if runtime is None:
+            manifest.prune()
+    
+    # Índice de busca (carrega do disco e reindexa só o que mudou)
+    handler.search_index = SearchIndex(os.getcwd(), renderer=handler.renderer).load()
+    build = handler.search_index.last_build
+    print(f"🔎 Índice de busca: {build['documents']} documentos "
+          f"({build['reindexed']} reindexados em {build['seconds'] * 1000:.0f} ms)")
+    
+    # Hot reload: o watcher invalida cache/índice e avisa os navegadores
+    if watch:
+        # Só o motor asyncio segura um worker por aba (fila); limite pelo tamanho do pool
+        handler.live_reload = LiveReloadHub(max_clients=max(1, min(MAX_CLIENTS, args.workers // 4)))
+        interval = max(10, args.watch_ms) / 1000
+        if runtime is not None:
+            # Worker do prefork: quem varre o projeto é o master
+            handler.watcher = prefork.ChangeFollower(args.stats_dir, interval)
+        else:
+            handler.watcher = SiteWatcher(os.getcwd(), interval=interval)
+        handler.watcher.add_listener(create_reload_listener(handler))
+        handler.watcher.start()
+        if runtime is None:
+            print(f"👀 Hot reload ativo ({handler.watcher.stats()['files']} arquivos observados)")
+    
+    # Diagnóstico sob demanda: perfil por amostragem e estado do processo
+    if not args.no_debug:
+        handler.profiler = StackSampler()
+        handler.gc_monitor = GCMonitor().install()
+        handler.debug_token = args.debug_token or os.environ.get('PORTAL_DEBUG_TOKEN') or None
+        if handler.debug_token:
+            print("🩺 Diagnóstico em /debug/profile e /debug/state (token exigido)")
+        elif not handler.production:
+            print("🩺 Diagnóstico em /debug/profile e /debug/state (só localhost)")
     
+    # Rotas compiladas, cache de 404 e regras do deploy (netlify.toml)
+    handler.router = build_router(handler)
+    handler.negative_cache = NegativeCache(ttl=NEGATIVE_TTL_WATCHED if watch else DEFAULT_NEGATIVE_TTL)
+    if not args.no_netlify:
+        handler.netlify = load_netlify_rules()
+    
+    # Log de acesso: fila + thread de escrita, nunca bloqueia a requisição
     try:
-        with socketserver.TCPServer(("", port), handler) as httpd:
+        sample_rates = parse_sample_rates(args.log_sample)
+    except ValueError:
+        print(f"⚠️  --log-sample inválido: {args.log_sample!r}; registrando tudo")
+        sample_rates = {}
+    access_log_path = None if args.access_log == 'off' else args.access_log
+    if runtime is not None and access_log_path:
+        # Um arquivo por worker: cada processo rotaciona o seu
+        base, ext = os.path.splitext(access_log_path)
+        access_log_path = f"{base}-w{runtime.worker_id}{ext}"
+    if runtime is not None:
+        handler.prefork_stats_dir = args.stats_dir
+    handler.access_log = AccessLog(access_log_path,
+                                   max_bytes=max(1, args.log_max_mb) * 1024 * 1024,
+                                   sample_rates=sample_rates,
+                                   console=not (args.quiet or handler.production))
+    
+    # Captura do tráfego para o replay (um arquivo por worker no prefork)
+    if args.capture:
+        capture_path = args.capture
+        if runtime is not None:
+            base, ext = os.path.splitext(capture_path)
+            capture_path = f"{base}-w{runtime.worker_id}{ext}"
+        handler.traffic_capture = TrafficCapture(capture_path,
+                                                 max_bytes=max(1, args.capture_mb) * 1024 * 1024)
+        print(f"🎥 Capturando requisições em {capture_path}")
+    
+    # Limite de taxa das rotas de POST (429 por cliente, 503 se saturado)
+    if args.rate_limit != 'off':
+        try:
+            rules = parse_rules(args.rate_limit)
+        except ValueError as e:
+            print(f"⚠️  --rate-limit inválido ({e}); usando os limites padrão")
+            rules = None
+        handler.rate_limiter = RateLimiter(rules, max_inflight=max(0, args.max_inflight))
+    
+    # Formulários antigos ficavam dentro da pasta publicada: não são movidos sozinhos
+    if (os.path.abspath(args.data_dir) != os.path.abspath(LEGACY_DIRECTORY)
+            and glob.glob(os.path.join(LEGACY_DIRECTORY, '*.jsonl'))):
+        print(f"⚠️  Há formulários em {LEGACY_DIRECTORY}/ (versão antiga); mova-os para "
+              f"{args.data_dir}/ e rode: python subscribers.py rebuild")
+    
+    # Log de formulários (reaplica o journal se o processo anterior caiu)
+    handler.submission_store = SubmissionStore(args.data_dir,
+                                               flush_interval=max(0, args.durability_ms) / 1000)
+    if handler.submission_store.recovered:
+        print(f"♻️  {handler.submission_store.recovered} formulários recuperados do journal")
+    
+    # Inscritos da newsletter: abrir é só um mmap; na primeira vez importa os logs
+    opened = time.perf_counter()
+    handler.subscriber_index = SubscriberIndex(args.data_dir)
+    if handler.subscriber_index.created:
+        handler.subscriber_index.rebuild_from(args.data_dir)
+    print(f"📇 Newsletter: {len(handler.subscriber_index)} inscritos "
+          f"(índice aberto em {(time.perf_counter() - opened) * 1000:.1f} ms)")
+    
+    try:
+        with engines.create_server(args.engine, ("", port), handler,
+                                   workers=args.workers, queue_size=args.queue,
+                                   reuse_port=runtime is not None) as httpd:
             server_url = f"http://localhost:{port}"
             
+            if runtime is not None:
+                print(f"👷 Worker {runtime.worker_id} (pid {os.getpid()}, geração {runtime.generation}) "
+                      f"escutando em {server_url}")
+                runtime.serve(httpd, collect_stats=lambda: worker_summary(handler))
+                return
+            
             print(f"\n🚀 SERVIDOR INICIADO COM SUCESSO!")
             print(f"📍 URL: {server_url}")
             print(f"📂 Diretório: {os.getcwd()}")
+            print(f"⚙️  Motor: {args.engine} ({args.workers} workers, fila {args.queue}) | modo {args.mode}")
+            if getattr(httpd, 'keepalive', False) and handler.keepalive_timeout > 0:
+                print(f"🔗 Keep-alive: {handler.keepalive_timeout:g}s ociosa, "
+                      f"até {handler.keepalive_requests} requisições por conexão")
             print(f"🕐 Iniciado em: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
             print("\n📋 Páginas disponíveis:")
             print(f"   🏠 Início: {server_url}/")
@@ -371,9 +1605,10 @@ def main():
             print("=" * 60)
             
             # Abrir navegador em thread separada
-            browser_thread = threading.Thread(target=open_browser, args=(server_url,))
-            browser_thread.daemon = True
-            browser_thread.start()
+            if not args.no_browser:
+                browser_thread = threading.Thread(target=open_browser, args=(server_url,))
+                browser_thread.daemon = True
+                browser_thread.start()
             
             # Iniciar servidor
             httpd.serve_forever()
@@ -389,6 +1624,14 @@ def main():
         print("👋 Obrigado por usar o Portal Scrum!")
     except Exception as e:
         print(f"❌ ERRO inesperado: {e}")
+    finally:
+        if manifest is not None:
+            manifest.close()
+        handler.submission_store.close()
+        handler.subscriber_index.close()
+        handler.access_log.close()
+        if handler.traffic_capture is not None:
+            handler.traffic_capture.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
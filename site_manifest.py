@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Manifesto Persistente do Site
+
+Guarda em .cache/site-manifest.json o que o cache de conteúdo já calculou
+para cada arquivo servido (tamanho, mtime, content type, ETag/hash do
+conteúdo e as variantes gzip/deflate), para que um restart não precise
+reler, refazer o hash e recomprimir o site inteiro.
+
+- load(): só lê o índice (JSON); nenhum arquivo do site é aberto no boot
+- find(): entrada válida se o stat (mtime + tamanho) e o perfil conferem;
+  quem muda de stat é recalculado e regravado
+- Blobs: as variantes comprimidas (e o HTML reescrito, quando difere do
+  arquivo) ficam em .cache/site-manifest/, um arquivo por ETag, gravados
+  de forma atômica e lidos só no primeiro pedido de cada página
+- record(): entradas novas vão para o índice em memória e o índice é
+  salvo em lote, alguns segundos depois (e no close())
+- Perfil: HTML reescrito (fingerprint, live reload) depende da
+  configuração do servidor; entradas de outro perfil não são reaproveitadas
+- Modo prefork: cada processo mescla o índice do disco antes de salvar;
+  blobs têm o nome do conteúdo, então dois workers gravam o mesmo arquivo
+"""
+
+import json
+import os
+import threading
+import time
+
+MANIFEST_VERSION = 2
+DEFAULT_MANIFEST_PATH = os.path.join('.cache', 'site-manifest.json')
+DEFAULT_BLOB_DIR = os.path.join('.cache', 'site-manifest')
+DEFAULT_SAVE_DELAY = 2.0
+
+# Blobs sem referência só são apagados depois disso (outro worker pode
+# ter acabado de gravá-los e ainda não ter salvo o índice)
+PRUNE_AGE = 3600.0
+
+
+class SiteManifest:
+    """Metadados e variantes comprimidas de cada arquivo servido, em disco"""
+
+    def __init__(self, root, path=DEFAULT_MANIFEST_PATH, blob_dir=DEFAULT_BLOB_DIR,
+                 save_delay=DEFAULT_SAVE_DELAY):
+        self.root = os.path.abspath(root)
+        self.path = os.path.join(self.root, path)
+        self.blob_dir = os.path.join(self.root, blob_dir)
+        self.save_delay = save_delay
+        self._entries = {}
+        self._dirty = set()
+        self._removed = set()
+        self._lock = threading.Lock()
+        self._timer = None
+        self.load_ms = 0.0
+        self.restored = 0
+        self.recorded = 0
+        self.blobs_written = 0
+        self.pruned = 0
+        self.warm = None
+
+    # ------------------------------------------------------------------
+    # Índice
+    # ------------------------------------------------------------------
+
+    def _read_index(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != MANIFEST_VERSION:
+            return {}
+        return data.get('entries') or {}
+
+    def load(self):
+        """Carrega o índice salvo (sem tocar nos arquivos do site)"""
+        started = time.perf_counter()
+        self._entries = self._read_index()
+        self.load_ms = round((time.perf_counter() - started) * 1000, 2)
+        return self
+
+    def __len__(self):
+        return len(self._entries)
+
+    def find(self, key, mtime_ns, size, profile):
+        """Registro de `key` se ainda vale para este stat e perfil, senão None"""
+        saved = self._entries.get(key)
+        if (saved is None or saved['mtime_ns'] != mtime_ns or saved['size'] != size
+                or saved['profile'] != profile):
+            return None
+        return saved
+
+    def known(self, key, profile):
+        """Há algum registro de `key` para este perfil (sem olhar o stat)?"""
+        saved = self._entries.get(key)
+        return saved is not None and saved['profile'] == profile
+
+    def preloads(self, key, profile):
+        """Preloads registrados para `key` (sem conferir o stat), ou ()"""
+        saved = self._entries.get(key)
+        if saved is None or saved['profile'] != profile:
+            return ()
+        return tuple(tuple(hint) for hint in saved.get('preload') or ())
+
+    def record(self, entry, profile, stored_body=False):
+        """Registra uma CacheEntry recém-calculada e grava os blobs que faltam"""
+        try:
+            for encoding, (packed, _) in entry.variants.items():
+                self._write_blob(entry.etag, encoding, packed)
+            if stored_body:
+                self._write_blob(entry.etag, 'body', entry.body)
+        except OSError:
+            # Sem espaço/permissão: o servidor segue, só não persiste
+            return
+        saved = {
+            'size': entry.size,
+            'mtime_ns': entry.mtime_ns,
+            'etag': entry.etag,
+            'content_type': entry.content_type,
+            'profile': profile,
+            'deps': [list(dep) for dep in entry.deps],
+            'variants': sorted(entry.variants),
+            'stored_body': stored_body,
+            'preload': [list(hint) for hint in entry.preload],
+        }
+        with self._lock:
+            self._entries[entry.key] = saved
+            self._dirty.add(entry.key)
+            self._removed.discard(entry.key)
+            self.recorded += 1
+            self._schedule_save()
+
+    def forget(self, key):
+        """Remove o registro de um arquivo que deixou de existir"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._removed.add(key)
+                self._dirty.discard(key)
+                self._schedule_save()
+
+    def _schedule_save(self):
+        if self._timer is None and self.save_delay is not None:
+            self._timer = threading.Timer(self.save_delay, self.save)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def save(self):
+        """Grava o índice (mesclado com o que outros processos salvaram)"""
+        with self._lock:
+            self._timer = None
+            if not self._dirty and not self._removed:
+                return
+            dirty, removed = self._dirty, self._removed
+            self._dirty, self._removed = set(), set()
+            ours = {key: self._entries[key] for key in dirty if key in self._entries}
+        entries = self._read_index()
+        for key in removed:
+            entries.pop(key, None)
+        entries.update(ours)
+        data = {'version': MANIFEST_VERSION, 'saved_at': time.time(), 'entries': entries}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Um arquivo temporário por processo (modo prefork)
+            tmp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Não foi possível salvar o manifesto do site: {e}")
+
+    def close(self):
+        timer = self._timer
+        if timer is not None:
+            timer.cancel()
+        self.save()
+
+    # ------------------------------------------------------------------
+    # Blobs
+    # ------------------------------------------------------------------
+
+    def _blob_path(self, etag, suffix):
+        return os.path.join(self.blob_dir, etag[:2], f'{etag}.{suffix}')
+
+    def _write_blob(self, etag, suffix, data):
+        path = self._blob_path(etag, suffix)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        # Blobs nunca mudam no lugar: quem já leu o antigo não é afetado
+        os.replace(tmp_path, path)
+        self.blobs_written += 1
+
+    def read_blob(self, etag, suffix):
+        """Conteúdo de um blob, ou None se sumiu (a entrada é recalculada)"""
+        try:
+            with open(self._blob_path(etag, suffix), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        self.restored += 1
+        return data
+
+    def prune(self):
+        """Apaga blobs antigos que nenhuma entrada do índice usa mais"""
+        referenced = set()
+        for saved in self._read_index().values():
+            referenced.add(f"{saved['etag']}.body")
+            referenced.update(f"{saved['etag']}.{encoding}" for encoding in saved['variants'])
+        referenced.update(f"{saved['etag']}.{encoding}" for saved in list(self._entries.values())
+                          for encoding in saved['variants'] + ['body'])
+        cutoff = time.time() - PRUNE_AGE
+        try:
+            shards = os.listdir(self.blob_dir)
+        except OSError:
+            return 0
+        pruned = 0
+        for shard in shards:
+            shard_dir = os.path.join(self.blob_dir, shard)
+            try:
+                names = os.listdir(shard_dir)
+            except OSError:
+                continue
+            for name in names:
+                if name in referenced:
+                    continue
+                path = os.path.join(shard_dir, name)
+                try:
+                    if os.stat(path).st_mtime < cutoff:
+                        os.remove(path)
+                        pruned += 1
+                except OSError:
+                    pass
+        self.pruned += pruned
+        return pruned
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'load_ms': self.load_ms,
+            'restored_blobs': self.restored,
+            'recorded': self.recorded,
+            'blobs_written': self.blobs_written,
+            'pruned': self.pruned,
+            'warm': self.warm,
+        }
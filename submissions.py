@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Armazenamento de Formulários (contato e newsletter)
+
+Log append-only em JSON Lines com escrita em lote:
+
+- submit() só grava a linha no journal (write sem fsync, ~microssegundos)
+  e coloca o registro na fila; a requisição não espera o disco
+- Uma thread de escrita junta os registros durante a janela de
+  durabilidade, grava o lote no arquivo de dados e faz um único fsync
+  para o lote inteiro (group commit)
+- Arquivos rotacionam por data (submissions-AAAA-MM-DD.jsonl) e por
+  tamanho (submissions-AAAA-MM-DD.1.jsonl, .2, ...)
+- Se o processo morrer no meio de um lote, os registros ainda estão no
+  journal e são reaplicados na próxima inicialização (sem duplicar os
+  que já chegaram ao arquivo de dados)
+- Se a gravação falhar (disco cheio, por exemplo), o que faltou volta
+  para a fila e o journal fica no disco até o lote ser gravado; a thread
+  de escrita tenta de novo a cada segundo
+"""
+
+import datetime
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+from private_data import data_path
+
+# Fora da pasta publicada: os registros têm nome, e-mail e IP dos visitantes
+DEFAULT_DIRECTORY = data_path('submissions')
+DEFAULT_FLUSH_INTERVAL = 0.2
+DEFAULT_MAX_FILE_BYTES = 16 * 1024 * 1024
+MAX_BATCH = 1024
+JOURNAL_PREFIX = 'journal-'
+# Folga na comparação de mtime entre journal e arquivos de dados
+MTIME_SLACK = 2.0
+
+
+def _record_id(line):
+    try:
+        return json.loads(line)['id']
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def _journal_owner_alive(path):
+    """Journal de outro processo ainda rodando (ex.: outro worker do prefork)"""
+    try:
+        pid = int(os.path.basename(path)[len(JOURNAL_PREFIX):].split('-', 1)[0])
+    except ValueError:
+        return False
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SubmissionStore:
+    """Log JSON Lines durável com escrita em lote em background"""
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_file_bytes=DEFAULT_MAX_FILE_BYTES, prefix='submissions'):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.prefix = prefix
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._pending = []
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._journal_seq = 0
+        self._journal_fd = None
+        self._journal_path = None
+        self._data_file = None
+        self._data_path = None
+        self._data_day = None
+        self._closed = False
+        # Journals fechados cujos registros ainda não estão todos no arquivo de dados
+        self._unflushed = []
+        self._failed_at = None
+
+        self.written = 0
+        self.batches = 0
+        self.fsyncs = 0
+        self.recovered = self._recover()
+
+        self._open_journal()
+        self._thread = threading.Thread(target=self._writer_loop, name='submission-writer', daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Caminho da requisição
+    # ------------------------------------------------------------------
+
+    def submit(self, kind, data, **meta):
+        """Registra uma submissão e retorna seu id (não espera fsync)"""
+        record = {
+            'id': uuid.uuid4().hex,
+            'type': kind,
+            'received_at': datetime.datetime.now().isoformat(),
+            **meta,
+            'data': data,
+        }
+        line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SubmissionStore já foi fechado")
+            # Um único write com O_APPEND: sobrevive à queda do processo
+            os.write(self._journal_fd, line)
+            self._pending.append(line)
+        self._wakeup.set()
+        return record['id']
+
+    # ------------------------------------------------------------------
+    # Journal
+    # ------------------------------------------------------------------
+
+    def _open_journal(self):
+        self._journal_seq += 1
+        self._journal_path = os.path.join(self.directory, f'{JOURNAL_PREFIX}{os.getpid()}-{self._journal_seq}.jsonl')
+        self._journal_fd = os.open(self._journal_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+
+    def _swap_journal(self):
+        """Troca o journal e pega os pendentes: tudo no journal antigo está no lote"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return batch, None, None
+            old_fd, old_path = self._journal_fd, self._journal_path
+            self._open_journal()
+        return batch, old_fd, old_path
+
+    def _recover(self):
+        """Reaplica registros de journals deixados por um processo que caiu"""
+        journals = [path for path in sorted(glob.glob(os.path.join(self.directory, f'{JOURNAL_PREFIX}*.jsonl')))
+                    if not _journal_owner_alive(path)]
+        if not journals:
+            return 0
+        # Tudo o que saiu desses journals foi gravado depois da última escrita neles
+        stored_ids = self._stored_ids(min(os.path.getmtime(path) for path in journals))
+        pending = []
+        for path in journals:
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # linha incompleta: o write não terminou
+                    record_id = _record_id(line)
+                    if record_id is None:
+                        continue
+                    if record_id not in stored_ids:
+                        stored_ids.add(record_id)
+                        pending.append(line)
+        if pending:
+            self._write_batch(pending)
+        for path in journals:
+            os.remove(path)
+        return len(pending)
+
+    def _stored_ids(self, since):
+        """Ids já gravados nos arquivos de dados alterados desde `since` (epoch)"""
+        ids = set()
+        for path in glob.glob(os.path.join(self.directory, f'{self.prefix}-*.jsonl')):
+            try:
+                if os.path.getmtime(path) < since - MTIME_SLACK:
+                    continue
+                with open(path, 'rb') as f:
+                    ids.update(_record_id(line) for line in f)
+            except OSError:
+                continue
+        ids.discard(None)
+        return ids
+
+    # ------------------------------------------------------------------
+    # Arquivo de dados
+    # ------------------------------------------------------------------
+
+    def _target_file(self, incoming_bytes):
+        """Arquivo de dados atual, rotacionando por data e tamanho"""
+        today = datetime.date.today().isoformat()
+        rotate = self._data_file is None or self._data_day != today
+        if not rotate and self._data_file.tell() + incoming_bytes > self.max_file_bytes:
+            rotate = self._data_file.tell() > 0
+        if rotate:
+            if self._data_file is not None:
+                self._data_file.close()
+            index = 0
+            while True:
+                name = f'{self.prefix}-{today}.jsonl' if index == 0 else f'{self.prefix}-{today}.{index}.jsonl'
+                path = os.path.join(self.directory, name)
+                if not os.path.exists(path) or os.path.getsize(path) + incoming_bytes <= self.max_file_bytes:
+                    break
+                index += 1
+            self._data_file = open(path, 'ab')
+            if self._data_file.tell() and not _ends_with_newline(path):
+                # Escrita cortada por uma falha: a linha quebrada não pode engolir a próxima
+                self._data_file.write(b'\n')
+            self._data_path = path
+            self._data_day = today
+        return self._data_file
+
+    def _write_batch(self, lines):
+        """Grava o lote e faz um único fsync"""
+        payload = b''.join(lines)
+        data_file = self._target_file(len(payload))
+        data_file.write(payload)
+        data_file.flush()
+        os.fsync(data_file.fileno())
+        self.written += len(lines)
+        self.batches += 1
+        self.fsyncs += 1
+
+    def _close_data_file(self):
+        if self._data_file is not None:
+            try:
+                self._data_file.close()
+            except OSError:
+                pass
+            self._data_file = None
+
+    def _flush(self):
+        batch, journal_fd, journal_path = self._swap_journal()
+        if journal_fd is not None:
+            os.close(journal_fd)
+            self._unflushed.append(journal_path)
+        if not batch:
+            return
+        if self._failed_at is not None:
+            # Retomada depois de uma falha: parte do lote pode já estar no arquivo
+            stored_ids = self._stored_ids(self._failed_at)
+            batch = [line for line in batch if _record_id(line) not in stored_ids]
+        started, written = time.time(), 0
+        try:
+            for start in range(0, len(batch), MAX_BATCH):
+                self._write_batch(batch[start:start + MAX_BATCH])
+                written = start + MAX_BATCH
+        except OSError:
+            # O que faltou volta para o início da fila; os journals continuam no disco
+            self._close_data_file()
+            with self._lock:
+                self._pending[:0] = batch[written:]
+            if self._failed_at is None:
+                self._failed_at = started
+            raise
+        self._failed_at = None
+        # O lote está no disco: os journals antigos não são mais necessários
+        while self._unflushed:
+            os.remove(self._unflushed.pop())
+
+    def _writer_loop(self):
+        while not self._closed:
+            if not self._wakeup.wait(timeout=1.0) and self._failed_at is None:
+                continue
+            # Segura a janela de durabilidade para juntar mais registros no lote
+            time.sleep(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self._flush()
+            except OSError as e:
+                print(f"❌ Erro ao gravar submissões: {e}")
+
+    def close(self):
+        """Grava o que estiver pendente e encerra a thread de escrita"""
+        if self._closed:
+            return
+        self._closed = True
+        self._thread.join(timeout=2)
+        try:
+            self._flush()
+        except OSError as e:
+            # Os journals ficam no disco e são reaplicados na próxima inicialização
+            print(f"❌ Erro ao gravar submissões: {e}")
+        with self._lock:
+            os.close(self._journal_fd)
+            os.remove(self._journal_path)
+        self._close_data_file()
+
+    def stats(self):
+        return {
+            'pending': len(self._pending),
+            'written': self.written,
+            'batches': self.batches,
+            'fsyncs': self.fsyncs,
+            'recovered': self.recovered,
+            'file': self._data_path,
+        }
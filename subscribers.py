@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Índice de Inscritos na Newsletter
+
+Tabela hash em disco, mapeada em memória (mmap), que responde em tempo
+constante se um e-mail já está inscrito:
+
+- Chave: 64 bits do blake2b do e-mail normalizado (minúsculas, sem
+  espaços); o e-mail em si não fica no índice
+- Endereçamento aberto com sondagem linear, slots de 16 bytes
+  (chave, inscrito_em, estado); cresce ao passar de 70% de ocupação
+- Filtro de Bloom no mesmo arquivo: a maioria das consultas por e-mails
+  não inscritos termina sem tocar a tabela
+- Abrir o índice é só um mmap (milissegundos, sem ler o arquivo); as
+  páginas entram na memória conforme são usadas
+- compact() reescreve o arquivo sem os removidos e no tamanho certo;
+  o arquivo antigo é marcado como "movido" e os outros processos
+  (modo prefork) remapeiam na próxima operação
+- Escritas usam flock em um arquivo .lock, então vários processos podem
+  compartilhar o mesmo índice
+
+Uso:
+    python subscribers.py stats   [--data-dir DIR]
+    python subscribers.py compact [--data-dir DIR]
+    python subscribers.py rebuild [--data-dir DIR]
+"""
+
+import argparse
+import contextlib
+import fcntl
+import glob
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import unicodedata
+
+from submissions import DEFAULT_DIRECTORY
+
+INDEX_FILENAME = 'subscribers.idx'
+MAGIC = b'PSSUBIX1'
+VERSION = 1
+
+# magic, versão, k do Bloom, capacidade, inscritos, removidos, movido
+HEADER = struct.Struct('<8sIIQQQQ')
+HEADER_SIZE = 64
+SLOT = struct.Struct('<QII')  # chave, inscrito_em (epoch s), estado
+SLOT_SIZE = SLOT.size
+COUNTS_OFFSET = 24
+MOVED_OFFSET = 40
+
+EMPTY = 0
+ACTIVE = 1
+REMOVED = 2
+
+DEFAULT_CAPACITY = 4096
+MAX_LOAD = 0.7
+BLOOM_BITS_PER_SLOT = 8
+BLOOM_HASHES = 6
+
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def normalize_email(email):
+    """' Ana@Exemplo.COM ' -> 'ana@exemplo.com' (None se não parecer um e-mail)"""
+    if not isinstance(email, str):
+        return None
+    email = unicodedata.normalize('NFKC', email).strip().lower()
+    if len(email) > 254 or not EMAIL_RE.match(email):
+        return None
+    return email
+
+
+def email_key(email):
+    """Chave de 64 bits do e-mail já normalizado (0 é reservado para slot vazio)"""
+    digest = hashlib.blake2b(email.encode('utf-8'), digest_size=8).digest()
+    return struct.unpack('<Q', digest)[0] or 1
+
+
+def bloom_positions(key, hashes, bits):
+    """Bits do filtro: hashing duplo com o passo derivado da própria chave
+    (assim o índice pode ser reescrito sem conhecer os e-mails)"""
+    step = (key ^ (key >> 31)) * 0x94D049BB133111EB & 0xFFFFFFFFFFFFFFFF
+    step = (step ^ (step >> 29)) | 1
+    return [(key + i * step) % bits for i in range(hashes)]
+
+
+def capacity_for(count):
+    """Menor potência de 2 que mantém a ocupação em até metade do limite"""
+    capacity = DEFAULT_CAPACITY
+    while count > capacity * MAX_LOAD / 2:
+        capacity *= 2
+    return capacity
+
+
+def file_size(capacity):
+    return HEADER_SIZE + capacity * SLOT_SIZE + capacity * BLOOM_BITS_PER_SLOT // 8
+
+
+def create_index_file(path, capacity, entries=()):
+    """Grava um índice novo (entries: [(chave, inscrito_em)]) e faz fsync"""
+    data = bytearray(file_size(capacity))
+    mask = capacity - 1
+    bloom_offset = HEADER_SIZE + capacity * SLOT_SIZE
+    bloom_bits = capacity * BLOOM_BITS_PER_SLOT
+    count = 0
+    for key, since in entries:
+        index = key & mask
+        while True:
+            offset = HEADER_SIZE + index * SLOT_SIZE
+            existing = struct.unpack_from('<Q', data, offset)[0]
+            if existing == EMPTY:
+                SLOT.pack_into(data, offset, key, since, ACTIVE)
+                count += 1
+                break
+            if existing == key:
+                break
+            index = (index + 1) & mask
+        for bit in bloom_positions(key, BLOOM_HASHES, bloom_bits):
+            data[bloom_offset + (bit >> 3)] |= 1 << (bit & 7)
+    HEADER.pack_into(data, 0, MAGIC, VERSION, BLOOM_HASHES, capacity, count, 0, 0)
+    with open(path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return count
+
+
+class SubscriberIndex:
+    """Índice de e-mails inscritos em um arquivo mapeado em memória"""
+
+    def __init__(self, directory, filename=INDEX_FILENAME):
+        self.path = os.path.join(directory, filename)
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._lock_fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        self._file = None
+        self._map = None
+        self.created = False
+
+        self.lookups = 0
+        self.bloom_rejects = 0
+        self.probes = 0
+        self.remaps = 0
+        self.compactions = 0
+
+        with self._exclusive():
+            if not os.path.exists(self.path):
+                create_index_file(self.path, DEFAULT_CAPACITY)
+                self.created = True
+            self._map_file()
+
+    # ------------------------------------------------------------------
+    # Arquivo mapeado
+    # ------------------------------------------------------------------
+
+    def _map_file(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._file = open(self.path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, version, self._bloom_hashes, capacity, _, _, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or len(self._map) != file_size(capacity):
+            raise ValueError(f"Índice de inscritos inválido: {self.path} (use 'python subscribers.py rebuild')")
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._bloom_offset = HEADER_SIZE + capacity * SLOT_SIZE
+        self._bloom_bits = capacity * BLOOM_BITS_PER_SLOT
+
+    def _check_moved(self):
+        """Outro processo compactou/cresceu o índice: remapeia o arquivo novo"""
+        if struct.unpack_from('<Q', self._map, MOVED_OFFSET)[0]:
+            self._map_file()
+            self.remaps += 1
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """Lock entre threads e entre processos (flock) para escrever"""
+        with self._lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _counts(self):
+        return struct.unpack_from('<QQ', self._map, COUNTS_OFFSET)
+
+    # ------------------------------------------------------------------
+    # Bloom + tabela
+    # ------------------------------------------------------------------
+
+    def _bloom_contains(self, key):
+        data, offset = self._map, self._bloom_offset
+        for bit in bloom_positions(key, self._bloom_hashes, self._bloom_bits):
+            if not data[offset + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def _bloom_add(self, key):
+        data, offset = self._map, self._bloom_offset
+        for bit in bloom_positions(key, self._bloom_hashes, self._bloom_bits):
+            data[offset + (bit >> 3)] |= 1 << (bit & 7)
+
+    def _find(self, key):
+        """Offset do slot da chave ou do primeiro slot vazio da sequência"""
+        data, mask = self._map, self._mask
+        index = key & mask
+        while True:
+            self.probes += 1
+            offset = HEADER_SIZE + index * SLOT_SIZE
+            existing = struct.unpack_from('<Q', data, offset)[0]
+            if existing == key or existing == EMPTY:
+                return offset, existing
+            index = (index + 1) & mask
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def lookup(self, email):
+        """Epoch da inscrição, ou None se o e-mail não está inscrito"""
+        email = normalize_email(email)
+        if email is None:
+            return None
+        key = email_key(email)
+        with self._lock:
+            self._check_moved()
+            self.lookups += 1
+            if not self._bloom_contains(key):
+                self.bloom_rejects += 1
+                return None
+            offset, existing = self._find(key)
+            if existing == EMPTY:
+                return None
+            _, since, state = SLOT.unpack_from(self._map, offset)
+            return since if state == ACTIVE else None
+
+    def __contains__(self, email):
+        return self.lookup(email) is not None
+
+    def add(self, email, when=None):
+        """Inscreve o e-mail; retorna False se ele já estava inscrito"""
+        email = normalize_email(email)
+        if email is None:
+            raise ValueError("E-mail inválido")
+        key = email_key(email)
+        since = int(time.time() if when is None else when)
+        with self._exclusive():
+            self._check_moved()
+            offset, existing = self._find(key)
+            count, removed = self._counts()
+            if existing == key:
+                if SLOT.unpack_from(self._map, offset)[2] == ACTIVE:
+                    return False
+                # Reinscrição: reaproveita o slot removido
+                SLOT.pack_into(self._map, offset, key, since, ACTIVE)
+                struct.pack_into('<QQ', self._map, COUNTS_OFFSET, count + 1, removed - 1)
+                return True
+            if count + removed + 1 > self.capacity * MAX_LOAD:
+                self._rewrite(capacity_for(count + 1))
+                offset, _ = self._find(key)
+            # Estado e data antes da chave: quem lê sem lock nunca vê chave sem estado
+            struct.pack_into('<II', self._map, offset + 8, since, ACTIVE)
+            struct.pack_into('<Q', self._map, offset, key)
+            self._bloom_add(key)
+            struct.pack_into('<Q', self._map, COUNTS_OFFSET, count + 1)
+            return True
+
+    def remove(self, email):
+        """Cancela a inscrição (o slot vira removido até a próxima compactação)"""
+        email = normalize_email(email)
+        if email is None:
+            return False
+        key = email_key(email)
+        with self._exclusive():
+            self._check_moved()
+            offset, existing = self._find(key)
+            if existing != key or SLOT.unpack_from(self._map, offset)[2] != ACTIVE:
+                return False
+            struct.pack_into('<I', self._map, offset + 12, REMOVED)
+            count, removed = self._counts()
+            struct.pack_into('<QQ', self._map, COUNTS_OFFSET, count - 1, removed + 1)
+            return True
+
+    def _entries(self):
+        """Inscritos ativos como (chave, inscrito_em)"""
+        data = self._map
+        for index in range(self.capacity):
+            key, since, state = SLOT.unpack_from(data, HEADER_SIZE + index * SLOT_SIZE)
+            if key != EMPTY and state == ACTIVE:
+                yield key, since
+
+    def _rewrite(self, capacity, entries=None):
+        """Reescreve o índice (já com o lock exclusivo) e avisa os outros processos"""
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        if entries is None:
+            entries = list(self._entries())
+        create_index_file(temp_path, capacity, entries)
+        os.replace(temp_path, self.path)
+        struct.pack_into('<Q', self._map, MOVED_OFFSET, 1)
+        self._map_file()
+
+    def compact(self):
+        """Remove os slots cancelados e ajusta a capacidade ao número de inscritos"""
+        with self._exclusive():
+            self._check_moved()
+            before = len(self._map)
+            count, removed = self._counts()
+            self._rewrite(capacity_for(count))
+            self.compactions += 1
+            return {'subscribers': count, 'dropped': removed,
+                    'bytes_before': before, 'bytes_after': len(self._map)}
+
+    def rebuild_from(self, directory):
+        """Recria o índice a partir das inscrições gravadas pelo SubmissionStore"""
+        with self._exclusive():
+            entries = {}
+            for email, since in newsletter_emails(directory):
+                entries.setdefault(email_key(email), int(since))
+            self._rewrite(capacity_for(len(entries)), list(entries.items()))
+            return len(entries)
+
+    def flush(self):
+        with self._lock:
+            self._map.flush()
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+                self._map.close()
+                self._file.close()
+                self._map = None
+            os.close(self._lock_fd)
+
+    def __len__(self):
+        with self._lock:
+            self._check_moved()
+            return self._counts()[0]
+
+    def stats(self):
+        with self._lock:
+            self._check_moved()
+            count, removed = self._counts()
+            return {
+                'subscribers': count,
+                'removed': removed,
+                'capacity': self.capacity,
+                'load': round((count + removed) / self.capacity, 3),
+                'bytes': len(self._map),
+                'lookups': self.lookups,
+                'bloom_rejects': self.bloom_rejects,
+                'probes': self.probes,
+                'compactions': self.compactions,
+                'remaps': self.remaps,
+            }
+
+
+def newsletter_emails(directory, prefix='submissions'):
+    """(e-mail, epoch) das inscrições gravadas pelo SubmissionStore, em ordem"""
+    for path in sorted(glob.glob(os.path.join(directory, f'{prefix}-*.jsonl')), key=os.path.getmtime):
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('type') != 'newsletter' or not isinstance(record.get('data'), dict):
+                    continue
+                email = normalize_email(record['data'].get('email'))
+                if email is None:
+                    continue
+                try:
+                    since = time.mktime(time.strptime(record['received_at'][:19], '%Y-%m-%dT%H:%M:%S'))
+                except (KeyError, ValueError):
+                    since = os.path.getmtime(path)
+                yield email, since
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='subscribers.py',
+                                     description='Índice de inscritos na newsletter')
+    parser.add_argument('command', choices=['stats', 'compact', 'rebuild'])
+    parser.add_argument('--data-dir', default=DEFAULT_DIRECTORY)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    index = SubscriberIndex(args.data_dir)
+    opened = time.perf_counter() - started
+    try:
+        if args.command == 'rebuild':
+            count = index.rebuild_from(args.data_dir)
+            print(f"✅ Índice recriado: {count} inscritos em {time.perf_counter() - started:.2f}s")
+        elif args.command == 'compact':
+            result = index.compact()
+            print(f"✅ Compactado: {result['subscribers']} inscritos, {result['dropped']} removidos descartados "
+                  f"({result['bytes_before'] // 1024} KB -> {result['bytes_after'] // 1024} KB)")
+        else:
+            print(json.dumps(dict(index.stats(), open_ms=round(opened * 1000, 3)), indent=2))
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
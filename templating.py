@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Templates com Layout e Partials Compartilhados
+
+Cabeçalho, navegação e rodapé ficam uma vez só em templates/ e cada página
+em templates/site/ declara apenas o que é dela:
+
+- Sintaxe mínima: {% extends %}, {% block %}, {% include %}, {% set %}
+  (valores literais), {{ variavel }} (com pontos, escapada) e {# comentário #};
+  uma tag sozinha na linha não deixa linha em branco na saída
+- Cada template é compilado uma única vez para uma função Python e fica
+  em cache até o arquivo mudar
+- Páginas renderizadas são memorizadas junto com a lista de templates de
+  que dependem; mudar um partial invalida exatamente as páginas que o usam
+- Exportação estática: `python server.py render` grava o resultado em
+  index.html, pages/ e blog/ (o que vai para o deploy e para o build)
+
+Variáveis disponíveis em toda página: `root` (prefixo relativo até a raiz,
+'' ou '../'), `page` (caminho de saída) e `nav.<seção>` (" active" para a
+seção declarada em {% set section = "..." %}).
+"""
+
+import argparse
+import html
+import os
+import re
+import sys
+import threading
+import time
+
+DEFAULT_TEMPLATE_DIR = 'templates'
+SITE_DIR = 'site'
+DEFAULT_CHECK_INTERVAL = 1.0
+
+# Profundidade máxima de extends/include (evita ciclos)
+MAX_DEPTH = 16
+
+TAG_RE = re.compile(r'\{%.*?%\}|\{\{.*?\}\}|\{#.*?#\}', re.S)
+NAME_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*$')
+STRING_RE = re.compile(r'^"([^"]*)"$|^\'([^\']*)\'$')
+SET_RE = re.compile(r'^set\s+([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(.+)$', re.S)
+
+
+class TemplateError(Exception):
+    """Template inválido; a mensagem inclui arquivo e linha"""
+
+
+def _string_literal(text, where):
+    match = STRING_RE.match(text.strip())
+    if not match:
+        raise TemplateError(f"{where}: esperava uma string entre aspas, veio {text.strip()!r}")
+    return match.group(1) if match.group(1) is not None else match.group(2)
+
+
+def tokenize(source):
+    """
+    Divide o template em ('text' | 'var' | 'tag', conteúdo, linha).
+
+    Como o trim_blocks/lstrip_blocks do Jinja: a quebra de linha logo
+    depois de uma tag {% %} ou comentário é descartada, e a indentação
+    antes dela também quando a tag começa a linha.
+    """
+    tokens = []
+    pos = 0
+    line = 1
+    for match in TAG_RE.finditer(source):
+        text = source[pos:match.start()]
+        tag = match.group(0)
+        end = match.end()
+        if tag[1] != '{':
+            line_start = text.rfind('\n') + 1
+            starts_line = line_start > 0 or pos == 0 or source[pos - 1] == '\n'
+            if starts_line and not text[line_start:].strip():
+                text = text[:line_start]
+            if source.startswith('\n', end):
+                end += 1
+            elif source.startswith('\r\n', end):
+                end += 2
+        if text:
+            tokens.append(('text', text, line))
+        line += source.count('\n', pos, match.start())
+        if tag[1] == '{':
+            tokens.append(('var', tag[2:-2].strip(), line))
+        elif tag[1] == '%':
+            tokens.append(('tag', tag[2:-2].strip(), line))
+        line += source.count('\n', match.start(), end)
+        pos = end
+    if pos < len(source):
+        tokens.append(('text', source[pos:], line))
+    return tokens
+
+
+def parse(source, name):
+    """Tokens -> (extends, defaults, nós); nós: ('text', s), ('var', partes),
+    ('block', nome, filhos) e ('include', nome)"""
+    extends = None
+    defaults = {}
+    root = []
+    stack = [('', root, 0)]
+    for kind, value, line in tokenize(source):
+        where = f"{name}:{line}"
+        nodes = stack[-1][1]
+        if kind == 'text':
+            nodes.append(('text', value))
+        elif kind == 'var':
+            if not NAME_RE.match(value):
+                raise TemplateError(f"{where}: variável inválida {{{{ {value} }}}}")
+            nodes.append(('var', tuple(value.split('.'))))
+        else:
+            keyword, _, rest = value.partition(' ')
+            if keyword == 'extends':
+                if extends is not None or len(stack) > 1 or any(
+                        node[0] != 'text' or node[1].strip() for node in root):
+                    raise TemplateError(f"{where}: extends precisa ser a primeira tag do template")
+                extends = _string_literal(rest, where)
+            elif keyword == 'block':
+                block_name = rest.strip()
+                if not NAME_RE.match(block_name) or '.' in block_name:
+                    raise TemplateError(f"{where}: nome de bloco inválido {block_name!r}")
+                children = []
+                nodes.append(('block', block_name, children))
+                stack.append((block_name, children, line))
+            elif keyword == 'endblock':
+                if len(stack) == 1:
+                    raise TemplateError(f"{where}: endblock sem block")
+                stack.pop()
+            elif keyword == 'include':
+                nodes.append(('include', _string_literal(rest, where)))
+            elif keyword == 'set':
+                match = SET_RE.match(value)
+                if not match or len(stack) > 1:
+                    raise TemplateError(f"{where}: use {{% set nome = \"valor\" %}} fora dos blocos")
+                defaults[match.group(1)] = _string_literal(match.group(2), where)
+            else:
+                raise TemplateError(f"{where}: tag desconhecida {{% {keyword} %}}")
+    if len(stack) > 1:
+        block_name, _, line = stack[-1]
+        raise TemplateError(f"{name}:{line}: block {block_name!r} sem endblock")
+    return extends, defaults, root
+
+
+def lookup(ctx, parts):
+    """Variável com pontos; o que não existe vira texto vazio"""
+    value = ctx
+    for part in parts:
+        if isinstance(value, dict):
+            value = value.get(part)
+        else:
+            value = getattr(value, part, None)
+        if value is None:
+            return ''
+    return value
+
+
+def escape(value):
+    return html.escape(value if isinstance(value, str) else str(value), quote=True)
+
+
+class CompiledTemplate:
+    """Template compilado: função do corpo, funções dos blocos e metadados"""
+
+    __slots__ = ('name', 'path', 'mtime_ns', 'parent', 'defaults', 'body', 'blocks')
+
+    def __init__(self, name, path, mtime_ns, parent, defaults, body, blocks):
+        self.name = name
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.parent = parent
+        self.defaults = defaults
+        self.body = body
+        self.blocks = blocks
+
+
+def _emit(nodes, lines, functions):
+    """Gera as linhas Python de uma lista de nós; blocos viram funções à parte"""
+    for node in nodes:
+        if node[0] == 'text':
+            lines.append(f"    write({node[1]!r})")
+        elif node[0] == 'var':
+            lines.append(f"    write(escape(lookup(ctx, {node[1]!r})))")
+        elif node[0] == 'include':
+            lines.append(f"    include({node[1]!r}, ctx, write)")
+        else:
+            _, block_name, children = node
+            if block_name in functions:
+                raise TemplateError(f"bloco {block_name!r} definido duas vezes")
+            functions[block_name] = None
+            block_lines = []
+            _emit(children, block_lines, functions)
+            functions[block_name] = block_lines
+            lines.append(f"    blocks[{block_name!r}](ctx, blocks, write, include)")
+
+
+def compile_template(source, name, path='<template>', mtime_ns=0):
+    """Compila o texto do template para funções Python (uma vez por versão do arquivo)"""
+    extends, defaults, nodes = parse(source, name)
+    functions = {}
+    body_lines = []
+    try:
+        _emit(nodes, body_lines, functions)
+    except TemplateError as e:
+        raise TemplateError(f"{name}: {e}") from None
+
+    code = []
+    for block_name, block_lines in functions.items():
+        code.append(f"def block_{block_name}(ctx, blocks, write, include):")
+        code.extend(block_lines or ["    pass"])
+    code.append("def render(ctx, blocks, write, include):")
+    # Quem estende outro template só contribui com blocos
+    code.extend(["    pass"] if extends else body_lines or ["    pass"])
+
+    namespace = {'escape': escape, 'lookup': lookup}
+    exec(compile('\n'.join(code), path, 'exec'), namespace)
+    blocks = {block_name: namespace[f'block_{block_name}'] for block_name in functions}
+    return CompiledTemplate(name, path, mtime_ns, extends, defaults, namespace['render'], blocks)
+
+
+class RenderedPage:
+    """Página pronta: bytes, versão (maior mtime entre as dependências) e dependências"""
+
+    __slots__ = ('key', 'body', 'mtime_ns', 'deps', 'checked_at')
+
+    def __init__(self, key, body, deps):
+        self.key = key
+        self.body = body
+        self.deps = deps
+        self.mtime_ns = max(deps.values())
+        self.checked_at = time.monotonic()
+
+
+class TemplateRenderer:
+    """Compila templates sob demanda, memoriza páginas e rastreia dependências"""
+
+    def __init__(self, root, template_dir=DEFAULT_TEMPLATE_DIR, check_interval=DEFAULT_CHECK_INTERVAL):
+        self.root = os.path.abspath(root)
+        self.template_dir = os.path.join(self.root, template_dir)
+        self.prefix = template_dir.strip('/').replace(os.sep, '/') + '/'
+        self.check_interval = check_interval
+        self._compiled = {}     # nome do template -> CompiledTemplate
+        self._rendered = {}     # página -> RenderedPage
+        self._dependents = {}   # nome do template -> páginas que dependem dele
+        self._lock = threading.RLock()
+        self.pages = self._scan_pages()
+        self.compiles = 0
+        self.renders = 0
+        self.hits = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return bool(self.pages)
+
+    def _scan_pages(self):
+        site_dir = os.path.join(self.template_dir, SITE_DIR)
+        pages = set()
+        for directory, _, files in os.walk(site_dir):
+            for filename in files:
+                if filename.endswith('.html'):
+                    rel = os.path.relpath(os.path.join(directory, filename), site_dir)
+                    pages.add(rel.replace(os.sep, '/'))
+        return pages
+
+    def handles(self, key):
+        return key in self.pages
+
+    # ------------------------------------------------------------------
+    # Compilação e renderização
+    # ------------------------------------------------------------------
+
+    def _template(self, name):
+        compiled = self._compiled.get(name)
+        if compiled is not None:
+            return compiled
+        path = os.path.join(self.template_dir, *name.split('/'))
+        try:
+            with open(path, encoding='utf-8') as f:
+                mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+                source = f.read()
+        except OSError as e:
+            raise TemplateError(f"template não encontrado: {name} ({e.strerror})") from None
+        compiled = compile_template(source, name, path, mtime_ns)
+        self._compiled[name] = compiled
+        self.compiles += 1
+        return compiled
+
+    def _context(self, key, chain):
+        ctx = {}
+        for template in reversed(chain):
+            ctx.update(template.defaults)
+        section = ctx.get('section')
+        ctx['root'] = '../' * key.count('/')
+        ctx['page'] = key
+        ctx['nav'] = {section: ' active'} if section else {}
+        return ctx
+
+    def _render(self, key):
+        deps = {}
+        chain = []
+        name = f'{SITE_DIR}/{key}'
+        while name is not None:
+            if len(chain) >= MAX_DEPTH:
+                raise TemplateError(f"{key}: extends demais (ciclo?)")
+            template = self._template(name)
+            chain.append(template)
+            deps[name] = template.mtime_ns
+            name = template.parent
+
+        blocks = {}
+        for template in reversed(chain):
+            blocks.update(template.blocks)
+
+        depth = [0]
+
+        def include(name, ctx, write):
+            if depth[0] >= MAX_DEPTH:
+                raise TemplateError(f"{key}: includes demais (ciclo?)")
+            partial = self._template(name)
+            if partial.parent is not None:
+                raise TemplateError(f"{name}: partial incluído não pode usar extends")
+            deps[name] = partial.mtime_ns
+            depth[0] += 1
+            try:
+                partial.body(dict(partial.defaults, **ctx), partial.blocks, write, include)
+            finally:
+                depth[0] -= 1
+
+        out = []
+        chain[-1].body(self._context(key, chain), blocks, out.append, include)
+        page = RenderedPage(key, ''.join(out).encode('utf-8'), deps)
+        self.renders += 1
+        for dep in deps:
+            self._dependents.setdefault(dep, set()).add(key)
+        return page
+
+    def _fresh(self, page):
+        """Confere o mtime das dependências (sem watcher, no máximo a cada check_interval)"""
+        for name, mtime_ns in page.deps.items():
+            try:
+                current = os.stat(os.path.join(self.template_dir, *name.split('/'))).st_mtime_ns
+            except OSError:
+                current = None
+            if current != mtime_ns:
+                self._invalidate_template(name)
+                return False
+        return True
+
+    def render(self, key):
+        """RenderedPage de `key` (ex.: 'pages/blog.html') ou None se não há template"""
+        with self._lock:
+            if key not in self.pages:
+                return None
+            page = self._rendered.get(key)
+            if page is not None:
+                now = time.monotonic()
+                if now - page.checked_at < self.check_interval or self._fresh(page):
+                    page.checked_at = now
+                    self.hits += 1
+                    return page
+            page = self._rendered[key] = self._render(key)
+            return page
+
+    # ------------------------------------------------------------------
+    # Invalidação
+    # ------------------------------------------------------------------
+
+    def _invalidate_template(self, name):
+        self._compiled.pop(name, None)
+        affected = self._dependents.pop(name, set())
+        for key in affected:
+            self._rendered.pop(key, None)
+        self.invalidations += 1
+        return affected
+
+    def invalidate(self, rel):
+        """
+        Arquivo `rel` (relativo à raiz do projeto) mudou.
+
+        Retorna as páginas afetadas: as que dependiam do template e, para
+        templates/site/, a própria página (nova ou apagada).
+        """
+        if not rel.startswith(self.prefix):
+            return set()
+        name = rel[len(self.prefix):]
+        with self._lock:
+            affected = self._invalidate_template(name)
+            if name.startswith(SITE_DIR + '/'):
+                key = name[len(SITE_DIR) + 1:]
+                self.pages = self._scan_pages()
+                self._rendered.pop(key, None)
+                affected.add(key)
+        return affected
+
+    # ------------------------------------------------------------------
+    # Exportação estática
+    # ------------------------------------------------------------------
+
+    def export(self, out=None, check=False):
+        """
+        Grava as páginas renderizadas em `out` (padrão: a raiz do projeto).
+
+        Só reescreve arquivos cujo conteúdo mudou (o build incremental e o
+        watcher não veem mudanças falsas). Com check=True nada é gravado e
+        a lista `stale` diz o que está desatualizado.
+        """
+        out = os.path.abspath(out or self.root)
+        report = {'written': [], 'unchanged': 0, 'stale': []}
+        for key in sorted(self.pages):
+            body = self.render(key).body
+            path = os.path.join(out, *key.split('/'))
+            try:
+                with open(path, 'rb') as f:
+                    current = f.read()
+            except OSError:
+                current = None
+            if current == body:
+                report['unchanged'] += 1
+                continue
+            if check:
+                report['stale'].append(key)
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+            report['written'].append(key)
+        return report
+
+    def is_stale(self, key, out=None):
+        """O HTML exportado de `key` difere do que o template gera hoje?"""
+        path = os.path.join(os.path.abspath(out or self.root), *key.split('/'))
+        try:
+            with open(path, 'rb') as f:
+                return f.read() != self.render(key).body
+        except OSError:
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pages': len(self.pages),
+                'templates_compiled': len(self._compiled),
+                'pages_rendered': len(self._rendered),
+                'compiles': self.compiles,
+                'renders': self.renders,
+                'hits': self.hits,
+                'invalidations': self.invalidations,
+            }
+
+
+def export_site(root='.', out=None, check=False, quiet=False):
+    """Exporta templates/site/ (usado pelo `render` e pelo build); None sem templates"""
+    renderer = TemplateRenderer(root)
+    if not renderer.enabled:
+        return None
+    started = time.perf_counter()
+    report = renderer.export(out, check=check)
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    if not quiet:
+        if check:
+            status = f"{len(report['stale'])} desatualizada(s)" if report['stale'] else "tudo em dia"
+            print(f"🧩 Templates: {len(renderer.pages)} páginas, {status}")
+            for key in report['stale']:
+                print(f"   - {key}")
+        else:
+            print(f"🧩 Templates: {len(report['written'])} página(s) exportada(s), "
+                  f"{report['unchanged']} sem mudanças ({report['seconds'] * 1000:.0f} ms)")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='server.py render',
+                                     description='Exporta as páginas de templates/site/ como HTML estático')
+    parser.add_argument('--out', default=None, help='diretório de saída (padrão: a raiz do projeto)')
+    parser.add_argument('--check', action='store_true',
+                        help='não grava; sai com erro se algum HTML estiver desatualizado')
+    args = parser.parse_args(argv)
+    try:
+        report = export_site('.', out=args.out, check=args.check)
+    except TemplateError as e:
+        print(f"❌ Template inválido: {e}")
+        return 1
+    if report is None:
+        print(f"⚠️  Nenhuma página em {DEFAULT_TEMPLATE_DIR}/{SITE_DIR}/")
+        return 1
+    return 1 if report['stale'] else 0
+
+
+if __name__ == '__main__':
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Captura de Tráfego para Replay
+
+Grava as requisições recebidas (método, path, headers, corpo e instante de
+chegada) em JSON Lines, para reproduzir a mistura real de leituras de
+artigos, assets e formulários com `python server.py replay`:
+
+- Mesmo caminho do log de acesso: o handler monta o registro e o coloca
+  na fila (nunca espera); a thread de escrita do AccessLog grava em lote
+- Uma linha por requisição, com o status e a duração originais para o
+  replay comparar
+- Corpo dos POSTs como lido pelo servidor (já sem o chunked), em texto ou
+  base64; acima de max_body é cortado e marcado "truncated"
+- Headers de credencial (Authorization, Cookie, token de debug) não são
+  gravados; hop-by-hop também não, o replay usa a própria conexão
+- Sem rotação: ao chegar em max_bytes a captura para (e conta o descarte)
+  em vez de apagar o começo do arquivo
+"""
+
+import base64
+import json
+
+from access_log import AccessLog
+from private_data import data_path
+
+# Fora da pasta publicada: a captura tem corpos de formulário e headers
+DEFAULT_CAPTURE_PATH = data_path('capture', 'traffic.jsonl')
+DEFAULT_CAPTURE_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_CAPTURE_MAX_BODY = 64 * 1024
+
+# Não fazem sentido num replay: SSE fica aberto, /debug mede o próprio servidor
+SKIPPED_PREFIXES = ('/__livereload', '/debug/')
+
+DROPPED_HEADERS = frozenset((
+    'authorization', 'proxy-authorization', 'cookie', 'x-debug-token',
+    'connection', 'keep-alive', 'transfer-encoding', 'content-length', 'expect',
+    'te', 'upgrade',
+))
+
+
+def encode_body(body):
+    """bytes -> campos do registro ('body' em texto ou 'body_b64')"""
+    try:
+        return {'body': body.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'body_b64': base64.b64encode(body).decode('ascii')}
+
+
+def decode_body(record):
+    """Corpo gravado em um registro (b'' se não houver)"""
+    if 'body_b64' in record:
+        return base64.b64decode(record['body_b64'])
+    return record.get('body', '').encode('utf-8')
+
+
+class TrafficCapture(AccessLog):
+    """Requisições recebidas em JSON Lines, prontas para o replay"""
+
+    def __init__(self, path=DEFAULT_CAPTURE_PATH, max_bytes=DEFAULT_CAPTURE_MAX_BYTES,
+                 max_body=DEFAULT_CAPTURE_MAX_BODY):
+        self.max_body = max_body
+        self.captured = 0
+        self.skipped = 0
+        self.full = False
+        super().__init__(path, max_bytes=max_bytes, backups=0, console=False)
+
+    def wants(self, path):
+        """A requisição para `path` deve ser capturada?"""
+        if self.full or path.startswith(SKIPPED_PREFIXES):
+            self.skipped += 1
+            return False
+        return True
+
+    def capture(self, method, path, headers, body, arrival, status, seconds, client=None):
+        """Registra uma requisição atendida (não bloqueia)"""
+        record = {
+            'ts': round(arrival, 6),
+            'type': 'request',
+            'method': method,
+            'path': path,
+            'headers': [[name, value] for name, value in headers.items()
+                        if name.lower() not in DROPPED_HEADERS],
+            'status': status,
+            'duration_ms': round(seconds * 1000, 3),
+            'client': client,
+        }
+        if body:
+            if len(body) > self.max_body:
+                record['truncated'] = len(body)
+                body = body[:self.max_body]
+            record.update(encode_body(bytes(body)))
+        self.captured += 1
+        self._put(record)
+
+    def _write(self, record):
+        if self._file is None:
+            return
+        line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        if self._size + len(line) > self.max_bytes:
+            # Sem rotação: perder o começo da captura estragaria o replay
+            self.full = True
+            self.dropped += 1
+            return
+        self._file.write(line)
+        self._size += len(line)
+        self.written += 1
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(captured=self.captured, skipped=self.skipped, full=self.full)
+        return stats
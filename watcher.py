@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Portal Scrum - Hot Reload em Processo
+
+Substitui o "reiniciar o servidor" por recarga no lugar:
+
+- SiteWatcher varre a árvore do projeto com os.scandir em intervalos
+  curtos, compara mtime/tamanho de cada arquivo e entrega a lista de
+  arquivos alterados aos ouvintes (cache, índice de busca, navegadores)
+- LiveReloadHub mantém as conexões Server-Sent Events abertas em
+  /__livereload e envia um evento "reload" a cada mudança; CSS é trocado
+  sem recarregar a página, o resto recarrega a página inteira
+- Nos motores com socket real (threads, single) o hub assume o socket
+  depois dos headers: uma única thread manda os heartbeats e nenhuma aba
+  aberta prende um worker do pool
+
+O socket do servidor nunca é fechado.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+
+DEFAULT_INTERVAL = 0.25
+LIVE_RELOAD_PATH = '/__livereload'
+HEARTBEAT_SECONDS = 5.0
+MAX_CLIENTS = 8
+# Sockets assumidos pelo hub não ocupam worker: o limite é só de descritores
+MAX_STREAMS = 256
+
+SKIP_DIRS = frozenset(('.git', '.cache', 'data', 'dist', '__pycache__', 'node_modules',
+                       '.venv', 'venv', '.pytest_cache'))
+
+# Inserido antes de </body> nas páginas HTML servidas em modo dev
+LIVE_RELOAD_SNIPPET = b"""<script>
+(function () {
+    if (!window.EventSource) return;
+    var source = new EventSource('/__livereload');
+    source.addEventListener('reload', function (event) {
+        var change = JSON.parse(event.data);
+        if (!change.css_only) { location.reload(); return; }
+        document.querySelectorAll('link[rel="stylesheet"]').forEach(function (link) {
+            var url = new URL(link.href);
+            url.searchParams.set('livereload', Date.now());
+            link.href = url.toString();
+        });
+    });
+})();
+</script>
+"""
+
+
+def inject_live_reload(body):
+    """Insere o cliente de live-reload antes do último </body>"""
+    position = body.rfind(b'</body>')
+    if position == -1:
+        return body + LIVE_RELOAD_SNIPPET
+    return body[:position] + LIVE_RELOAD_SNIPPET + body[position:]
+
+
+class SiteWatcher:
+    """Observa a árvore do projeto por polling em lote (os.scandir)"""
+
+    def __init__(self, root, interval=DEFAULT_INTERVAL):
+        self.root = os.path.abspath(root)
+        self.interval = interval
+        self._listeners = []
+        self._snapshot = self.scan()
+        self._stop = threading.Event()
+        self._thread = None
+        self.polls = 0
+        self.changes = 0
+
+    def add_listener(self, callback):
+        """callback(lista_de_caminhos_relativos) a cada lote de mudanças"""
+        self._listeners.append(callback)
+
+    def scan(self):
+        """{caminho relativo: (mtime_ns, tamanho)} de todos os arquivos"""
+        snapshot = {}
+        pending = [('', self.root)]
+        while pending:
+            prefix, directory = pending.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        rel = prefix + entry.name
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in SKIP_DIRS and not entry.name.startswith('.'):
+                                pending.append((rel + '/', entry.path))
+                            continue
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        snapshot[rel] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                continue
+        return snapshot
+
+    def poll(self):
+        """Compara com a varredura anterior; retorna os caminhos alterados"""
+        current = self.scan()
+        previous = self._snapshot
+        changed = [rel for rel, key in current.items() if previous.get(rel) != key]
+        changed += [rel for rel in previous if rel not in current]
+        self._snapshot = current
+        self.polls += 1
+        if changed:
+            self.changes += len(changed)
+            for callback in self._listeners:
+                try:
+                    callback(sorted(changed))
+                except Exception as e:
+                    print(f"⚠️  Erro ao processar mudanças: {e}")
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='site-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {'files': len(self._snapshot), 'polls': self.polls, 'changes': self.changes,
+                'interval': self.interval}
+
+
+class LiveReloadHub:
+    """Distribui eventos de reload para as conexões SSE abertas.
+
+    attach() recebe o socket e o hub escreve nele; subscribe() devolve uma
+    fila para o handler que precisa continuar escrevendo (motor asyncio).
+    """
+
+    def __init__(self, max_clients=MAX_CLIENTS, max_streams=MAX_STREAMS):
+        self.max_clients = max_clients
+        self.max_streams = max_streams
+        self._clients = set()
+        self._streams = set()
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self.events = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._heartbeat, name='livereload-heartbeat', daemon=True)
+        self._thread.start()
+
+    def has_room(self):
+        return len(self._streams) < self.max_streams
+
+    def attach(self, sock):
+        """Assume um socket SSE com os headers já enviados; False se lotado"""
+        with self._lock:
+            if len(self._streams) >= self.max_streams:
+                return False
+            # Sem bloqueio: um cliente lento não pode segurar os outros
+            sock.settimeout(0)
+            self._streams.add(sock)
+            return True
+
+    def _broadcast(self, payload):
+        """Escreve em todos os sockets assumidos; fecha os que não aceitam"""
+        with self._lock:
+            streams = list(self._streams)
+        dead = []
+        with self._send_lock:
+            for sock in streams:
+                try:
+                    if sock.send(payload) == len(payload):
+                        continue
+                except OSError:
+                    pass
+                # Fechou, ou o buffer encheu: o EventSource reconecta sozinho
+                dead.append(sock)
+        if dead:
+            with self._lock:
+                self._streams.difference_update(dead)
+            self.dropped += len(dead)
+            for sock in dead:
+                try:
+                    sock.close()
+                except OSError:
+                    pass
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            if self._streams:
+                self._broadcast(b': ping\n\n')
+
+    def subscribe(self):
+        """Registra um cliente; retorna sua fila ou None se lotado"""
+        with self._lock:
+            if len(self._clients) >= self.max_clients:
+                return None
+            client = queue.Queue(maxsize=16)
+            self._clients.add(client)
+            return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def publish(self, changed):
+        """Avisa todos os navegadores sobre os arquivos alterados"""
+        event = json.dumps({
+            'files': changed,
+            'css_only': all(path.endswith('.css') for path in changed),
+            'time': time.time(),
+        })
+        self.events += 1
+        self._broadcast(f'event: reload\ndata: {event}\n\n'.encode())
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.put_nowait(event)
+            except queue.Full:
+                pass
+
+    @property
+    def clients(self):
+        return len(self._clients) + len(self._streams)